@@ -0,0 +1,91 @@
+"""
+Benchmark of the runtime playbook representation.
+
+Compares the memory and the attribute access time of the pydantic `Playbook` tree
+with the `__slots__` based `Plan` tree the executor runs, and the throughput of
+executing a loaded playbook.
+
+Usage:
+    python -m benchmarks.bench_plan
+"""
+import gc
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+from iauto.actions.executor import PlaybookExecutor
+from iauto.actions.playbook import dump, from_dict, load
+
+STEPS = 2000
+NUMBER = 100
+REPEAT = 5
+
+
+def _timeit(func, number=NUMBER) -> float:
+    return min(timeit.repeat(func, number=number, repeat=REPEAT)) / number * 1e6
+
+
+def _playbook_dict():
+    actions = []
+    for i in range(STEPS):
+        actions.append({"setvar": [f"v{i}", i]})
+        actions.append({"echo": {"args": "step {$v" + str(i) + "}", "result": f"$r{i}"}})
+    return {"playbook": {"actions": actions}}
+
+
+def _allocated(func):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    o = func()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return o, after - before
+
+
+def _walk(node):
+    n = 0
+    stack = [node]
+    while stack:
+        p = stack.pop()
+        n += len(p.name) + (p.args is not None) + (p.result is not None)
+        if p.actions:
+            stack.extend(p.actions)
+    return n
+
+
+def main():
+    with tempfile.TemporaryDirectory() as d:
+        fname = os.path.join(d, "bench.yaml")
+        dump(from_dict(_playbook_dict()), fname)
+
+        executor = PlaybookExecutor()
+
+        load(fname, copy=False)  # parse once, the measured load is a copy of the cached tree
+        playbook, playbook_size = _allocated(lambda: load(fname, copy=True))
+        del playbook
+        # The plan shares the argument values with the playbook, which is released after compiling.
+        plan, plan_size = _allocated(lambda: executor.compile(load(fname, copy=True)))
+
+        nodes = STEPS * 2 + 1
+        print(f"nodes: {nodes}")
+        print(f"memory (Playbook): {playbook_size / 1024:.0f} KiB, {playbook_size / nodes:.0f} B/node")
+        print(f"memory (Plan):     {plan_size / 1024:.0f} KiB, {plan_size / nodes:.0f} B/node")
+
+        playbook = plan.to_playbook()
+        assert _walk(playbook) == _walk(plan)
+        t_walk_playbook = _timeit(lambda: _walk(playbook))
+        t_walk_plan = _timeit(lambda: _walk(plan))
+        print(f"walk (Playbook):   {t_walk_playbook:.0f} us/tree")
+        print(f"walk (Plan):       {t_walk_plan:.0f} us/tree")
+
+        t_perform_playbook = _timeit(lambda: PlaybookExecutor().perform(playbook), number=10)
+        t_perform_plan = _timeit(lambda: PlaybookExecutor().perform(plan), number=10)
+        print(f"perform (Playbook): {t_perform_playbook / nodes:.2f} us/step, compiled on every run")
+        print(f"perform (Plan):     {t_perform_plan / nodes:.2f} us/step")
+
+
+if __name__ == "__main__":
+    main()
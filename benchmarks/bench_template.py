@@ -0,0 +1,78 @@
+"""
+Micro-benchmark for rendering templated playbook arguments.
+
+Compares `str.format_map(SafeDict(variables))`, which copies the whole variable
+table on every call, with the pre-parsed `iauto.actions.template.Template`.
+
+Usage:
+    python -m benchmarks.bench_template
+"""
+import os
+import timeit
+
+from iauto.actions.executor import PlaybookExecutor, SafeDict
+from iauto.actions.playbook import from_dict
+from iauto.actions.template import parse
+
+NUMBER = 100000
+REPEAT = 5
+
+
+def _timeit(func) -> float:
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e6
+
+
+def _variables():
+    variables = dict([(f"${k}", v) for k, v in os.environ.items()])
+    # Pad to a realistic number of environment variables
+    for i in range(max(0, 100 - len(variables))):
+        variables[f"$ENV_{i}"] = str(i)
+    variables["$name"] = "iauto"
+    variables["$count"] = 42
+    return variables
+
+
+def main():
+    variables = _variables()
+    source = "Hello {$name}, you have {$count} new messages, {$missing}."
+
+    template = parse(source)
+    assert template.render(variables) == source.format_map(SafeDict(variables))
+
+    t_format_map = _timeit(lambda: source.format_map(SafeDict(variables)))
+    t_template = _timeit(lambda: template.render(variables))
+
+    print(f"variables: {len(variables)}")
+    print(f"format_map(SafeDict): {t_format_map:.3f} us/call")
+    print(f"Template.render:      {t_template:.3f} us/call")
+    print(f"speedup:              {t_format_map / t_template:.1f}x")
+
+    # Per step: evaluate the arguments of a compiled step
+    executor = PlaybookExecutor()
+    for k, v in variables.items():
+        executor.set_variable(k, v)
+
+    pb = from_dict({"log": {"args": {"message": source, "count": "$count"}}})
+    plan = executor.compile(pb)
+
+    def _format_map_eval_vars(vars):
+        # `PlaybookExecutor.eval_vars` before templates were pre-parsed, on a flat variable table
+        if isinstance(vars, str):
+            if vars.startswith("$"):
+                return variables.get(vars) or vars
+            return vars.format_map(SafeDict(variables))
+        elif isinstance(vars, dict):
+            return dict([(_format_map_eval_vars(k), _format_map_eval_vars(v)) for k, v in vars.items()])
+        return vars
+
+    t_step_before = _timeit(lambda: ([], _format_map_eval_vars(pb.args)))
+    t_step_eval = _timeit(lambda: executor.eval_args(pb.args))
+    t_step_after = _timeit(lambda: plan.arguments.evaluate(executor))
+
+    print(f"step args (format_map):       {t_step_before:.3f} us/step")
+    print(f"step args (eval_args):        {t_step_eval:.3f} us/step")
+    print(f"step args (compiled plan):    {t_step_after:.3f} us/step")
+
+
+if __name__ == "__main__":
+    main()
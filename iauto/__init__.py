@@ -4,21 +4,23 @@
 Classes:
 * Playbook
 * PlaybookExecutor
+* AsyncPlaybookExecutor
 """
 
-from .actions import (Playbook, PlaybookExecutor, execute, execute_in_process,
-                      execute_in_thread, load)
-from .agents import _actions
-from .llms.actions import register_actions as register_llm_actions
+from .actions import (AsyncPlaybookExecutor, Playbook, PlaybookExecutor,
+                      execute, execute_async, execute_in_process,
+                      execute_in_thread, load, loader)
 
 VERSION = "0.1.10"
 """The current version."""
 
-# Register actions
+# Register actions, the modules are imported on first use
 
-register_llm_actions()
+loader.register_lazy("iauto.llms.actions", ["llm.session", "llm.chat", "llm.react", "llm.batch"])
+loader.register_lazy("iauto.agents._actions", ["agents.create", "agents.executor", "agents.run"])
 
 __all__ = [
     "Playbook",
-    "PlaybookExecutor"
+    "PlaybookExecutor",
+    "AsyncPlaybookExecutor"
 ]
@@ -20,17 +20,17 @@ def load_env(args):
 
 
 def list_actions():
-    from iauto.actions import loader
+    from iauto.actions import manifest
     actions = []
-    for a in loader.actions:
-        desc = a.spec.description or ""
+    for spec in manifest.specs().values():
+        desc = spec.description or ""
         desc = [x for x in desc.split('\n') if x != ""]
         desc = desc[0] if len(desc) > 0 else ""
         z = desc.find(".")
         if z > -1:
             desc = desc[:z+1]
 
-        actions.append(f"{a.spec.name} : {desc}")
+        actions.append(f"{spec.name} : {desc}")
 
     actions.sort()
 
@@ -38,12 +38,11 @@ def list_actions():
 
 
 def print_action_spec(name):
-    from iauto.actions import loader
-    action = loader.get(name=name)
-    if not action:
+    from iauto.actions import manifest
+    spec = manifest.specs().get(name)
+    if not spec:
         print(f"No action found: {name}")
     else:
-        spec = action.spec
         print(json.dumps(spec.model_dump(), ensure_ascii=False, indent=2))
 
 
@@ -69,25 +68,82 @@ def run(args, parser):
         print(f"Invalid playbook file: {p}")
         sys.exit(-1)
 
-    from iauto.actions import executor
+    from iauto.actions import Checkpoint, Profiler, executor
     variables = {}
     if args.kwargs:
         variables.update(args.kwargs)
     variables.update(env)
 
-    while True:
+    profiler = Profiler() if args.profile or args.trace else None
+    hooks = [profiler] if profiler else None
+
+    # Restarts resume at the failed step, the checkpoint is kept in memory unless a file is given.
+    # In dataflow mode, steps don't complete in order and restarts run the whole playbook again.
+    if args.checkpoint and args.dataflow:
+        print("Checkpoints are not supported with --dataflow.")
+        sys.exit(-1)
+    checkpoint = None
+    if args.checkpoint or (args.autorestart and not args.dataflow):
+        checkpoint = Checkpoint(path=args.checkpoint, loops=True)
+
+    try:
+        while True:
+            try:
+                result = executor.execute(
+                    playbook=p,
+                    variables=variables,
+                    dataflow=args.dataflow,
+                    hooks=hooks,
+                    checkpoint=checkpoint
+                )
+                if result is not None:
+                    print(result)
+                break
+            except Exception as e:
+                if args.autorestart:
+                    print(f"Error: {e}")
+                    print("Restarting...")
+                    time.sleep(3)
+                else:
+                    raise e
+    finally:
+        if profiler is not None:
+            if args.profile:
+                print(profiler.report(), file=sys.stderr)
+            if args.trace:
+                profiler.dump_chrome_trace(args.trace)
+
+
+def compile_playbooks(args, parser):
+    if not args.playbooks:
+        parser.print_help()
+        sys.exit(-1)
+
+    from iauto.actions.playbook import compile_file
+
+    # Files in directories that are not playbooks are skipped, explicit files must compile.
+    files = []
+    for p in args.playbooks:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                files.extend([(os.path.join(root, n), True) for n in sorted(names)
+                              if n.endswith((".yaml", ".yml", ".json"))])
+        else:
+            files.append((p, False))
+
+    failed = False
+    for f, skippable in files:
         try:
-            result = executor.execute(playbook=p, variables=variables)
-            if result is not None:
-                print(result)
-            break
+            print(compile_file(f))
         except Exception as e:
-            if args.autorestart:
-                print(f"Error: {e}")
-                print("Restarting...")
-                time.sleep(3)
+            if skippable:
+                print(f"Skipped: {f}, {e}")
             else:
-                raise e
+                print(f"Compile error: {f}, {e}")
+                failed = True
+
+    if failed:
+        sys.exit(-1)
 
 
 def serve(args, parser):
@@ -126,6 +182,14 @@ def parse_args(argv):
     parser_run.add_argument('--kwargs', nargs="*", metavar="name=value",
                             action=ParseDict, help="set playbook variables")
     parser_run.add_argument('--autorestart', action="store_true", help="Autorestart when error occurs")
+    parser_run.add_argument('--checkpoint', default=None, metavar="CHECKPOINT_FILE",
+                            help="save a checkpoint after every step to the file, and resume from it, "
+                                 "not supported with --dataflow")
+    parser_run.add_argument('--profile', action="store_true", help="print the time spent in each action")
+    parser_run.add_argument('--trace', default=None, metavar="TRACE_FILE",
+                            help="write a Chrome trace of the steps to a JSON file")
+    parser_run.add_argument('--dataflow', action="store_true",
+                            help="run independent steps concurrently, based on their variables")
     parser_run.set_defaults(func=lambda args: run(args=args, parser=parser_run))
 
     parser_playground = subparser.add_parser('playground', help="start playground")
@@ -134,6 +198,10 @@ def parse_args(argv):
     parser_playground.add_argument('--playbooks', default=None, help="playbook dir for playground")
     parser_playground.set_defaults(func=lambda args: run_playground(args, parser=parser_playground))
 
+    parser_compile = subparser.add_parser('compile', help="compile playbooks for faster loading")
+    parser_compile.add_argument("playbooks", nargs="*", default=None, help="playbook files or directories")
+    parser_compile.set_defaults(func=lambda args: compile_playbooks(args=args, parser=parser_compile))
+
     parser_serve = subparser.add_parser("serve", help="run iauto server")
     parser_serve.add_argument('--port', default=2000, type=int, help="port for server")
     parser_serve.add_argument('--host', default="0.0.0.0", help="host for server")
@@ -1,4 +1,12 @@
 import asyncio
+import contextvars
+import functools
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
 
 
 def ensure_event_loop():
@@ -8,3 +16,84 @@ def ensure_event_loop():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop=loop)
     return loop
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the shared event loop that runs in a background thread.
+
+    Synchronous code uses this loop to run coroutines, so objects bound to an event
+    loop, like Playwright browsers, can be used from any thread.
+
+    Returns:
+        asyncio.AbstractEventLoop: The background event loop.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="iauto-event-loop", daemon=True)
+            thread.start()
+            _loop = loop
+    return _loop
+
+
+def run_sync(awaitable: Awaitable, loop: Optional[asyncio.AbstractEventLoop] = None) -> Any:
+    """
+    Run an awaitable from synchronous code and wait for its result.
+
+    Args:
+        awaitable (Awaitable): The awaitable to run.
+        loop (Optional[asyncio.AbstractEventLoop]): The event loop to run the awaitable in,
+            defaults to the shared background loop.
+
+    Returns:
+        Any: The result of the awaitable.
+
+    Raises:
+        RuntimeError: If called from the thread of the event loop, it would block the loop forever.
+    """
+    if loop is None:
+        loop = get_background_loop()
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("Can't wait for an awaitable synchronously in its own event loop, await it instead.")
+
+    async def _await():
+        return await awaitable
+
+    return asyncio.run_coroutine_threadsafe(_await(), loop=loop).result()
+
+
+async def to_thread(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a function in the default executor of the running event loop and wait for its result.
+
+    Same as `asyncio.to_thread`, which requires Python 3.9.
+
+    Args:
+        func (Callable): The function to run.
+        *args: The positional arguments of the function.
+        **kwargs: The keyword arguments of the function.
+
+    Returns:
+        Any: The result of the function.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(ctx.run, func, *args, **kwargs))
+
+
+def _reset_after_fork():
+    # The thread of the background loop doesn't exist in a forked child process.
+    global _loop, _loop_lock
+    _loop = None
+    _loop_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
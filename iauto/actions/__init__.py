@@ -11,7 +11,13 @@ Classes:
 * ActionSpec: Contains the specification details of an action.
 * Executor: The base class for action executors.
 * Playbook: Represents a sequence of actions to be executed as a unit.
+* Plan: An immutable, compiled form of a playbook used by the executor.
+* StepHook: The base class of hooks called by the executor around every step.
+* Profiler: A step hook that collects timing statistics and Chrome traces.
+* Checkpoint: The checkpoint of a playbook execution, to resume at the failed step.
+* PlaybookCatalog: An index of the playbooks of a directory, updated when files change.
 * PlaybookExecutor: Responsible for executing the actions defined in a playbook.
+* AsyncPlaybookExecutor: Executes playbooks in an asyncio event loop.
 * PlaybookRunAction: A special action that represents the execution of a playbook.
 
 Functions:
@@ -24,7 +30,14 @@ The module also handles the registration and discovery of built-in actions.
 
 from . import buildin, contrib
 from .action import Action, ActionArg, ActionSpec, create
-from .executor import (Executor, PlaybookExecutor, execute, execute_in_process,
-                       execute_in_thread)
+from .catalog import PlaybookCatalog, get_catalog
+from .checkpoint import Checkpoint
+from .executor import (AsyncPlaybookExecutor, Executor, PlaybookExecutor,
+                       execute, execute_async, execute_in_process,
+                       execute_in_thread, get_process_pool,
+                       shutdown_process_pool)
+from .hooks import StepEvent, StepHook
 from .loader import loader, register
+from .plan import Plan
 from .playbook import Playbook, load
+from .profiler import Profiler
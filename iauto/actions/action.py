@@ -1,3 +1,4 @@
+import inspect
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 
@@ -170,6 +171,30 @@ class Action(ABC):
         """
         raise NotImplementedError()
 
+    async def perform_async(
+        self,
+        *args,
+        **kwargs
+    ) -> Any:
+        """
+        Execute the action asynchronously, used by the `AsyncPlaybookExecutor`.
+
+        The default implementation calls `perform` and awaits its result if it's awaitable.
+        Actions that wait on I/O or run other actions should override this method, so they
+        don't block the event loop.
+
+        Args:
+            *args: Positional arguments for the action.
+            **kwargs: Keyword arguments for the action.
+
+        Returns:
+            Any: The result of the action execution.
+        """
+        result = self.perform(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
         """
         Allows the Action to be called as a function.
@@ -199,6 +224,8 @@ class FunctionAction(Action):
     """
     A concrete implementation of Action that wraps a Python callable.
 
+    The callable may be a coroutine function, the awaitable it returns is awaited by the executor.
+
     Attributes:
         _func (Callable): The Python callable to wrap.
         spec (ActionSpec): The specification of the action.
@@ -1,6 +1,6 @@
 from ..loader import loader
-from . import (collections, db, file, flow, hash, json, log, math, playbook,
-               queue, shell, time)
+from . import (collections, file, flow, hash, json, log, math, playbook, queue,
+               time)
 
 actions = {}
 
@@ -12,6 +12,7 @@ actions["echo"] = log.EchoAction()
 actions["repeat"] = flow.RepeatAction()
 actions["when"] = flow.WhenAction()
 actions["each"] = flow.ForEachAction()
+actions["parallel"] = flow.ParallelAction()
 
 actions["list.append"] = collections.ListAppendAction()
 actions["dict.set"] = collections.DictSetAction()
@@ -22,9 +23,6 @@ actions["time.now"] = time.GetNow()
 
 actions["math.mod"] = math.ModAction()
 
-actions["shell.cmd"] = shell.ShellCommandAction()
-actions["shell.print"] = shell.PrintAction()
-actions["shell.prompt"] = shell.PromptAction()
 actions["file.write"] = file.FileWriteAction()
 
 # for name, action in actions.items():
@@ -32,3 +30,7 @@ actions["file.write"] = file.FileWriteAction()
 #        action.spec.name = name
 
 loader.register(actions)
+
+# Actions with expensive dependencies, the modules are imported on first use
+loader.register_lazy("iauto.actions.buildin.db", ["db.create_engine", "db.read", "db.exec", "db.select"])
+loader.register_lazy("iauto.actions.buildin.shell", ["shell.cmd", "shell.print", "shell.prompt"])
@@ -1,7 +1,11 @@
-from typing import Any, Dict, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
 
+from .. import dataflow
 from ..action import Action, ActionSpec
 from ..executor import Executor
+from ..plan import Plan
 from ..playbook import Playbook
 
 _operators = set(["not", "all", "any", "lt", 'le', 'eq', 'ne', 'ge', 'gt', 'in'])
@@ -109,6 +113,80 @@ def eval_args(args, kwargs, vars={}):
     return r1 and r2
 
 
+def _get_concurrency(playbook) -> Optional[int]:
+    concurrency = playbook.concurrency
+    if concurrency is not None and (not isinstance(concurrency, int) or concurrency < 1):
+        raise ValueError(f"Invalid concurrency: {concurrency}")
+    return concurrency
+
+
+def _run_actions(executor: Executor, actions: Sequence[Playbook]) -> Any:
+    result = None
+    for action in actions:
+        result = executor.perform(playbook=action)
+    return result
+
+
+async def _run_actions_async(executor: Executor, actions: Sequence[Playbook]) -> Any:
+    result = None
+    for action in actions:
+        result = await executor.perform(playbook=action)
+    return result
+
+
+def _isolated_workers(executor: Executor, actions: Sequence[Playbook], frames: Sequence[Dict[str, Any]]):
+    # A worker per frame with its own write layer, and the outputs of the actions merged back.
+    outputs = sorted(dataflow.outputs([executor.compile(a) for a in actions]))
+    return [executor.fork(frame, isolated=True) for frame in frames], outputs
+
+
+def _merge(executor: Executor, workers: Sequence[Executor], outputs: Sequence[str]) -> None:
+    # In the order of the workers, so the last item wins like in a sequential loop.
+    for worker in workers:
+        executor.merge(worker, outputs)
+
+
+def _map_concurrently(func, items: Sequence, concurrency: Optional[int]) -> List:
+    # Results are returned in the order of the items, the first error is raised.
+    if len(items) == 0:
+        return []
+    max_workers = min(concurrency or len(items), len(items))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iauto-flow") as pool:
+        return list(pool.map(func, items))
+
+
+async def _map_concurrently_async(func, items: Sequence, concurrency: Optional[int]) -> List:
+    semaphore = asyncio.Semaphore(concurrency or max(len(items), 1))
+
+    async def _run(item):
+        async with semaphore:
+            return await func(item)
+
+    return list(await asyncio.gather(*[_run(item) for item in items]))
+
+
+class _LoopCheckpoint:
+    """Saves a checkpoint after every item of a top-level loop, see `iauto.actions.checkpoint`."""
+
+    __slots__ = ("_checkpoint", "_index")
+
+    def __init__(self, executor: Executor, playbook: Playbook) -> None:
+        checkpoint = executor.checkpoint
+        self._index = checkpoint.index(playbook) if checkpoint is not None and checkpoint.loops else None
+        self._checkpoint = checkpoint if self._index is not None else None
+
+    @property
+    def start(self) -> int:
+        """The index of the first item, not 0 when resuming."""
+        if self._checkpoint is None:
+            return 0
+        return self._checkpoint.loop_start(self._index)  # type: ignore
+
+    def save(self, executor: Executor, n: int) -> None:
+        if self._checkpoint is not None:
+            self._checkpoint.save(executor, [self._index, n + 1])  # type: ignore
+
+
 class RepeatAction(Action):
     def __init__(self) -> None:
         super().__init__()
@@ -131,17 +209,50 @@ class RepeatAction(Action):
         result = None
 
         if len(kwargs) == 0 and len(args) == 1 and isinstance(args[0], int):
-            for _ in range(args[0]):
+            loop = _LoopCheckpoint(executor, playbook)
+            for n in range(loop.start, args[0]):
                 for action in actions:
                     result = executor.perform(playbook=action)
+                loop.save(executor, n)
         else:
-            args, kwargs = executor.eval_args(args=playbook.args)
+            condition = playbook.arguments if isinstance(playbook, Plan) else playbook.args
+            args, kwargs = executor.eval_args(args=condition)
             while eval_args(args, kwargs, vars=executor.variables):
 
                 for action in actions:
                     result = executor.perform(playbook=action)
 
-                args, kwargs = executor.eval_args(args=playbook.args)
+                args, kwargs = executor.eval_args(args=condition)
+        return result
+
+    async def perform_async(
+        self,
+        *args,
+        executor: Optional[Executor] = None,
+        playbook: Optional[Playbook] = None,
+        **kwargs
+    ) -> None:
+        if executor is None or playbook is None:
+            raise ValueError("executor and playbook can't be None")
+        actions = playbook.actions or []
+
+        result = None
+
+        if len(kwargs) == 0 and len(args) == 1 and isinstance(args[0], int):
+            loop = _LoopCheckpoint(executor, playbook)
+            for n in range(loop.start, args[0]):
+                for action in actions:
+                    result = await executor.perform(playbook=action)
+                loop.save(executor, n)
+        else:
+            condition = playbook.arguments if isinstance(playbook, Plan) else playbook.args
+            args, kwargs = executor.eval_args(args=condition)
+            while eval_args(args, kwargs, vars=executor.variables):
+
+                for action in actions:
+                    result = await executor.perform(playbook=action)
+
+                args, kwargs = executor.eval_args(args=condition)
         return result
 
 
@@ -170,13 +281,32 @@ class WhenAction(Action):
                 result = executor.perform(playbook=action)
         return result
 
+    async def perform_async(
+        self,
+        *args,
+        executor: Optional[Executor] = None,
+        playbook: Optional[Playbook] = None,
+        **kwargs
+    ) -> None:
+        if executor is None or playbook is None:
+            raise ValueError("executor and playbook can't be None")
+
+        result = None
+        if eval_args(args, kwargs, vars=executor.variables):
+            actions = playbook.actions or []
+            for action in actions:
+                result = await executor.perform(playbook=action)
+        return result
+
 
 class ForEachAction(Action):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
             "name": "each",
-            "description": "Executes the actions for each item in the provided iterable.",
+            "description": ("Executes the actions for each item in the provided iterable, the item is `$_`. "
+                            "With `concurrency: n`, items are processed by up to n workers concurrently "
+                            "and the results of the items are returned in order."),
         })
 
     def perform(
@@ -193,6 +323,62 @@ class ForEachAction(Action):
         if len(actions) == 0:
             return
 
+        data = self._items(args, kwargs)
+
+        concurrency = _get_concurrency(playbook)
+        if concurrency is not None:
+            workers, outputs = _isolated_workers(executor, actions, [{"$_": i} for i in data])
+            results = _map_concurrently(lambda worker: _run_actions(worker, actions), workers, concurrency)
+            _merge(executor, workers, outputs)
+            return results
+
+        result = None
+        loop = _LoopCheckpoint(executor, playbook)
+        worker = executor.fork()
+        frame = worker.variables.locals
+        for n in range(loop.start, len(data)):
+            frame["$_"] = data[n]
+            for action in actions:
+                result = worker.perform(playbook=action)
+            loop.save(worker, n)
+        return result
+
+    async def perform_async(
+        self,
+        *args,
+        executor: Optional[Executor] = None,
+        playbook: Optional[Playbook] = None,
+        **kwargs
+    ) -> Any:
+        if executor is None or playbook is None:
+            raise ValueError("executor and playbook can't be None")
+
+        actions = playbook.actions or []
+        if len(actions) == 0:
+            return
+
+        data = self._items(args, kwargs)
+
+        concurrency = _get_concurrency(playbook)
+        if concurrency is not None:
+            workers, outputs = _isolated_workers(executor, actions, [{"$_": i} for i in data])
+            results = await _map_concurrently_async(
+                lambda worker: _run_actions_async(worker, actions), workers, concurrency)
+            _merge(executor, workers, outputs)
+            return results
+
+        result = None
+        loop = _LoopCheckpoint(executor, playbook)
+        worker = executor.fork()
+        frame = worker.variables.locals
+        for n in range(loop.start, len(data)):
+            frame["$_"] = data[n]
+            for action in actions:
+                result = await worker.perform(playbook=action)
+            loop.save(worker, n)
+        return result
+
+    def _items(self, args, kwargs):
         data = []
         if len(args) > 0:
             if len(args) == 1:
@@ -204,10 +390,54 @@ class ForEachAction(Action):
                 data = args
         elif len(kwargs) > 0:
             data = [kwargs]
+        return data
 
-        result = None
-        for i in data:
-            executor.set_variable("$_", i)
-            for action in actions:
-                result = executor.perform(playbook=action)
-        return result
+
+class ParallelAction(Action):
+    def __init__(self) -> None:
+        super().__init__()
+        self.spec = ActionSpec.from_dict({
+            "name": "parallel",
+            "description": ("Executes the actions concurrently and returns their results in order. "
+                            "Use `concurrency: n` to limit the number of workers."),
+        })
+
+    def perform(
+        self,
+        *args,
+        executor: Optional[Executor] = None,
+        playbook: Optional[Playbook] = None,
+        **kwargs
+    ) -> List:
+        if executor is None or playbook is None:
+            raise ValueError("executor and playbook can't be None")
+
+        actions = playbook.actions or []
+        workers, outputs = _isolated_workers(executor, actions, [{} for _ in actions])
+        results = _map_concurrently(
+            lambda i: workers[i].perform(playbook=actions[i]),
+            range(len(actions)),
+            _get_concurrency(playbook)
+        )
+        _merge(executor, workers, outputs)
+        return results
+
+    async def perform_async(
+        self,
+        *args,
+        executor: Optional[Executor] = None,
+        playbook: Optional[Playbook] = None,
+        **kwargs
+    ) -> List:
+        if executor is None or playbook is None:
+            raise ValueError("executor and playbook can't be None")
+
+        actions = playbook.actions or []
+        workers, outputs = _isolated_workers(executor, actions, [{} for _ in actions])
+        results = await _map_concurrently_async(
+            lambda i: workers[i].perform(playbook=actions[i]),
+            range(len(actions)),
+            _get_concurrency(playbook)
+        )
+        _merge(executor, workers, outputs)
+        return results
@@ -1,6 +1,8 @@
+import inspect
 import os
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
+from .. import dataflow
 from ..action import Action, ActionSpec
 from ..executor import Executor
 from ..playbook import Playbook
@@ -34,17 +36,16 @@ class PlaybookAction(Action):
         Performs the action of executing a series of other actions defined within a playbook.
 
         This method takes a variable number of arguments and keyword arguments. It requires
-        an executor and a playbook to be provided to perform the actions. The method sets
-        variables in the executor from the provided keyword arguments and then loads and
-        executes actions either from the provided playbook or from playbook paths specified
-        in the args.
+        an executor and a playbook to be provided to perform the actions. The method loads
+        and executes actions either from the provided playbook or from playbook paths
+        specified in the args, the keyword arguments are the local variables of the actions.
 
         Args:
             *args: Variable length argument list containing playbook paths as strings.
             exuecute (Optional[bool]) : Return actions if execute is False
             executor (Optional[Executor]): The executor to perform the actions. Must not be None.
             playbook (Optional[Playbook]): The playbook containing actions to be executed. Must not be None.
-            **kwargs: Arbitrary keyword arguments which are set as variables in the executor.
+            **kwargs: Arbitrary keyword arguments which are set as local variables of the actions.
 
         Raises:
             ValueError: If either executor or playbook is None, or if any of the args are not
@@ -57,9 +58,66 @@ class PlaybookAction(Action):
         if executor is None or playbook is None:
             raise ValueError("Executor and playbook are required.")
 
-        for k, v in kwargs.items():
-            executor.set_variable(f"${k}", v)
+        local_vars = dict([(f"${k}", v) for k, v in kwargs.items()])
+        actions = self._load_actions(args, executor=executor, playbook=playbook)
 
+        if execute:
+            result = None
+            worker = executor.fork(local_vars)
+            if worker.dataflow:
+                return dataflow.run(worker, actions, concurrency=playbook.concurrency)
+
+            checkpoint = worker.checkpoint
+            if checkpoint is not None and checkpoint.is_root(playbook):
+                for i, action in enumerate(actions):
+                    if checkpoint.skip(i, action):
+                        continue
+                    result = worker.perform(playbook=action)
+                    checkpoint.step_done(worker, i)
+                return result
+
+            for action in actions:
+                result = worker.perform(playbook=action)
+            return result
+        else:
+            return self._run_actions(actions, executor=executor, variables=local_vars)
+
+    async def perform_async(
+        self,
+        *args,
+        execute: Optional[bool] = True,
+        executor: Executor,
+        playbook: Playbook,
+        **kwargs
+    ) -> Any:
+        if executor is None or playbook is None:
+            raise ValueError("Executor and playbook are required.")
+
+        local_vars = dict([(f"${k}", v) for k, v in kwargs.items()])
+        actions = self._load_actions(args, executor=executor, playbook=playbook)
+
+        if execute:
+            result = None
+            worker = executor.fork(local_vars)
+            if worker.dataflow:
+                return await dataflow.run_async(worker, actions, concurrency=playbook.concurrency)
+
+            checkpoint = worker.checkpoint
+            if checkpoint is not None and checkpoint.is_root(playbook):
+                for i, action in enumerate(actions):
+                    if checkpoint.skip(i, action):
+                        continue
+                    result = await worker.perform(playbook=action)
+                    checkpoint.step_done(worker, i)
+                return result
+
+            for action in actions:
+                result = await worker.perform(playbook=action)
+            return result
+        else:
+            return self._run_actions(actions, executor=executor, variables=local_vars)
+
+    def _load_actions(self, args, executor: Executor, playbook: Playbook):
         actions = []
 
         if len(args) > 0:
@@ -73,38 +131,35 @@ class PlaybookAction(Action):
                 if not os.path.isabs(p) and fpath is not None:
                     p = os.path.join(fpath, p)
 
-                pb = playbook_load(p)
-                actions.append(pb)
+                pb = playbook_load(p, copy=False)
+                actions.append(executor.compile(pb, cache=True))
 
         actions.extend(playbook.actions or [])
+        return actions
 
-        if execute:
-            result = None
-            for action in actions:
-                result = executor.perform(playbook=action)
+    def _run_actions(self, actions, executor: Executor, variables: Dict[str, Any]):
+        pb_run_actions = []
+        for action in actions:
+            pb_run = PlaybookRunAction(executor=executor, playbook=action, variables=variables)
+            pb_run_actions.append(pb_run)
 
-            return result
-        else:
-            pb_run_actions = []
-            for action in actions:
-                pb_run = PlaybookRunAction(executor=executor, playbook=action)
-                pb_run_actions.append(pb_run)
-
-            return pb_run_actions
+        return pb_run_actions
 
 
 class PlaybookRunAction(Action):
-    def __init__(self, executor: Executor, playbook: Playbook) -> None:
+    def __init__(self, executor: Executor, playbook: Playbook, variables: Optional[Dict[str, Any]] = None) -> None:
         """
         Initialize a PlaybookRunAction with a specific executor and playbook.
 
         Args:
             executor (Executor): The executor that will perform the actions in the playbook.
             playbook (Playbook): The playbook containing the actions to be executed.
+            variables (Optional[Dict[str, Any]]): The default local variables of the playbook.
         """
         super().__init__()
         self._executor = executor
         self._playbook = playbook
+        self._variables = variables or {}
         self.spec = playbook.spec
 
     def perform(
@@ -117,8 +172,9 @@ class PlaybookRunAction(Action):
         """
         Perform the actions defined in the playbook using the executor.
 
-        This method sets any provided keyword arguments as variables in the executor and then
-        performs the actions in the playbook.
+        This method performs the actions in the playbook on a worker forked from the executor, so
+        concurrent calls, e.g. tool calls of an LLM, don't see each other's locals. The provided
+        keyword arguments are the local variables of the worker and are freed when it returns.
 
         Args:
             *args: Variable length argument list, unused in this method.
@@ -126,14 +182,30 @@ class PlaybookRunAction(Action):
                 initialization.
             playbook (Optional[Playbook]): Unused in this method, as the playbook is set during
                 initialization.
-            **kwargs: Arbitrary keyword arguments which are set as variables in the executor.
+            **kwargs: Arbitrary keyword arguments which are set as local variables of the playbook.
 
         Returns:
             Any: The result of the last action performed by the executor.
         """
-        for k, v in kwargs.items():
-            self._executor.set_variable(f"${k}", v)
-        return self._executor.perform(playbook=self._playbook)
+        local_vars = dict(self._variables)
+        local_vars.update([(f"${k}", v) for k, v in kwargs.items()])
+        worker = self._executor.fork(local_vars)
+        return worker.wait_for(worker.perform(playbook=self._playbook))
+
+    async def perform_async(
+        self,
+        *args,
+        executor: Optional[Executor] = None,
+        playbook: Optional[Playbook] = None,
+        **kwargs
+    ) -> Any:
+        local_vars = dict(self._variables)
+        local_vars.update([(f"${k}", v) for k, v in kwargs.items()])
+        worker = self._executor.fork(local_vars)
+        result = worker.perform(playbook=self._playbook)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
 
 
 class SetVarAction(Action):
@@ -8,6 +8,7 @@ from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
 from prompt_toolkit.history import InMemoryHistory
 
 from ..action import Action, ActionSpec
+from ..loader import loader
 
 _platform = sys.platform
 _env = {
@@ -122,3 +123,10 @@ class PrintAction(Action):
 
         if color:
             print("\033[0m", end='')
+
+
+loader.register({
+    "shell.cmd": ShellCommandAction(),
+    "shell.print": PrintAction(),
+    "shell.prompt": PromptAction()
+})
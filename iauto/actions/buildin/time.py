@@ -1,3 +1,4 @@
+import asyncio
 import time
 from datetime import datetime
 from typing import Optional, Union
@@ -30,6 +31,14 @@ class WaitAction(Action):
         if seconds > 0:
             time.sleep(seconds)
 
+    async def perform_async(
+        self,
+        seconds: float,
+        **kwargs
+    ) -> None:
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
 
 class GetNow(Action):
     def __init__(self) -> None:
@@ -0,0 +1,266 @@
+"""
+Memoization of step results, enabled with the `cache` key of a step.
+
+```yaml
+- browser.readability:
+    args: [$html]
+    cache: true             # in-memory LRU, no expiration
+    result: $text
+- json.load:
+    args: [./data.json]
+    cache: 3600             # in-memory LRU, expires after 3600 seconds
+- llm.chat:
+    args:
+      session: $session
+      prompt: "{$question}"
+    cache:
+      backend: disk         # memory or disk
+      ttl: 86400            # seconds, optional
+      maxsize: 1024         # entries of the in-memory LRU, optional
+      path: ./cache.sqlite3 # the file of the disk backend, optional
+      key: "{$question}"    # cache by this value instead of the arguments, optional
+```
+
+The result is cached by a hash of the action name and the evaluated arguments, or of
+`key` if it's set. Arguments that can't be serialized, e.g. a session, are not
+cacheable, use `key` for such steps. The disk backend is a SQLite file that persists
+between runs, its default path is `$CACHE_PATH` or `cache.sqlite3` in the working
+directory. Cache hits and misses are reported to the step hooks, see `StepEvent.cache_hit`.
+
+Both backends return a copy of the cached result, so a step that modifies its result,
+e.g. appends to a list, doesn't change the result of later hits. Results that can't be
+copied, or pickled for the disk backend, are not cached.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAXSIZE = 1024
+
+MISSING = object()
+"""The value returned by `get` for keys that are not cached."""
+
+
+class CacheOptions:
+    """
+    The options of a step's `cache` key.
+
+    Attributes:
+        backend (str): `memory` or `disk`.
+        ttl (Optional[float]): The time to live of entries in seconds, None if they don't expire.
+        maxsize (int): The maximum number of entries of the in-memory LRU.
+        path (Optional[str]): The file of the disk backend.
+        key (Any): The value to cache by instead of the arguments, may reference variables.
+    """
+
+    __slots__ = ("backend", "ttl", "maxsize", "path", "key")
+
+    def __init__(
+        self,
+        backend: str = "memory",
+        ttl: Optional[float] = None,
+        maxsize: int = DEFAULT_MAXSIZE,
+        path: Optional[str] = None,
+        key: Any = None
+    ) -> None:
+        if backend not in ("memory", "disk"):
+            raise ValueError(f"Invalid cache backend: {backend}")
+        if ttl is not None and (not isinstance(ttl, (int, float)) or ttl <= 0):
+            raise ValueError(f"Invalid cache ttl: {ttl}")
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError(f"Invalid cache maxsize: {maxsize}")
+
+        self.backend = backend
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.path = path
+        self.key = key
+
+    @staticmethod
+    def from_value(value: Any) -> Optional['CacheOptions']:
+        """
+        Parse the value of a step's `cache` key.
+
+        Args:
+            value (Any): `true`, a TTL in seconds or a dict of options. `None` or `false`
+                disables caching.
+
+        Returns:
+            Optional[CacheOptions]: The options, None if caching is disabled.
+
+        Raises:
+            ValueError: If the value is invalid.
+        """
+        if value is None or value is False:
+            return None
+        elif value is True:
+            return CacheOptions()
+        elif isinstance(value, (int, float)):
+            return CacheOptions(ttl=value)
+        elif isinstance(value, dict):
+            unknown = set(value.keys()) - set(CacheOptions.__slots__)
+            if len(unknown) > 0:
+                raise ValueError(f"Invalid cache options: {', '.join(sorted(unknown))}")
+            return CacheOptions(**value)
+        else:
+            raise ValueError(f"Invalid cache: {value}")
+
+
+def _default(o):
+    if hasattr(o, "model_dump"):
+        return o.model_dump()
+    if isinstance(o, (set, frozenset)):
+        return sorted(o, key=repr)
+    if isinstance(o, bytes):
+        return o.hex()
+    raise TypeError(f"Not cacheable: {type(o).__name__}")
+
+
+def make_key(name: str, args: Any, kwargs: Any) -> Optional[str]:
+    """
+    Get the cache key of a step.
+
+    Args:
+        name (str): The name of the action.
+        args (Any): The evaluated positional arguments.
+        kwargs (Any): The evaluated keyword arguments.
+
+    Returns:
+        Optional[str]: The key, None if the arguments can't be serialized.
+    """
+    try:
+        data = json.dumps([name, args, kwargs], sort_keys=True, ensure_ascii=False, default=_default)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """A thread-safe in-memory LRU cache with per-entry expiration, values are deep-copied."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, Tuple[Optional[float], Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """Get a copy of the value of the key, `MISSING` if it's not found, expired, or couldn't be copied."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Set a copy of the value of the key, evicting the least recently used entries, see `get`."""
+        try:
+            value = copy.deepcopy(value)
+        except Exception:
+            return
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """A cache stored in a SQLite file, values are pickled."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS step_cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def get(self, key: str) -> Any:
+        """Get the value of the key, `MISSING` if it's not found or expired."""
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM step_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return MISSING
+        value, expires = row
+        if expires is not None and expires < time.time():
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM step_cache WHERE key = ?", (key,))
+            return MISSING
+        return pickle.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Set the value of the key, values that can't be pickled are not stored."""
+        try:
+            data = pickle.dumps(value)
+        except Exception:
+            return
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO step_cache (key, value, expires) VALUES (?, ?, ?)", (key, data, expires))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM step_cache")
+
+
+_caches: Dict[Tuple, Any] = {}
+_caches_lock = threading.Lock()
+
+
+def default_path() -> str:
+    """The default file of the disk backend: `$CACHE_PATH`, or `cache.sqlite3` in the working directory."""
+    return os.environ.get("CACHE_PATH") or os.path.join(os.getcwd(), "cache.sqlite3")
+
+
+def get_cache(options: CacheOptions):
+    """
+    Get the cache store of the options, stores are shared by the steps with the same backend.
+
+    Args:
+        options (CacheOptions): The cache options.
+
+    Returns:
+        Union[MemoryCache, DiskCache]: The cache store.
+    """
+    if options.backend == "disk":
+        path = os.path.abspath(options.path or default_path())
+        store_key: Tuple = ("disk", path)
+    else:
+        store_key = ("memory", options.maxsize)
+
+    with _caches_lock:
+        cache = _caches.get(store_key)
+        if cache is None:
+            cache = DiskCache(path) if options.backend == "disk" else MemoryCache(maxsize=options.maxsize)
+            _caches[store_key] = cache
+        return cache
+
+
+def clear() -> None:
+    """Clear all cache stores, including the disk stores that have been used."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,232 @@
+"""
+An index of the playbooks of a directory.
+
+The catalog keeps the name, description, spec and path of every playbook of a
+directory, and only parses the files that were added or changed since the last
+update. Changes are found with a `watchdog` observer if it's installed, otherwise
+the directory is scanned again at most every `poll_interval` seconds.
+
+```python
+catalog = get_catalog("./playbooks")
+for entry in catalog.entries():
+    print(entry.path, entry.description)
+```
+
+Catalogs returned by `get_catalog` are shared by the playground pages and the API.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..log import get_logger
+from .action import ActionSpec
+from .playbook import Playbook, load
+
+PLAYBOOK_EXTENSIONS = (".yaml", ".yml")
+
+_log = get_logger("catalog")
+
+
+class PlaybookEntry:
+    """
+    A playbook of the catalog.
+
+    Attributes:
+        path (str): The absolute path of the playbook file.
+        name (str): The path relative to the catalog directory, without the extension.
+        description (str): The description of the playbook, or of its spec, or the name.
+        spec (Optional[ActionSpec]): The function spec of the playbook.
+        playbook (Playbook): The loaded playbook, shared and must not be modified.
+    """
+
+    __slots__ = ("path", "name", "description", "spec", "playbook", "_stat")
+
+    def __init__(self, path: str, name: str, playbook: Playbook, stat: Tuple[int, int]) -> None:
+        self.path = path
+        self.name = name
+        self.spec: Optional[ActionSpec] = playbook.spec
+        self.playbook = playbook
+        self._stat = stat
+
+        if playbook.description:
+            self.description = playbook.description
+        elif playbook.spec and playbook.spec.description:
+            self.description = playbook.spec.description
+        else:
+            self.description = name
+
+    def __repr__(self) -> str:
+        return f"PlaybookEntry(name={self.name!r})"
+
+
+class PlaybookCatalog:
+    """
+    An index of the playbooks of a directory and its subdirectories.
+
+    Attributes:
+        root (str): The absolute path of the directory.
+        poll_interval (float): The minimum interval in seconds between scans of the directory
+            when changes are not watched.
+    """
+
+    def __init__(self, root: str, watch: bool = True, poll_interval: float = 2.0) -> None:
+        self.root = os.path.abspath(root)
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, PlaybookEntry] = {}
+        self._dirty: Set[str] = set()
+        self._rescan = True
+        self._scanned_at = 0.0
+        self._observer = None
+
+        if watch:
+            self._watch()
+
+    @property
+    def watching(self) -> bool:
+        """Whether changes of the directory are watched, otherwise it's polled."""
+        return self._observer is not None
+
+    def _watch(self) -> None:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+
+        catalog = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [event.src_path, getattr(event, "dest_path", None)]
+                with catalog._lock:
+                    if event.is_directory and event.event_type in ("moved", "deleted"):
+                        catalog._rescan = True
+                    for p in paths:
+                        if p and p.endswith(PLAYBOOK_EXTENSIONS):
+                            catalog._dirty.add(os.path.abspath(p))
+
+        try:
+            observer = Observer()
+            observer.schedule(_Handler(), self.root, recursive=True)
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            _log.warning(f"Can't watch {self.root}, polling instead: {e}")
+            return
+        self._observer = observer
+
+    def close(self) -> None:
+        """Stop watching the directory."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def _scan(self) -> Set[str]:
+        files = set()
+        if not os.path.isdir(self.root):
+            return files
+        for root, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for n in names:
+                if n.endswith(PLAYBOOK_EXTENSIONS):
+                    files.add(os.path.join(root, n))
+        return files
+
+    def _update(self, path: str) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._entries.pop(path, None)
+            return
+
+        stat = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry._stat == stat:
+            return
+
+        try:
+            playbook = load(path, copy=False)
+        except Exception as e:
+            _log.debug(f"Invalid playbook: {path}, {e}")
+            self._entries.pop(path, None)
+            return
+
+        name = os.path.splitext(os.path.relpath(path, self.root))[0]
+        self._entries[path] = PlaybookEntry(path=path, name=name, playbook=playbook, stat=stat)
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Update the index with the files that changed.
+
+        Args:
+            force (bool): Scan the whole directory, even if changes are watched.
+        """
+        with self._lock:
+            now = time.monotonic()
+            polling = self._observer is None and now - self._scanned_at >= self.poll_interval
+            if force or self._rescan or polling:
+                files = self._scan()
+                for path in set(self._entries.keys()) - files:
+                    del self._entries[path]
+                self._rescan = False
+                self._scanned_at = now
+                self._dirty.clear()
+            else:
+                files = self._dirty
+                self._dirty = set()
+
+            for path in files:
+                self._update(path)
+
+    def entries(self) -> List[PlaybookEntry]:
+        """
+        Get the playbooks of the directory, sorted by path.
+
+        Returns:
+            List[PlaybookEntry]: The playbooks.
+        """
+        self.refresh()
+        with self._lock:
+            return [self._entries[k] for k in sorted(self._entries.keys())]
+
+    def get(self, path: str) -> Optional[PlaybookEntry]:
+        """
+        Get a playbook by path.
+
+        Args:
+            path (str): The path of the playbook file.
+
+        Returns:
+            Optional[PlaybookEntry]: The playbook, None if it's not in the catalog.
+        """
+        self.refresh()
+        with self._lock:
+            return self._entries.get(os.path.abspath(path))
+
+
+_catalogs: Dict[str, PlaybookCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(root: str) -> PlaybookCatalog:
+    """
+    Get the shared catalog of a directory.
+
+    Args:
+        root (str): The directory of the playbooks.
+
+    Returns:
+        PlaybookCatalog: The catalog, created on first use.
+    """
+    root = os.path.abspath(root)
+    with _catalogs_lock:
+        catalog = _catalogs.get(root)
+        if catalog is None:
+            catalog = PlaybookCatalog(root)
+            _catalogs[root] = catalog
+        return catalog
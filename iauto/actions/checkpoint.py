@@ -0,0 +1,215 @@
+"""
+Checkpoints of playbook executions, to resume a failed execution at the failed step.
+
+The executor saves a checkpoint after every top-level step of the playbook, and with
+`loops=True` also after every item of the top-level `each` and `repeat` loops. A
+checkpoint holds the position of the next step and the variables that can be pickled.
+
+```python
+checkpoint = Checkpoint("crawl.checkpoint", loops=True)
+while True:
+    try:
+        execute("crawl.yaml", checkpoint=checkpoint)
+        break
+    except Exception:
+        time.sleep(3)
+```
+
+When resuming, the completed steps are skipped and the variables are restored. Steps
+that assigned a variable that couldn't be saved, e.g. a browser or an LLM session, are
+performed again to recreate it. The checkpoint is removed when the playbook completes.
+Checkpoints saved for a different playbook are ignored. Checkpoints are not supported in
+dataflow mode, where the top-level steps don't complete in order.
+"""
+
+import hashlib
+import os
+import pickle
+from typing import Any, Dict, List, Optional
+
+from ..log import get_logger
+from .dataflow import analyze
+from .plan import Plan
+
+VERSION = 1
+
+_log = get_logger("checkpoint")
+
+
+def fingerprint(plan: Plan) -> str:
+    """
+    Get the fingerprint of a playbook, checkpoints are only resumed by the same playbook.
+
+    Playbooks with arguments that can't be serialized to JSON, e.g. objects passed by
+    the caller, are fingerprinted from their repr.
+
+    Args:
+        plan (Plan): The compiled playbook.
+
+    Returns:
+        str: The fingerprint.
+    """
+    playbook = plan.to_playbook()
+    try:
+        data = playbook.model_dump_json()
+    except ValueError:
+        data = repr(playbook.model_dump())
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    """
+    The checkpoint of a playbook execution.
+
+    Attributes:
+        path (Optional[str]): The file the checkpoint is saved to, None to keep it in memory,
+            e.g. to restart in the same process.
+        loops (bool): Whether to save a checkpoint after every item of top-level loops.
+    """
+
+    def __init__(self, path: Optional[str] = None, loops: bool = False) -> None:
+        self.path = path
+        self.loops = loops
+        self._root: Optional[Plan] = None
+        self._fingerprint: Optional[str] = None
+        self._state: Optional[Dict[str, Any]] = None
+        self._saved: Optional[Dict[str, Any]] = None
+
+    def start(self, executor, plan: Plan) -> None:
+        """
+        Start the execution of a playbook, restore the variables of the saved checkpoint.
+
+        Args:
+            executor (Executor): The executor of the playbook.
+            plan (Plan): The compiled playbook.
+        """
+        self._root = plan
+        self._fingerprint = fingerprint(plan)
+
+        state = self._saved
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+
+        if state is not None and (state.get("version") != VERSION or state.get("fingerprint") != self._fingerprint):
+            _log.warning("Checkpoint of another playbook ignored.")
+            state = None
+
+        self._state = state
+        if state is not None:
+            _log.info(f"Resume from step: {state['position']}")
+            for k, v in state["variables"].items():
+                executor.set_variable(k, pickle.loads(v))
+
+    @property
+    def resuming(self) -> bool:
+        """Whether the execution resumes from a saved checkpoint."""
+        return self._state is not None
+
+    def is_root(self, playbook: Any) -> bool:
+        """Whether the playbook is the root of the execution."""
+        return playbook is self._root
+
+    def index(self, playbook: Any) -> Optional[int]:
+        """The index of a top-level step of the execution, None if it's not a top-level step."""
+        if self._root is not None:
+            for i, a in enumerate(self._root.actions or []):
+                if a is playbook:
+                    return i
+        return None
+
+    def skip(self, index: int, step: Plan) -> bool:
+        """
+        Whether a top-level step is skipped when resuming.
+
+        Args:
+            index (int): The index of the step.
+            step (Plan): The step.
+
+        Returns:
+            bool: True if the step was completed and its variables were restored.
+        """
+        if self._state is None:
+            return False
+
+        position = self._state["position"]
+        if index >= position[0]:
+            return False
+
+        lost = self._state["lost"]
+        return len(lost) == 0 or analyze(step).writes.isdisjoint(lost)
+
+    def loop_start(self, index: int) -> int:
+        """
+        Get the item to start a top-level loop from when resuming.
+
+        Args:
+            index (int): The index of the top-level step of the loop.
+
+        Returns:
+            int: The index of the first item to perform.
+        """
+        if self._state is None:
+            return 0
+        position = self._state["position"]
+        if len(position) > 1 and position[0] == index:
+            return position[1]
+        return 0
+
+    def step_done(self, executor, index: int) -> None:
+        """
+        Save a checkpoint after a top-level step completed.
+
+        Args:
+            executor (Executor): The executor of the playbook.
+            index (int): The index of the step.
+        """
+        if self._state is not None:
+            if index < self._state["position"][0]:
+                # A completed step performed again to recreate its variables.
+                return
+            self._state = None
+        self.save(executor, [index + 1])
+
+    def save(self, executor, position: List[int]) -> None:
+        """
+        Save a checkpoint.
+
+        Args:
+            executor (Executor): The executor of the playbook.
+            position (List[int]): The position of the next step, the index of the top-level
+                step, and the index of the next item of a loop.
+        """
+        # Variables are pickled one by one, those that can't be pickled are lost.
+        # Locals of blocks, e.g. the `$_` of a loop, are not saved.
+        variables = {}
+        lost = set()
+        for k, v in executor.variables.run.items():
+            try:
+                variables[k] = pickle.dumps(v)
+            except Exception:
+                lost.add(k)
+
+        state = {
+            "version": VERSION,
+            "fingerprint": self._fingerprint,
+            "position": list(position),
+            "variables": variables,
+            "lost": lost,
+        }
+
+        self._saved = state
+        if self.path is None:
+            return
+
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint, called when the playbook completes."""
+        self._state = None
+        self._saved = None
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,21 +1,33 @@
 from ..loader import loader
-from . import browser
-from .webdriver import create_actions as create_wd_actions
 
-actions = {}
+# The modules are imported on first use of one of their actions, so `import iauto`
+# doesn't import Playwright and Appium.
 
-actions["browser.open"] = browser.OpenBrowserAction()
-actions["browser.close"] = browser.CloseBrowserAction()
-actions["browser.goto"] = browser.GotoAction()
-actions["browser.locator"] = browser.LocatorAction()
-actions["browser.click"] = browser.ClickAction()
-actions["browser.scroll"] = browser.ScrollAction()
-actions["browser.eval"] = browser.EvaluateJavascriptAction()
-actions["browser.content"] = browser.GetContentAction()
-actions["browser.readability"] = browser.ReadabilityAction()
+loader.register_lazy("iauto.actions.contrib.browser", [
+    "browser.open",
+    "browser.close",
+    "browser.goto",
+    "browser.locator",
+    "browser.click",
+    "browser.scroll",
+    "browser.eval",
+    "browser.content",
+    "browser.readability",
+    "browser.replay"
+])
 
-wd_actions = create_wd_actions()
-
-actions.update(wd_actions)
-
-loader.register(actions)
+loader.register_lazy("iauto.actions.contrib.webdriver", [
+    "wd.connect",
+    "wd.execute_script",
+    "wd.get_element",
+    "wd.get_elements",
+    "wd.get_attr",
+    "wd.text",
+    "wd.send_keys",
+    "wd.click",
+    "wd.execute",
+    "wd.win.click",
+    "wd.win.get_clipboard",
+    "wd.win.set_clipboard",
+    "wd.win.scroll"
+])
@@ -1,19 +1,28 @@
-import asyncio
 import json
-from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Literal, Optional, Union
 
 from playwright.async_api import (Browser, BrowserContext, Locator, Page,
                                   async_playwright)
 
+from ... import _asyncio
 from ..action import Action, ActionSpec
-from ..loader import register
+from ..loader import loader, register
 
-_event_loop = asyncio.new_event_loop()
-_thread_executor = ThreadPoolExecutor()
 
+class BrowserAction(Action):
+    """
+    Base class of the browser actions.
 
-class OpenBrowserAction(Action):
+    Browser actions are implemented in `perform_async` with the async Playwright API. The
+    `AsyncPlaybookExecutor` awaits them in its own event loop, `perform` runs them in the
+    shared background event loop.
+    """
+
+    def perform(self, *args, **kwargs) -> Any:
+        return _asyncio.run_sync(self.perform_async(*args, **kwargs))
+
+
+class OpenBrowserAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -59,20 +68,20 @@ class OpenBrowserAction(Action):
             ]
         })
 
-    def perform(self,
-                *args,
-                browser_type: Optional[str] = None,
-                exec: Optional[str] = None,
-                headless: Union[bool, str] = False,
-                timeout=30000,
-                entry=None,
-                user_data_dir=None,
-                devtools=False,
-                extra_kwargs: Optional[Dict] = None,
-                playbook,
-                executor,
-                **kwargs
-                ) -> Union[Browser, BrowserContext]:
+    async def perform_async(self,
+                            *args,
+                            browser_type: Optional[str] = None,
+                            exec: Optional[str] = None,
+                            headless: Union[bool, str] = False,
+                            timeout=30000,
+                            entry=None,
+                            user_data_dir=None,
+                            devtools=False,
+                            extra_kwargs: Optional[Dict] = None,
+                            playbook,
+                            executor,
+                            **kwargs
+                            ) -> Union[Browser, BrowserContext]:
 
         if browser_type is None:
             browser_type = "chromium"
@@ -132,10 +141,10 @@ class OpenBrowserAction(Action):
                     **extra_kwargs
                 )
             return browser
-        return _event_loop.run_until_complete(_func())
+        return await _func()
 
 
-class CloseBrowserAction(Action):
+class CloseBrowserAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -151,13 +160,13 @@ class CloseBrowserAction(Action):
             ]
         })
 
-    def perform(self, browser: Browser, *args, **kwargs) -> Any:
+    async def perform_async(self, browser: Browser, *args, **kwargs) -> Any:
         async def _func():
             return await browser.close()
-        return _event_loop.run_until_complete(_func())
+        return await _func()
 
 
-class GotoAction(Action):
+class GotoAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -191,7 +200,7 @@ class GotoAction(Action):
             ]
         })
 
-    def perform(
+    async def perform_async(
         self,
         *args,
         browser: Union[Browser, Page],
@@ -221,10 +230,10 @@ class GotoAction(Action):
             await page.goto(url=url, timeout=timeout)
             await page.wait_for_load_state(state="domcontentloaded", timeout=timeout)
             return page
-        return _event_loop.run_until_complete(_func(browser=browser))
+        return await _func(browser=browser)
 
 
-class LocatorAction(Action):
+class LocatorAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -267,7 +276,7 @@ class LocatorAction(Action):
             ]
         })
 
-    def perform(
+    async def perform_async(
         self,
         *args,
         page: Page,
@@ -318,10 +327,10 @@ class LocatorAction(Action):
             if locator is None and not_found == "fail":
                 raise RuntimeError(f"elements not found: {selector}")
             return locator
-        return _event_loop.run_until_complete(_func())
+        return await _func()
 
 
-class ClickAction(Action):
+class ClickAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -356,7 +365,7 @@ class ClickAction(Action):
             ]
         })
 
-    def perform(
+    async def perform_async(
         self,
         *args,
         locator: Optional[Locator] = None,
@@ -367,15 +376,15 @@ class ClickAction(Action):
     ):
         try:
             if locator is not None:
-                return _event_loop.run_until_complete(locator.click())
+                return await locator.click()
             elif selector:
                 if page is None:
                     raise ValueError("arument `page` required")
 
                 loc_action = LocatorAction()
-                loc = loc_action.perform(page=page, selector=selector)
+                loc = await loc_action.perform_async(page=page, selector=selector)
                 if loc is not None:
-                    return _event_loop.run_until_complete(loc.click())
+                    return await loc.click()
             else:
                 ...
         except Exception as e:
@@ -383,7 +392,7 @@ class ClickAction(Action):
                 raise e
 
 
-class ScrollAction(Action):
+class ScrollAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -413,7 +422,7 @@ class ScrollAction(Action):
             ]
         })
 
-    def perform(
+    async def perform_async(
         self,
         *args,
         page: Page,
@@ -421,10 +430,10 @@ class ScrollAction(Action):
         y: int = 0,
         **kwargs
     ) -> Locator:
-        return _event_loop.run_until_complete(page.mouse.wheel(x, y))
+        return await page.mouse.wheel(x, y)
 
 
-class EvaluateJavascriptAction(Action):
+class EvaluateJavascriptAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -446,7 +455,7 @@ class EvaluateJavascriptAction(Action):
             ]
         })
 
-    def perform(
+    async def perform_async(
         self,
         *args,
         browser: Optional[Browser] = None,
@@ -462,10 +471,10 @@ class EvaluateJavascriptAction(Action):
         async def _func(page):
             return await page.evaluate(javascript)
 
-        return _event_loop.run_until_complete(_func(page=page))
+        return await _func(page=page)
 
 
-class GetContentAction(Action):
+class GetContentAction(BrowserAction):
     def __init__(self) -> None:
         super().__init__()
         self.spec = ActionSpec.from_dict({
@@ -493,7 +502,7 @@ class GetContentAction(Action):
             ]
         })
 
-    def perform(
+    async def perform_async(
         self,
         *args,
         browser: Optional[Browser] = None,
@@ -511,7 +520,7 @@ class GetContentAction(Action):
 
         if selector:
             loc = LocatorAction()
-            locator = loc.perform(page=page, selector=selector)
+            locator = await loc.perform_async(page=page, selector=selector)
             if locator:
                 async def _extract_texts():
                     texts = []
@@ -523,11 +532,11 @@ class GetContentAction(Action):
                         if text:
                             texts.append(text)
                     return texts
-                return _event_loop.run_until_complete(_extract_texts())
+                return await _extract_texts()
 
         async def _func(page, browser):
             return await page.content()
-        return _event_loop.run_until_complete(_func(page=page, browser=browser))
+        return await _func(page=page, browser=browser)
 
 
 class ReadabilityAction(Action):
@@ -558,7 +567,7 @@ class ReadabilityAction(Action):
             print("readability not found, readability-lxml and beautifulsoup4 required.")
 
 
-def fill(
+async def fill(
     *args,
     locator: Optional[Locator] = None,
     page: Optional[Page] = None,
@@ -567,26 +576,26 @@ def fill(
     **kwargs
 ):
     if locator is not None:
-        return _event_loop.run_until_complete(locator.fill(value=value))
+        return await locator.fill(value=value)
     elif selector:
         if page is None:
             raise ValueError("arument `page` required")
         loc_action = LocatorAction()
-        loc = loc_action.perform(page=page, selector=selector)
+        loc = await loc_action.perform_async(page=page, selector=selector)
         if loc is not None:
-            return _event_loop.run_until_complete(loc.fill(value=value))
+            return await loc.fill(value=value)
 
 
-def key_down(*args, page: Page, key: str, **kwargs):
-    return _event_loop.run_until_complete(page.keyboard.down(key))
+async def key_down(*args, page: Page, key: str, **kwargs):
+    return await page.keyboard.down(key)
 
 
-def key_up(*args, page: Page, key: str, **kwargs):
-    return _event_loop.run_until_complete(page.keyboard.up(key))
+async def key_up(*args, page: Page, key: str, **kwargs):
+    return await page.keyboard.up(key)
 
 
-def wait_for(*args, page: Page, selector: str, **kwargs):
-    return _event_loop.run_until_complete(page.locator(selector=selector).wait_for())
+async def wait_for(*args, page: Page, selector: str, **kwargs):
+    return await page.locator(selector=selector).wait_for()
 
 
 def get_default_page(*args, browser: Browser, **kwargs):
@@ -594,7 +603,7 @@ def get_default_page(*args, browser: Browser, **kwargs):
         return browser.contexts[0].pages[0]
 
 
-def replay(*args, browser: Browser, script: str, playbook, executor, **kwargs):
+async def replay(*args, browser: Browser, script: str, playbook, executor, **kwargs):
     if not script.startswith("{"):
         with open(playbook.resolve_path(script), "r") as f:
             script = f.read()
@@ -613,20 +622,20 @@ def replay(*args, browser: Browser, script: str, playbook, executor, **kwargs):
         tp = step["type"]
         if tp == "navigate" or tp == "goto":
             goto = GotoAction()
-            page = goto.perform(browser=browser, url=step["url"])
+            page = await goto.perform_async(browser=browser, url=step["url"])
             result = page
         elif tp == "click":
             clk = ClickAction()
-            result = clk.perform(page=page, selector=step["selectors"])
+            result = await clk.perform_async(page=page, selector=step["selectors"])
         elif tp == "change":
-            result = fill(page=page, selector=step["selectors"], value=step["value"])
+            result = await fill(page=page, selector=step["selectors"], value=step["value"])
         elif tp == "keyDown":
-            result = key_down(page=page, key=step["key"])
+            result = await key_down(page=page, key=step["key"])
         elif tp == "keyUp":
-            result = key_up(page=page, key=step["key"])
+            result = await key_up(page=page, key=step["key"])
         elif tp == "waitForElement":
             loc = LocatorAction()
-            result = loc.perform(page=page, selector=step["selectors"], wait=True)
+            result = await loc.perform_async(page=page, selector=step["selectors"], wait=True)
         elif tp == "setViewport":
             ...
         else:
@@ -651,3 +660,15 @@ register(name="browser.replay", spec={
         }
     ]
 })(replay)
+
+loader.register({
+    "browser.open": OpenBrowserAction(),
+    "browser.close": CloseBrowserAction(),
+    "browser.goto": GotoAction(),
+    "browser.locator": LocatorAction(),
+    "browser.click": ClickAction(),
+    "browser.scroll": ScrollAction(),
+    "browser.eval": EvaluateJavascriptAction(),
+    "browser.content": GetContentAction(),
+    "browser.readability": ReadabilityAction()
+})
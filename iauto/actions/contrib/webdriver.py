@@ -11,6 +11,7 @@ from selenium.common.exceptions import (ElementNotInteractableException,
 
 from ...log import get_logger
 from ..action import Action, create
+from ..loader import loader
 
 _log = get_logger("webdriver")
 
@@ -692,7 +693,7 @@ def create_actions() -> Dict[str, Action]:
     })
 
     actions["wd.win.set_clipboard"] = create(func=win_set_clipboard, spec={
-        "name": "wd.win.get_clipboard",
+        "name": "wd.win.set_clipboard",
         "description": "Set the clipboard content.",
         "arguments": [
             {
@@ -724,3 +725,6 @@ def create_actions() -> Dict[str, Action]:
     })
 
     return actions
+
+
+loader.register(create_actions())
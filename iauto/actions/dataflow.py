@@ -0,0 +1,348 @@
+"""
+Dataflow scheduling of playbook steps.
+
+The steps of a block declare their inputs with `$var` references in `args` and their
+outputs with `result`. In dataflow mode, see `PlaybookExecutor(dataflow=True)`, the
+steps of a `playbook` block are scheduled from these references instead of strictly
+one after another, so independent branches, e.g. several fetch and summarize steps,
+run concurrently.
+
+A step depends on an earlier step of the block if:
+
+* it reads a variable the earlier step writes, writes a variable the earlier step
+  reads, or both write the same variable.
+* both steps have side effects. Steps without `result` are assumed to have side effects,
+  e.g. `log` or `file.write`, and keep their order.
+* either step is `setvar` with a name that's only known at runtime, or runs a playbook
+  file, whose steps are only known at runtime.
+
+An object passed as a whole by `$var`, e.g. a session or a browser, may be mutated by
+the action, so the step is treated as a writer of the variable. Variables holding
+immutable values like strings and numbers are only read.
+
+The result of the block is the result of its last step, as in sequential mode.
+"""
+
+import asyncio
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, FrozenSet, List, Optional, Sequence, Set
+
+from .plan import Plan
+from .template import parse as parse_template
+
+_IMMUTABLE = (str, bytes, int, float, bool, type(None))
+
+
+class Step:
+    """
+    The variables a step reads and writes.
+
+    Attributes:
+        reads (FrozenSet[str]): The variables read by the step and its child actions.
+        refs (FrozenSet[str]): The variables passed by reference, which may be mutated.
+        writes (FrozenSet[str]): The variables assigned by the step and its child actions.
+        effect (bool): Whether the step is assumed to have side effects.
+        barrier (bool): Whether the step must be ordered with all other steps.
+    """
+
+    __slots__ = ("reads", "refs", "writes", "effect", "barrier")
+
+    def __init__(
+        self,
+        reads: FrozenSet[str],
+        refs: FrozenSet[str],
+        writes: FrozenSet[str],
+        effect: bool,
+        barrier: bool
+    ) -> None:
+        self.reads = reads
+        self.refs = refs
+        self.writes = writes
+        self.effect = effect
+        self.barrier = barrier
+
+
+def _collect_reads(value, reads: Set[str], refs: Set[str]) -> None:
+    if isinstance(value, str):
+        if value.startswith("$"):
+            name = value.split(".")[0]
+            reads.add(name)
+            refs.add(name)
+        elif "{" in value:
+            reads.update([n for n in parse_template(value).names if n.startswith("$")])
+    elif isinstance(value, list):
+        for v in value:
+            _collect_reads(v, reads, refs)
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            _collect_reads(k, reads, refs)
+            _collect_reads(v, reads, refs)
+
+
+def _result_names(plan: Plan) -> Set[str]:
+    result = plan.result
+    if isinstance(result, str):
+        return set([result])
+    elif isinstance(result, list):
+        return set([v for v in result if v is not None])
+    elif isinstance(result, dict):
+        return set(result.keys())
+    return set()
+
+
+def _setvar_name(plan: Plan) -> Optional[str]:
+    args = plan.args
+    name = None
+    if isinstance(args, list) and len(args) > 0:
+        name = args[0]
+    elif isinstance(args, dict):
+        name = args.get("name")
+    if not isinstance(name, str) or name.startswith("$") or "{" in name:
+        return None
+    return f"${name}"
+
+
+def analyze(plan: Plan) -> Step:
+    """
+    Find the variables a step reads and writes, including those of its child actions.
+
+    Args:
+        plan (Plan): The compiled step.
+
+    Returns:
+        Step: The variables of the step.
+    """
+    reads: Set[str] = set()
+    refs: Set[str] = set()
+    writes: Set[str] = set()
+    effect = False
+    barrier = False
+
+    def _visit(p: Plan):
+        nonlocal effect, barrier
+        _collect_reads(p.args, reads, refs)
+        results = _result_names(p)
+        writes.update(results)
+
+        if p.name == "setvar":
+            name = _setvar_name(p)
+            if name is None:
+                barrier = True
+            else:
+                writes.add(name)
+        elif p.name == "playbook" and p.args:
+            # The steps of a playbook file are only known at runtime.
+            barrier = True
+        elif p.actions:
+            for child in p.actions:
+                _visit(child)
+        elif len(results) == 0:
+            effect = True
+
+    _visit(plan)
+    return Step(frozenset(reads), frozenset(refs), frozenset(writes), effect, barrier)
+
+
+# The analysis of the steps, freed with their plans.
+_steps: 'weakref.WeakKeyDictionary[Plan, Step]' = weakref.WeakKeyDictionary()
+
+
+def _analyze_block(actions: Sequence[Plan]) -> List[Step]:
+    steps = []
+    for a in actions:
+        step = _steps.get(a)
+        if step is None:
+            step = analyze(a)
+            _steps[a] = step
+        steps.append(step)
+    return steps
+
+
+def outputs(actions: Sequence[Plan]) -> Set[str]:
+    """
+    Find the variables the steps of a block declare as outputs, with `result` or `setvar`,
+    including those of their child actions.
+
+    Args:
+        actions (Sequence[Plan]): The compiled steps of the block.
+
+    Returns:
+        Set[str]: The names of the variables.
+    """
+    names: Set[str] = set()
+    for s in _analyze_block(actions):
+        names.update(s.writes)
+    return names
+
+
+def dependencies(actions: Sequence[Plan], variables=None) -> List[Set[int]]:
+    """
+    Build the dependency graph of the steps of a block.
+
+    Args:
+        actions (Sequence[Plan]): The compiled steps of the block.
+        variables (Optional[Mapping]): The current variables, used to find the variables
+            passed by reference that hold immutable values.
+
+    Returns:
+        List[Set[int]]: The indexes of the earlier steps each step depends on.
+    """
+    steps = _analyze_block(actions)
+
+    written: Set[str] = set()
+    for s in steps:
+        written.update(s.writes)
+
+    def _mutable(name):
+        if name in written or variables is None:
+            return True
+        return not isinstance(variables.get(name), _IMMUTABLE)
+
+    writes = [s.writes | frozenset([r for r in s.refs if _mutable(r)]) for s in steps]
+
+    deps: List[Set[int]] = []
+    for i, si in enumerate(steps):
+        d = set()
+        for j in range(i):
+            sj = steps[j]
+            if (
+                si.barrier or sj.barrier
+                or (si.effect and sj.effect)
+                or not writes[j].isdisjoint(si.reads)
+                or not sj.reads.isdisjoint(writes[i])
+                or not writes[j].isdisjoint(writes[i])
+            ):
+                d.add(j)
+        deps.append(d)
+    return deps
+
+
+def _worker(executor, step: Step):
+    # Steps that may run concurrently have their own write layer, so the variables they assign
+    # internally, e.g. a scratch variable of a nested block, don't race. A barrier step runs alone,
+    # the variables it assigns are set directly.
+    return executor.fork(isolated=not step.barrier)
+
+
+def _merge(executor, worker, step: Step) -> None:
+    # The outputs of a step are visible to the steps that depend on it.
+    if not step.barrier:
+        executor.merge(worker, sorted(step.writes))
+
+
+def _is_sequential(deps: List[Set[int]]) -> bool:
+    return all([i - 1 in d for i, d in enumerate(deps) if i > 0])
+
+
+def run(executor, actions: Sequence[Plan], concurrency: Optional[int] = None) -> Any:
+    """
+    Run the steps of a block in dependency order, independent steps run in threads.
+
+    Args:
+        executor (Executor): The executor of the block, each step runs in an isolated fork of it.
+        actions (Sequence[Plan]): The compiled steps of the block.
+        concurrency (Optional[int]): The maximum number of steps running at the same time.
+
+    Returns:
+        Any: The result of the last step.
+    """
+    actions = [executor.compile(a) for a in actions]
+    if len(actions) == 0:
+        return None
+
+    deps = dependencies(actions, executor.variables)
+    if _is_sequential(deps):
+        result = None
+        for action in actions:
+            result = executor.perform(playbook=action)
+        return result
+
+    results: List[Any] = [None] * len(actions)
+    waiting = [set(d) for d in deps]
+    started = [False] * len(actions)
+    max_workers = min(concurrency or len(actions), len(actions))
+    steps = _analyze_block(actions)
+    workers = [_worker(executor, s) for s in steps]
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iauto-dataflow") as pool:
+        running = {}
+
+        def _submit():
+            for i in range(len(actions)):
+                if not started[i] and len(waiting[i]) == 0 and len(running) < max_workers:
+                    started[i] = True
+                    running[pool.submit(workers[i].perform, playbook=actions[i])] = i
+
+        _submit()
+        while len(running) > 0:
+            done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    wait(running.keys())
+                    raise error
+                results[i] = future.result()
+                _merge(executor, workers[i], steps[i])
+                for w in waiting:
+                    w.discard(i)
+            _submit()
+
+    return results[-1]
+
+
+async def run_async(executor, actions: Sequence[Plan], concurrency: Optional[int] = None) -> Any:
+    """
+    Run the steps of a block in dependency order, independent steps run as concurrent tasks.
+
+    Args:
+        executor (AsyncPlaybookExecutor): The executor of the block, each step runs in an isolated fork of it.
+        actions (Sequence[Plan]): The compiled steps of the block.
+        concurrency (Optional[int]): The maximum number of steps running at the same time.
+
+    Returns:
+        Any: The result of the last step.
+    """
+    actions = [executor.compile(a) for a in actions]
+    if len(actions) == 0:
+        return None
+
+    deps = dependencies(actions, executor.variables)
+    if _is_sequential(deps):
+        result = None
+        for action in actions:
+            result = await executor.perform(playbook=action)
+        return result
+
+    results: List[Any] = [None] * len(actions)
+    waiting = [set(d) for d in deps]
+    started = [False] * len(actions)
+    max_workers = min(concurrency or len(actions), len(actions))
+    steps = _analyze_block(actions)
+    workers = [_worker(executor, s) for s in steps]
+    running = {}
+
+    def _submit():
+        for i in range(len(actions)):
+            if not started[i] and len(waiting[i]) == 0 and len(running) < max_workers:
+                started[i] = True
+                running[asyncio.ensure_future(workers[i].perform(playbook=actions[i]))] = i
+
+    _submit()
+    while len(running) > 0:
+        done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            i = running.pop(task)
+            error = task.exception()
+            if error is not None:
+                if len(running) > 0:
+                    await asyncio.wait(running.keys())
+                raise error
+            results[i] = task.result()
+            _merge(executor, workers[i], steps[i])
+            for w in waiting:
+                w.discard(i)
+        _submit()
+
+    return results[-1]
@@ -1,17 +1,33 @@
-import multiprocessing
+import asyncio
+import copy
+import inspect
 import os
+import threading
+import weakref
 from abc import ABC, abstractmethod
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List, Tuple, Union
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+from .. import _asyncio
+from ..log import get_logger
+from . import cache as step_cache
 from .action import Action
+from .checkpoint import Checkpoint
+from .hooks import StepEvent, StepHook
 from .loader import ActionLoader
 from .loader import loader as action_loader
-from .playbook import (KEY_ACTIONS, KEY_ARGS, KEY_DESCRIPTION, KEY_RESULT,
-                       Playbook)
+from .plan import Arguments, Plan
+from .plan import compile as plan_compile
+from .playbook import (KEY_ACTIONS, KEY_ARGS, KEY_CACHE, KEY_CONCURRENCY,
+                       KEY_DESCRIPTION, KEY_RESULT, Playbook)
 from .playbook import load as playbook_load
+from .template import render as render_template
+from .variables import Variables
 
-VALID_KEYS = [KEY_ARGS, KEY_ACTIONS, KEY_RESULT, KEY_DESCRIPTION]
+VALID_KEYS = [KEY_ARGS, KEY_ACTIONS, KEY_RESULT, KEY_DESCRIPTION, KEY_CONCURRENCY, KEY_CACHE]
+
+_log = get_logger("executor")
 
 
 class SafeDict(dict):
@@ -29,7 +45,11 @@ class Executor(ABC):
         Initializes the Executor.
         """
         super().__init__()
-        self._variables = {}
+        self._variables = Variables()
+        self._hooks: List[StepHook] = []
+        self.dataflow = False
+        self.checkpoint: Optional[Checkpoint] = None
+        self._plans: Dict[int, Tuple[Playbook, Plan]] = {}
 
     @abstractmethod
     def perform(self, playbook: Playbook) -> Any:
@@ -81,6 +101,9 @@ class Executor(ABC):
         """
         Set a variable in the executor's context.
 
+        The variable is updated in the innermost scope that defines it, otherwise it's
+        set in the run scope.
+
         Args:
             name (str): The name of the variable to set.
             value (Any): The value to assign to the variable.
@@ -88,49 +111,207 @@ class Executor(ABC):
         self._variables[name] = value
 
     @property
-    def variables(self) -> Dict:
+    def variables(self) -> Variables:
         """
         Get the current variables in the executor's context.
 
         Returns:
-            Dict: A dictionary of the current variables.
+            Variables: A mapping of the current variables, including the environment variables as `$NAME`.
         """
         return self._variables
 
+    @contextmanager
+    def scope(self, variables: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Run a block in a new variable scope.
+
+        The scope holds the locals of the block, and is freed when the block exits. Creating
+        a scope doesn't copy the parent's variables.
+
+        The scope replaces the variables of this executor until the block exits, so it's for
+        single-threaded use only. Code that can run concurrently with other steps, e.g. in
+        threads or async tasks, uses a worker created with `fork` instead.
+
+        Args:
+            variables (Optional[Dict[str, Any]]): The initial locals of the scope.
+
+        Yields:
+            Dict[str, Any]: The locals of the scope.
+        """
+        parent = self._variables
+        frame = dict(variables) if variables else {}
+        self._variables = parent.new_child(frame)
+        try:
+            yield frame
+        finally:
+            self._variables = parent
+
+    def add_hook(self, hook: StepHook) -> None:
+        """
+        Add a hook that is called before and after every step, see `StepHook`.
+
+        Hooks are shared with the workers forked from this executor.
+
+        Args:
+            hook (StepHook): The hook to add.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: StepHook) -> None:
+        """
+        Remove a hook added with `add_hook`.
+
+        Args:
+            hook (StepHook): The hook to remove.
+        """
+        self._hooks.remove(hook)
+
+    @property
+    def hooks(self) -> List[StepHook]:
+        """The hooks of the executor."""
+        return list(self._hooks)
+
+    def _get_cache(self, playbook: Plan, args: List, kwargs: Dict) -> Tuple[Any, Optional[str]]:
+        # The cache store and the key of a cached step, the key is None if the step isn't cacheable.
+        if playbook.cache is None:
+            return None, None
+        if playbook.cache_key is not None:
+            args, kwargs = playbook.cache_key.evaluate(self)
+        return step_cache.get_cache(playbook.cache), step_cache.make_key(playbook.name, args, kwargs)
+
+    def _step_failed(self, playbook: Plan, error: Exception) -> None:
+        # Hooks see the steps that fail before their action is performed, e.g. an unknown action.
+        hooks = self.hooks
+        event = StepEvent(playbook=playbook, args=[], kwargs={})
+        for hook in hooks:
+            hook.before_step(event)
+        event.finish(error=error)
+        for hook in hooks:
+            hook.on_error(event)
+
+    def fork(self, variables: Optional[Dict[str, Any]] = None, isolated: bool = False) -> 'Executor':
+        """
+        Create an executor for a worker, e.g. a worker of a `parallel` block.
+
+        The worker reads the variables of this executor, but has its own scope for its
+        locals, e.g. the `$_` of an `each` item, so concurrent workers don't see each other's
+        locals. Variables assigned by a worker are visible to this executor, unless the worker
+        is isolated: the variables assigned by an isolated worker, e.g. the `result` of its
+        steps, are kept in its own layer until they are copied with `merge`.
+
+        Args:
+            variables (Optional[Dict[str, Any]]): The locals of the worker.
+            isolated (bool): Whether the worker has its own write layer, for workers that run
+                concurrently with other workers of the same executor.
+
+        Returns:
+            Executor: The executor of the worker.
+        """
+        worker = copy.copy(self)
+        frame = dict(variables) if variables else {}
+        if isolated:
+            worker._variables = self._variables.new_isolated(frame)
+        else:
+            worker._variables = self._variables.new_child(frame)
+        return worker
+
+    def merge(self, worker: 'Executor', names: Iterable[str]) -> None:
+        """
+        Set the variables assigned by an isolated worker in this executor.
+
+        Args:
+            worker (Executor): A worker created with `fork(isolated=True)`.
+            names (Iterable[str]): The variables to copy, usually the outputs declared by the steps
+                of the worker, see `iauto.actions.dataflow.outputs`.
+        """
+        writes = worker.variables.writes
+        for name in names:
+            if name in writes:
+                self.set_variable(name, writes[name])
+
+    def wait_for(self, result: Any) -> Any:
+        """
+        Wait for the result of an action from synchronous code.
+
+        Awaitable results are run in the shared background event loop, so objects bound to
+        the loop, like browsers, can be used across actions and threads.
+
+        Args:
+            result (Any): The result of an action.
+
+        Returns:
+            Any: The awaited result, or the result as is if it's not awaitable.
+        """
+        if inspect.isawaitable(result):
+            return _asyncio.run_sync(result)
+        return result
+
+    def compile(self, playbook: Union[Playbook, Plan], cache: bool = False) -> Plan:
+        """
+        Compile a playbook into an execution plan.
+
+        Actions are resolved once with `get_action`, literal arguments are frozen and
+        templated arguments are pre-parsed. Actions that can't be resolved at compile
+        time, and the actions of the local scope of the executor, which may be registered
+        after the playbook is compiled, are looked up again when the step is performed.
+
+        Args:
+            playbook (Union[Playbook, Plan]): The playbook to compile. A Plan is returned as is.
+            cache (bool): Reuse the plan if the same playbook object was compiled before, for
+                playbooks that are not modified, e.g. loaded with `load(fname, copy=False)`.
+
+        Returns:
+            Plan: The compiled execution plan.
+        """
+        if not cache or isinstance(playbook, Plan):
+            return plan_compile(playbook, get_action=self.get_action)
+
+        cached = self._plans.get(id(playbook))
+        if cached is not None and cached[0] is playbook:
+            return cached[1]
+
+        plan = plan_compile(playbook, get_action=self.get_action)
+        self._plans[id(playbook)] = (playbook, plan)
+        return plan
+
 
 class PlaybookExecutor(Executor):
     """
     Executes playbooks containing a sequence of actions.
 
-    This executor handles the running of actions defined in a playbook, managing
-    the necessary thread execution for asynchronous actions and the extraction
-    and evaluation of variables from the results.
+    This executor handles the running of actions defined in a playbook, and the
+    extraction and evaluation of variables from the results.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, dataflow: bool = False) -> None:
         """
         Initializes the PlaybookExecutor instance.
 
-        Sets up an action loader to load actions and creates a thread executor for
-        managing asynchronous action execution.
+        Sets up an action loader to load actions.
+
+        Args:
+            dataflow (bool): Schedule the steps of `playbook` blocks from their `$var` reads
+                and writes, independent steps run concurrently. See `iauto.actions.dataflow`.
         """
 
         super().__init__()
         self._action_loader = ActionLoader()
-        self._thread_executor = ThreadPoolExecutor()
+        self.dataflow = dataflow
 
-    def perform(self, playbook: Playbook) -> Any:
+    def perform(self, playbook: Union[Playbook, Plan]) -> Any:
         """
         Executes the given playbook.
 
-        This method takes a Playbook object, retrieves the corresponding action,
-        evaluates the arguments, and then performs the action. If the action's result
-        is an asyncio coroutine, it is run in a separate thread. After the action is
-        performed, any variables specified in the playbook's 'result' section are
-        extracted and stored.
+        This method takes a Playbook or a compiled Plan, retrieves the corresponding action,
+        evaluates the arguments, and then performs the action. A Playbook is compiled
+        into a Plan first, the child actions of a Plan are already compiled, so flow
+        actions like `repeat` and `each` run the plan without re-interpreting the playbook.
+        If the action's result is awaitable, it is run in the shared background event loop.
+        After the action is performed, any variables specified in the playbook's 'result'
+        section are extracted and stored.
 
         Parameters:
-        - playbook (Playbook): The playbook object containing the action to be executed.
+        - playbook (Union[Playbook, Plan]): The playbook object containing the action to be executed.
 
         Returns:
         - Any: The result of executing the action in the playbook.
@@ -139,33 +320,71 @@ class PlaybookExecutor(Executor):
         - ValueError: If the action is not found or the playbook is invalid.
         """
 
-        action = self.get_action(playbook=playbook)
-        if not action:
-            raise ValueError(f"Action not found: {playbook.name}")
+        if not isinstance(playbook, Plan):
+            playbook = self.compile(playbook)
 
-        args, kwargs = self.eval_args(args=playbook.args)
+        try:
+            action = self._resolve_action(playbook)
+            if not action:
+                raise ValueError(f"Action not found: {playbook.name}")
 
-        result = action.perform(*args, executor=self, playbook=playbook, **kwargs)
-        """
-        if asyncio.iscoroutine(result):
-            def _thread(coro):
-                loop = _asyncio.ensure_event_loop()
-                #loop = asyncio.get_running_loop()
-                #print("run in thread: ", coro)
-                #future = asyncio.run_coroutine_threadsafe(coro=coro, loop=loop)
-                #return future.result()
+            args, kwargs = playbook.arguments.evaluate(self)
+        except Exception as e:
+            if self._hooks:
+                self._step_failed(playbook, e)
+            raise
 
-                return loop.run_until_complete(coro)
+        if self._hooks or playbook.cache is not None:
+            return self._perform_instrumented(action, playbook, args, kwargs)
+
+        result = action.perform(*args, executor=self, playbook=playbook, **kwargs)
+        result = self.wait_for(result)
 
-            future = self._thread_executor.submit(_thread, coro=result)
-            result = future.result()
-        """
         self.extract_vars(data=result, vars=playbook.result)
 
         return result
 
-    def get_action(self, playbook: Playbook) -> Union[Action, None]:
-        if playbook is None or not isinstance(playbook, Playbook) or playbook.name is None:
+    def _perform_instrumented(self, action: Action, playbook: Plan, args: List, kwargs: Dict) -> Any:
+        hooks = self.hooks
+        event = StepEvent(playbook=playbook, args=args, kwargs=kwargs)
+        for hook in hooks:
+            hook.before_step(event)
+
+        try:
+            cache, key = self._get_cache(playbook, args, kwargs)
+            result = step_cache.MISSING if key is None else cache.get(key)
+            if key is not None:
+                event.cache_hit = result is not step_cache.MISSING
+
+            if result is step_cache.MISSING:
+                result = action.perform(*args, executor=self, playbook=playbook, **kwargs)
+                result = self.wait_for(result)
+                if key is not None:
+                    cache.set(key, result, ttl=playbook.cache.ttl)
+
+            self.extract_vars(data=result, vars=playbook.result)
+        except Exception as e:
+            event.finish(error=e)
+            for hook in hooks:
+                hook.on_error(event)
+            raise
+
+        event.finish()
+        for hook in hooks:
+            hook.after_step(event)
+        return result
+
+    def _resolve_action(self, playbook: Plan) -> Union[Action, None]:
+        # Actions of the local scope may be registered or overridden after the playbook was
+        # compiled, they take precedence over the action bound at compile time.
+        if len(self._action_loader._actions) > 0:
+            action = self._action_loader.get(name=playbook.name)
+            if action is not None:
+                return action
+        return playbook.action or self.get_action(playbook=playbook)
+
+    def get_action(self, playbook: Union[Playbook, Plan]) -> Union[Action, None]:
+        if playbook is None or not isinstance(playbook, (Playbook, Plan)) or playbook.name is None:
             raise ValueError(f"Invalid playbook: {playbook}")
 
         action = self._action_loader.get(name=playbook.name)
@@ -218,7 +437,7 @@ class PlaybookExecutor(Executor):
                 else:
                     return o
             else:
-                return vars.format_map(SafeDict(self._variables))
+                return render_template(vars, self._variables)
         elif isinstance(vars, list):
             return [self.eval_vars(x) for x in vars]
         elif isinstance(vars, dict):
@@ -229,7 +448,7 @@ class PlaybookExecutor(Executor):
         else:
             return vars
 
-    def eval_args(self, args: Union[str, List, Dict, None] = None) -> Tuple[List, Dict]:
+    def eval_args(self, args: Union[str, List, Dict, Arguments, None] = None) -> Tuple[List, Dict]:
         """
         Evaluates and separates arguments into positional and keyword arguments.
 
@@ -238,14 +457,17 @@ class PlaybookExecutor(Executor):
         arguments into positional (list) and keyword (dictionary) arguments.
 
         Parameters:
-        - args (Union[str, List, Dict, None], optional): The arguments to evaluate and
-            separate. Can be a string, list, dictionary, or None.
+        - args (Union[str, List, Dict, Arguments, None], optional): The arguments to evaluate and
+            separate. Can be a string, list, dictionary, None or the pre-compiled Arguments of a Plan.
 
         Returns:
         - Tuple[List, Dict]: A tuple containing a list of positional arguments and a
             dictionary of keyword arguments.
         """
 
+        if isinstance(args, Arguments):
+            return args.evaluate(self)
+
         args_ = []
         kwargs = {}
 
@@ -328,7 +550,13 @@ class PlaybookExecutor(Executor):
                 return path
 
 
-def execute(playbook: Union[str, Playbook], variables={}) -> Any:
+def execute(
+    playbook: Union[str, Playbook],
+    variables={},
+    dataflow: bool = False,
+    hooks: Optional[List[StepHook]] = None,
+    checkpoint: Optional[Checkpoint] = None
+) -> Any:
     """
     Executes a playbook from a given file with optional initial variables.
 
@@ -341,28 +569,204 @@ def execute(playbook: Union[str, Playbook], variables={}) -> Any:
         variables (dict, optional): A dictionary of initial variables to set in
             the executor's context before executing the playbook. Defaults to an
             empty dictionary.
+        dataflow (bool, optional): Run independent steps concurrently, see `PlaybookExecutor`.
+        hooks (Optional[List[StepHook]]): Hooks called around every step, e.g. a `Profiler`.
+        checkpoint (Optional[Checkpoint]): Save a checkpoint after every top-level step, and
+            resume from the saved checkpoint, see `iauto.actions.checkpoint`. Not supported
+            with `dataflow`.
 
     Returns:
         Any: The result of executing the playbook, which could be of any type
         depending on the actions performed within the playbook.
+
+    Raises:
+        ValueError: If a checkpoint is given in dataflow mode.
     """
+    if dataflow and checkpoint is not None:
+        raise ValueError("Checkpoints are not supported in dataflow mode.")
 
     playbook_fname = None
     if isinstance(playbook, str):
         playbook_fname = playbook
-        playbook = playbook_load(playbook)
+        playbook = playbook_load(playbook, copy=False)
 
-    executor = PlaybookExecutor()
+    executor = PlaybookExecutor(dataflow=dataflow)
     executor.set_variable("__file__", playbook_fname)
+    for hook in hooks or []:
+        executor.add_hook(hook)
 
-    variables = variables or {}
-    variables.update(dict(os.environ))
+    if variables is not None:
+        for k, v in variables.items():
+            executor.set_variable(f"${k}", v)
+
+    plan = executor.compile(playbook)
+    if checkpoint is None:
+        return executor.perform(playbook=plan)
+
+    executor.checkpoint = checkpoint
+    checkpoint.start(executor, plan)
+    result = executor.perform(playbook=plan)
+    checkpoint.clear()
+    return result
+
+
+class AsyncPlaybookExecutor(PlaybookExecutor):
+    """
+    Executes playbooks in an asyncio event loop.
+
+    `perform` is a coroutine that awaits `Action.perform_async`, so playbooks waiting on
+    I/O, e.g. browsers, LLMs or `time.wait`, run concurrently in one event loop with
+    `asyncio.gather`. Synchronous actions that don't implement `perform_async` run inline.
+    """
+
+    def __init__(self, dataflow: bool = False) -> None:
+        super().__init__(dataflow=dataflow)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def perform(self, playbook: Union[Playbook, Plan]) -> Any:  # type: ignore
+        """
+        Executes the given playbook asynchronously.
+
+        Parameters:
+        - playbook (Union[Playbook, Plan]): The playbook object containing the action to be executed.
+
+        Returns:
+        - Any: The result of executing the action in the playbook.
+
+        Raises:
+        - ValueError: If the action is not found or the playbook is invalid.
+        """
+        self._loop = asyncio.get_running_loop()
+
+        if not isinstance(playbook, Plan):
+            playbook = self.compile(playbook)
+
+        try:
+            action = self._resolve_action(playbook)
+            if not action:
+                raise ValueError(f"Action not found: {playbook.name}")
+
+            args, kwargs = playbook.arguments.evaluate(self)
+        except Exception as e:
+            if self._hooks:
+                self._step_failed(playbook, e)
+            raise
+
+        if self._hooks or playbook.cache is not None:
+            return await self._perform_instrumented_async(action, playbook, args, kwargs)
+
+        result = await action.perform_async(*args, executor=self, playbook=playbook, **kwargs)
+
+        self.extract_vars(data=result, vars=playbook.result)
+
+        return result
+
+    async def _perform_instrumented_async(self, action: Action, playbook: Plan, args: List, kwargs: Dict) -> Any:
+        hooks = self.hooks
+        event = StepEvent(playbook=playbook, args=args, kwargs=kwargs)
+        for hook in hooks:
+            hook.before_step(event)
+
+        try:
+            cache, key = self._get_cache(playbook, args, kwargs)
+            result = step_cache.MISSING if key is None else cache.get(key)
+            if key is not None:
+                event.cache_hit = result is not step_cache.MISSING
+
+            if result is step_cache.MISSING:
+                result = await action.perform_async(*args, executor=self, playbook=playbook, **kwargs)
+                if key is not None:
+                    cache.set(key, result, ttl=playbook.cache.ttl)
+
+            self.extract_vars(data=result, vars=playbook.result)
+        except Exception as e:
+            event.finish(error=e)
+            for hook in hooks:
+                hook.on_error(event)
+            raise
+
+        event.finish()
+        for hook in hooks:
+            hook.after_step(event)
+        return result
+
+    def wait_for(self, result: Any) -> Any:
+        """
+        Wait for the result of an action from synchronous code.
+
+        Synchronous code running in a worker thread, e.g. a playbook called as an LLM tool,
+        waits for awaitable results in the event loop of the executor.
+
+        Args:
+            result (Any): The result of an action.
+
+        Returns:
+            Any: The awaited result, or the result as is if it's not awaitable.
+        """
+        if inspect.isawaitable(result):
+            return _asyncio.run_sync(result, loop=self._loop)
+        return result
+
+
+async def execute_async(
+    playbook: Union[str, Playbook],
+    variables={},
+    dataflow: bool = False,
+    hooks: Optional[List[StepHook]] = None,
+    checkpoint: Optional[Checkpoint] = None
+) -> Any:
+    """
+    Executes a playbook asynchronously with optional initial variables.
+
+    Playbooks executed with `execute_async` can run concurrently in the same event loop:
+
+    ```python
+    results = await asyncio.gather(*[execute_async(p) for p in playbooks])
+    ```
+
+    Args:
+        playbook (Union[str, Playbook]): The playbook or the path to the playbook file to be executed.
+        variables (dict, optional): A dictionary of initial variables to set in
+            the executor's context before executing the playbook. Defaults to an
+            empty dictionary.
+        dataflow (bool, optional): Run independent steps concurrently, see `PlaybookExecutor`.
+        hooks (Optional[List[StepHook]]): Hooks called around every step, e.g. a `Profiler`.
+        checkpoint (Optional[Checkpoint]): Save a checkpoint after every top-level step, and
+            resume from the saved checkpoint, see `iauto.actions.checkpoint`. Not supported
+            with `dataflow`.
+
+    Returns:
+        Any: The result of executing the playbook.
+
+    Raises:
+        ValueError: If a checkpoint is given in dataflow mode.
+    """
+    if dataflow and checkpoint is not None:
+        raise ValueError("Checkpoints are not supported in dataflow mode.")
+
+    playbook_fname = None
+    if isinstance(playbook, str):
+        playbook_fname = playbook
+        playbook = playbook_load(playbook, copy=False)
+
+    executor = AsyncPlaybookExecutor(dataflow=dataflow)
+    executor.set_variable("__file__", playbook_fname)
+    for hook in hooks or []:
+        executor.add_hook(hook)
 
     if variables is not None:
         for k, v in variables.items():
             executor.set_variable(f"${k}", v)
 
-    return executor.perform(playbook=playbook)
+    plan = executor.compile(playbook)
+    if checkpoint is None:
+        return await executor.perform(playbook=plan)
+
+    executor.checkpoint = checkpoint
+    checkpoint.start(executor, plan)
+    result = await executor.perform(playbook=plan)
+    checkpoint.clear()
+    return result
 
 
 _thread_executor = ThreadPoolExecutor()
@@ -377,36 +781,89 @@ def execute_in_thread(playbook, variables={}):
     return future
 
 
-def process_worker(queue, execute_kwargs):
-    ret = execute(**execute_kwargs)
-    queue.put(ret)
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+# The playbooks submitted by `execute_in_process`, to cancel them on shutdown.
+_process_futures: "weakref.WeakSet[Future]" = weakref.WeakSet()
 
 
-class ProcessFuture:
-    def __init__(self, process, queue) -> None:
-        self._process = process
-        self._queue = queue
+def _init_process_worker(preload: Optional[List[str]] = None):
+    # Load iauto and the actions once per worker process, instead of once per playbook. The modules
+    # of lazily registered actions are only imported on first use, so resolve them here.
+    import iauto  # noqa: F401
 
-    def done(self):
-        return not self._process.is_alive()
+    if preload is None:
+        action_loader.actions
+        return
+    for name in preload:
+        try:
+            action_loader.get(name)
+        except ImportError as e:
+            _log.debug(f"Skip action {name}: {e}")
 
-    def running(self):
-        return self._process.is_alive()
 
-    def result(self):
-        return self._queue.get()
+def get_process_pool(max_workers: Optional[int] = None, preload: Optional[List[str]] = None) -> ProcessPoolExecutor:
+    """
+    Get the pool of worker processes used by `execute_in_process`.
 
+    Worker processes are started once, with iauto and the actions already loaded, and are
+    reused by later playbooks. A broken pool, e.g. a worker was killed, is replaced.
 
-def execute_in_process(playbook, variables={}):
-    queue = multiprocessing.Queue()
-    kwargs = {
-        "queue": queue,
-        "execute_kwargs": {
-            "playbook": playbook,
-            "variables": variables
-        }
-    }
-    process = multiprocessing.Process(target=process_worker, kwargs=kwargs)
-    process.start()
-    future = ProcessFuture(process=process, queue=queue)
+    Args:
+        max_workers (Optional[int]): The maximum number of worker processes, only used when
+            the pool is created. Defaults to the number of CPUs.
+        preload (Optional[List[str]]): The names of the actions loaded by each worker process,
+            only used when the pool is created. Defaults to all registered actions, actions
+            whose dependencies are not installed are skipped.
+
+    Returns:
+        ProcessPoolExecutor: The process pool.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or getattr(_process_pool, "_broken", False):
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_process_worker,
+                initargs=(preload,)
+            )
+        return _process_pool
+
+
+def shutdown_process_pool(wait: bool = True, cancel_futures: bool = False) -> None:
+    """
+    Shut down the worker processes of `execute_in_process`.
+
+    Args:
+        wait (bool): Wait for the running playbooks to complete.
+        cancel_futures (bool): Cancel the playbooks that have not started yet.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+        futures = list(_process_futures) if cancel_futures else []
+    if pool is not None:
+        # `shutdown(cancel_futures=True)` requires Python 3.9, started playbooks can't be cancelled.
+        for f in futures:
+            f.cancel()
+        pool.shutdown(wait=wait)
+
+
+def execute_in_process(playbook, variables={}) -> Future:
+    """
+    Executes a playbook in a worker process.
+
+    Playbooks are run by a persistent pool of worker processes, see `get_process_pool`.
+    The variables and the result must be picklable.
+
+    Args:
+        playbook (Union[str, Playbook]): The playbook or the path to the playbook file to be executed.
+        variables (dict, optional): The initial variables of the playbook.
+
+    Returns:
+        Future: The future of the result, supports `done`, `result(timeout)` and `cancel`.
+    """
+    future = get_process_pool().submit(execute, playbook=playbook, variables=variables)
+    with _process_pool_lock:
+        _process_futures.add(future)
     return future
@@ -0,0 +1,95 @@
+"""
+Hooks called by the executor around every step of a playbook.
+
+A hook receives a `StepEvent` before a step is performed, and after it completed or
+failed. Hooks are added with `Executor.add_hook`, see `Profiler` for a built-in hook
+that collects timing statistics. Executors without hooks don't pay for them.
+"""
+
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class StepEvent:
+    """
+    The execution of a step.
+
+    Attributes:
+        playbook (Plan): The playbook node of the step.
+        name (str): The name of the action.
+        args_size (int): The approximate size in bytes of the evaluated arguments, not including
+            the objects referenced by containers.
+        start (float): The time when the step started, in seconds since the epoch.
+        wall_time (Optional[float]): The elapsed time of the step in seconds, None before it completes.
+        cpu_time (Optional[float]): The CPU time of the step's thread in seconds, None before it completes.
+            Steps of the `AsyncPlaybookExecutor` share a thread, so their CPU time is approximate.
+        error (Optional[BaseException]): The error raised by the step, if any.
+        thread_id (int): The identifier of the thread that performed the step.
+        cache_hit (Optional[bool]): Whether the result was found in the cache, None if the step
+            is not cached, see `iauto.actions.cache`.
+    """
+
+    __slots__ = (
+        "playbook", "name", "args_size", "start", "wall_time", "cpu_time", "error", "thread_id",
+        "cache_hit", "_wall_start", "_cpu_start"
+    )
+
+    def __init__(self, playbook: Any, args: List, kwargs: Dict) -> None:
+        self.playbook = playbook
+        self.name = playbook.name
+        self.args_size = args_size(args, kwargs)
+        self.start = time.time()
+        self.wall_time: Optional[float] = None
+        self.cpu_time: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self.thread_id = threading.get_ident()
+        self.cache_hit: Optional[bool] = None
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Record the elapsed time of the step, and the error if the step failed."""
+        self.wall_time = time.perf_counter() - self._wall_start
+        self.cpu_time = time.thread_time() - self._cpu_start
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"StepEvent(name={self.name!r}, wall_time={self.wall_time!r}, cpu_time={self.cpu_time!r})"
+
+
+def args_size(args: List, kwargs: Dict) -> int:
+    """
+    Get the approximate size of the evaluated arguments of a step.
+
+    Args:
+        args (List): The positional arguments.
+        kwargs (Dict): The keyword arguments.
+
+    Returns:
+        int: The sum of the sizes in bytes of the arguments.
+    """
+    size = 0
+    for v in args:
+        size += sys.getsizeof(v)
+    for v in kwargs.values():
+        size += sys.getsizeof(v)
+    return size
+
+
+class StepHook:
+    """
+    Base class for hooks, override the methods of the events to handle.
+
+    Hooks may be called from several threads at the same time, e.g. by the `parallel` action.
+    """
+
+    def before_step(self, event: StepEvent) -> None:
+        """Called before the action of a step is performed."""
+
+    def after_step(self, event: StepEvent) -> None:
+        """Called after a step completed."""
+
+    def on_error(self, event: StepEvent) -> None:
+        """Called after a step failed, the error is `event.error`."""
@@ -1,18 +1,43 @@
 import importlib
-from typing import Dict, Union
+from typing import Dict, Iterable, List, Optional, Union
 
-from .action import Action, create
+from ..log import get_logger
+from .action import Action, ActionSpec, create
+
+_log = get_logger("loader")
+
+
+class LazyAction:
+    """
+    A registered action whose module is imported on first use.
+
+    Attributes:
+        name (str): The name of the action.
+        module (str): The module that registers the action when it's imported.
+        spec (Optional[ActionSpec]): The specification of the action, if known without importing.
+    """
+
+    __slots__ = ("name", "module", "spec")
+
+    def __init__(self, name: str, module: str, spec: Optional[ActionSpec] = None) -> None:
+        self.name = name
+        self.module = module
+        self.spec = spec
+
+    def __repr__(self) -> str:
+        return f"LazyAction(name={self.name!r}, module={self.module!r})"
 
 
 class ActionLoader:
     """Manages the registration and retrieval of action instances.
 
     This class provides a mechanism to register actions by name and retrieve them.
-    It keeps an internal dictionary that maps action names to action instances.
+    It keeps an internal dictionary that maps action names to action instances, or to
+    `LazyAction` descriptors of actions whose module is not imported yet.
     """
 
     def __init__(self) -> None:
-        self._actions = {}
+        self._actions: Dict[str, Union[Action, LazyAction]] = {}
 
     def register(self, actions: Dict[str, Action]):
         """
@@ -24,26 +49,71 @@ class ActionLoader:
         """
         self._actions.update(actions)
 
+    def register_lazy(self, module: str, names: Iterable[str]):
+        """
+        Registers the actions of a module without importing it.
+
+        The module is imported by the first `get` of one of the actions, and must register
+        them when it's imported, e.g. with `register`. Use it for modules with expensive
+        dependencies, so `import iauto` doesn't pay for actions that are not used.
+
+        Args:
+            module (str): The full name of the module, e.g. `iauto.actions.contrib.browser`.
+            names (Iterable[str]): The names of the actions the module registers.
+        """
+        for name in names:
+            if not isinstance(self._actions.get(name), Action):
+                self._actions[name] = LazyAction(name=name, module=module)
+
+    def _resolve(self, lazy: LazyAction) -> Union[Action, None]:
+        importlib.import_module(lazy.module)
+        action = self._actions.get(lazy.name)
+        if isinstance(action, LazyAction):
+            _log.warning(f"Action not registered by {lazy.module}: {lazy.name}")
+            self._actions.pop(lazy.name, None)
+            return None
+        return action
+
     def get(self, name) -> Union[Action, None]:
         """
-        Retrieves an action instance by its name.
+        Retrieves an action instance by its name, importing its module if it's not imported yet.
 
         Args:
             name (str): The name of the action to retrieve.
 
         Returns:
             Action or None: The action instance if found, otherwise None.
+
+        Raises:
+            ImportError: If the module of the action or one of its dependencies can't be imported.
         """
-        return self._actions.get(name)
+        action = self._actions.get(name)
+        if isinstance(action, LazyAction):
+            action = self._resolve(action)
+        return action
+
+    @property
+    def names(self) -> List[str]:
+        """Gets the names of all registered actions, without importing their modules."""
+        return list(self._actions.keys())
 
     @property
     def actions(self):
         """Gets a list of all registered action instances.
 
+        The modules of lazily registered actions are imported, actions whose dependencies
+        are not installed are skipped.
+
         Returns:
             list: A list of Action instances.
         """
-        return [a for a in self._actions.values()]
+        for a in list(self._actions.values()):
+            if isinstance(a, LazyAction):
+                try:
+                    self._resolve(a)
+                except ImportError as e:
+                    _log.debug(f"Skip action {a.name}: {e}")
+        return [a for a in self._actions.values() if not isinstance(a, LazyAction)]
 
     def load(self, identifier):
         """
@@ -68,7 +138,7 @@ class ActionLoader:
         if pkg != '':
             action = getattr(pkg, ss[-1])()
             name = action.definition.name
-            if name in self._actions:
+            if isinstance(self._actions.get(name), Action):
                 raise ValueError(f"Action name conflic: {name}")
             self._actions[name] = action
 
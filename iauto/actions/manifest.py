@@ -0,0 +1,205 @@
+"""
+A cached manifest of the specs of the registered actions.
+
+Listing the actions needs their specs, which are only known after importing the
+modules of lazily registered actions, e.g. Playwright for the browser actions. The
+manifest is a JSON file of the specs of all registered actions, including those of
+modules loaded with `ia --load`. It's rebuilt only when it's stale: when the version
+of iauto, the registered action names, or a module that defines an action changed, or
+when a missing dependency of a skipped action, e.g. `playwright`, was installed.
+
+```python
+from iauto.actions import manifest
+
+for spec in manifest.specs().values():
+    print(spec.name)
+```
+
+The default path of the manifest is `$IA_ACTIONS_MANIFEST`, or `~/.cache/iauto/actions.json`.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from ..log import get_logger
+from .action import Action, ActionSpec, FunctionAction
+from .loader import ActionLoader, LazyAction, loader
+
+VERSION = 2
+
+_log = get_logger("manifest")
+
+
+def default_path() -> str:
+    """The default path of the manifest: `$IA_ACTIONS_MANIFEST`, or `~/.cache/iauto/actions.json`."""
+    return os.environ.get("IA_ACTIONS_MANIFEST") or os.path.join(
+        os.path.expanduser("~"), ".cache", "iauto", "actions.json")
+
+
+def _package_version() -> str:
+    from .. import VERSION as package_version
+    return package_version
+
+
+def _module_of(action: Action) -> str:
+    if isinstance(action, FunctionAction):
+        return getattr(action._func, "__module__", None) or type(action).__module__
+    return type(action).__module__
+
+
+def _module_stat(name: str) -> Optional[List]:
+    module = sys.modules.get(name)
+    fname = getattr(module, "__file__", None)
+    if fname is None:
+        return None
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return [fname, st.st_mtime_ns, st.st_size]
+
+
+def _importable(name: Optional[str]) -> bool:
+    # Whether a module that was missing can be imported now, without importing it. Other import
+    # errors, e.g. a name missing from a module, don't record a module to wait for.
+    if name is None:
+        return False
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _is_fresh(data: Dict[str, Any], names: List[str]) -> bool:
+    if data.get("version") != VERSION or data.get("package_version") != _package_version():
+        return False
+    if data.get("names") != names:
+        return False
+
+    for skipped in data.get("skipped", {}).values():
+        if _importable(skipped.get("missing")):
+            return False
+
+    for stat in data.get("modules", {}).values():
+        if stat is None:
+            continue
+        fname, mtime, size = stat
+        try:
+            st = os.stat(fname)
+        except OSError:
+            return False
+        if st.st_mtime_ns != mtime or st.st_size != size:
+            return False
+    return True
+
+
+def build(action_loader: Optional[ActionLoader] = None) -> Dict[str, Any]:
+    """
+    Build the manifest of the registered actions, importing the modules of lazy actions.
+
+    Args:
+        action_loader (Optional[ActionLoader]): The loader of the actions, the global loader by default.
+
+    Returns:
+        Dict[str, Any]: The manifest.
+    """
+    action_loader = action_loader or loader
+    names = sorted(action_loader.names)
+
+    actions = {}
+    modules = {}
+    skipped = {}
+    for name in names:
+        try:
+            action = action_loader.get(name)
+        except ImportError as e:
+            _log.debug(f"Skip action {name}: {e}")
+            missing = e.name if isinstance(e, ModuleNotFoundError) else None
+            skipped[name] = {"error": str(e), "missing": missing}
+            continue
+        if action is None:
+            continue
+
+        module = _module_of(action)
+        if module not in modules:
+            modules[module] = _module_stat(module)
+        actions[name] = {"module": module, "spec": action.spec.model_dump()}
+
+    return {
+        "version": VERSION,
+        "package_version": _package_version(),
+        "names": names,
+        "modules": modules,
+        "actions": actions,
+        "skipped": skipped
+    }
+
+
+def _write(data: Dict[str, Any], path: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        _log.debug(f"Can't write the action manifest: {path}, {e}")
+
+
+def load(path: Optional[str] = None, action_loader: Optional[ActionLoader] = None) -> Dict[str, Any]:
+    """
+    Load the manifest, it's rebuilt and saved if it's missing or stale.
+
+    Args:
+        path (Optional[str]): The path of the manifest file, see `default_path`.
+        action_loader (Optional[ActionLoader]): The loader of the actions, the global loader by default.
+
+    Returns:
+        Dict[str, Any]: The manifest.
+    """
+    action_loader = action_loader or loader
+    path = path or default_path()
+    names = sorted(action_loader.names)
+
+    data = None
+    if os.path.isfile(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+
+    if data is None or not _is_fresh(data, names):
+        data = build(action_loader=action_loader)
+        _write(data, path)
+    return data
+
+
+def specs(path: Optional[str] = None, action_loader: Optional[ActionLoader] = None) -> Dict[str, ActionSpec]:
+    """
+    Get the specs of the registered actions from the manifest.
+
+    The specs of lazily registered actions are also set to their `LazyAction` descriptors.
+
+    Args:
+        path (Optional[str]): The path of the manifest file, see `default_path`.
+        action_loader (Optional[ActionLoader]): The loader of the actions, the global loader by default.
+
+    Returns:
+        Dict[str, ActionSpec]: The specs by action name, sorted by name.
+    """
+    action_loader = action_loader or loader
+    data = load(path=path, action_loader=action_loader)
+
+    result = {}
+    for name in sorted(data["actions"].keys()):
+        spec = ActionSpec.model_validate(data["actions"][name]["spec"])
+        result[name] = spec
+
+        lazy = action_loader._actions.get(name)
+        if isinstance(lazy, LazyAction) and lazy.spec is None:
+            lazy.spec = spec
+    return result
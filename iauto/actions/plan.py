@@ -0,0 +1,302 @@
+"""
+Compiled execution plans for playbooks.
+
+A `Plan` is an immutable, pre-resolved form of a `Playbook` tree. Compiling binds
+every action reference once, freezes literal arguments and pre-parses templated
+arguments, so that executing a step in a tight `repeat` or `each` loop does not
+re-interpret the pydantic model on every iteration.
+
+A `Plan` exposes the same attributes as `Playbook` (`name`, `args`, `actions`,
+`result`, `spec`, `concurrency`, `metadata`, `resolve_path`), so actions that receive it as their
+`playbook` argument keep working unchanged.
+
+A `Plan` doesn't keep a reference to the pydantic model it was compiled from, the
+`Playbook` is only needed for validation, dumping and the API. Use `Plan.to_playbook`
+to convert it back. Nodes with equal metadata share a single dict, e.g. the `__root__`
+stamped into every node of a playbook file.
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .action import Action
+from .cache import CacheOptions
+from .playbook import Playbook
+from .template import parse as parse_template
+
+
+def _materialize(value):
+    # Literal containers are rebuilt on every evaluation, exactly as `eval_vars` does,
+    # so actions that mutate their arguments can't leak state into the next iteration.
+    if isinstance(value, list):
+        return [_materialize(x) for x in value]
+    elif isinstance(value, dict):
+        return {k: _materialize(v) for k, v in value.items()}
+    else:
+        return value
+
+
+def _is_container(value) -> bool:
+    return isinstance(value, (list, dict))
+
+
+def _compile_value(value) -> Tuple[bool, Any]:
+    """
+    Compile an argument value.
+
+    Returns:
+        Tuple[bool, Any]: `(True, value)` if the value is a literal that needs no evaluation,
+            otherwise `(False, func)` where `func(executor)` evaluates the value.
+    """
+    if isinstance(value, str):
+        if value.startswith("$"):
+            ss = value.split(".")
+            head = ss[0]
+            attrs = tuple(ss[1:])
+
+            def _var(executor, value=value, head=head, attrs=attrs):
+                o = executor.variables.get(head)
+                if o is None:
+                    return value
+                for s in attrs:
+                    if isinstance(o, dict):
+                        o = o.get(s)
+                    else:
+                        o = getattr(o, s) if hasattr(o, s) else None
+                return value if o is None else o
+            return False, _var
+        elif "{" in value or "}" in value:
+            template = parse_template(value)
+            if template.is_static:
+                return True, template.render({})
+            return False, lambda executor: template.render(executor.variables)
+        else:
+            return True, value
+    elif isinstance(value, list):
+        items = [_compile_value(x) for x in value]
+        if all(static for static, _ in items):
+            return True, [v for _, v in items]
+
+        funcs = [_as_func(x) for x in items]
+        return False, lambda executor: [f(executor) for f in funcs]
+    elif isinstance(value, dict):
+        pairs = [(_compile_value(k), _compile_value(v)) for k, v in value.items()]
+        if all(k[0] and v[0] for k, v in pairs):
+            return True, {k[1]: v[1] for k, v in pairs}
+
+        if all(k[0] for k, _ in pairs):
+            # Keys are almost always literals, only the values need to be evaluated.
+            items = [(k[1], _as_func(v)) for k, v in pairs]
+            return False, lambda executor: {k: v(executor) for k, v in items}
+
+        funcs = [(_as_func(k), _as_func(v)) for k, v in pairs]
+        return False, lambda executor: {k(executor): v(executor) for k, v in funcs}
+    else:
+        return True, value
+
+
+def _as_func(compiled: Tuple[bool, Any]) -> Callable:
+    static, value = compiled
+    if not static:
+        return value
+    elif _is_container(value):
+        values = value.values() if isinstance(value, dict) else value
+        if any(_is_container(x) for x in values):
+            return lambda executor: _materialize(value)
+        copy = value.copy
+        return lambda executor: copy()
+    else:
+        return lambda executor: value
+
+
+class Arguments:
+    """
+    Pre-compiled playbook arguments.
+
+    Evaluating an `Arguments` instance produces the same positional and keyword
+    arguments as `PlaybookExecutor.eval_args` does for the raw arguments.
+    """
+
+    __slots__ = ("_func", "_shape")
+
+    def __init__(self, args: Union[str, List, Dict, None] = None) -> None:
+        static, value = _compile_value(args)
+        self._func = _as_func((static, value))
+
+        # The shape of list and dict arguments is known ahead of time, other values are
+        # only known after evaluation, e.g. a `$var` that references a list.
+        if args is None:
+            self._shape = None
+        elif isinstance(args, list):
+            self._shape = list
+        elif isinstance(args, dict):
+            self._shape = dict
+        else:
+            self._shape = object
+
+    def evaluate(self, executor) -> Tuple[List, Dict]:
+        """
+        Evaluate the arguments in the context of the executor.
+
+        Args:
+            executor (Executor): The executor whose variables are used for evaluation.
+
+        Returns:
+            Tuple[List, Dict]: A tuple containing a list of positional arguments and a
+                dictionary of keyword arguments.
+        """
+        shape = self._shape
+        if shape is None:
+            return [], {}
+        elif shape is list:
+            return self._func(executor), {}
+        elif shape is dict:
+            return [], self._func(executor)
+
+        evaled = self._func(executor)
+        if evaled is None:
+            return [], {}
+        elif isinstance(evaled, list):
+            return evaled, {}
+        elif isinstance(evaled, dict):
+            return [], evaled
+        else:
+            return [evaled], {}
+
+
+def _compile_result(result):
+    # Normalize the `result` spec once, `extract_vars` then finds stripped names.
+    if isinstance(result, str):
+        return result.strip() if result.strip().startswith("$") else None
+    elif isinstance(result, list):
+        return [v.strip() if isinstance(v, str) and v.strip().startswith("$") else None for v in result]
+    elif isinstance(result, dict):
+        return dict([(k.strip(), v) for k, v in result.items() if isinstance(k, str) and k.strip().startswith("$")])
+    else:
+        return result
+
+
+class Plan:
+    """
+    An immutable, compiled node of a playbook.
+
+    Attributes:
+        name (Optional[str]): The name of the action.
+        description (Optional[str]): The description of the playbook.
+        args (Union[str, List, Dict, None]): The raw arguments, as defined in the playbook.
+        arguments (Arguments): The pre-compiled arguments.
+        actions (Optional[Tuple[Plan]]): The compiled child actions.
+        result (Union[str, List, Dict, None]): The normalized result spec.
+        spec (Optional[ActionSpec]): The function spec of the playbook.
+        concurrency (Optional[int]): The maximum number of workers of concurrent flow actions.
+        cache (Optional[CacheOptions]): The options of the result cache, None if caching is disabled.
+        cache_key (Optional[Arguments]): The pre-compiled `key` of the cache options.
+        metadata (Dict): The metadata of the playbook, shared by nodes with equal metadata, must
+            not be modified.
+        action (Optional[Action]): The action bound at compile time, None if the action was not found.
+    """
+
+    __slots__ = (
+        "name", "description", "args", "arguments", "actions", "result",
+        "spec", "concurrency", "cache", "cache_key", "metadata", "action", "_result", "_cache", "__weakref__"
+    )
+
+    def __init__(
+        self,
+        playbook: Playbook,
+        action: Optional[Action],
+        actions: Optional[Tuple['Plan', ...]],
+        metadata: Optional[Dict] = None
+    ) -> None:
+        _set = object.__setattr__
+        _set(self, "name", playbook.name)
+        _set(self, "description", playbook.description)
+        _set(self, "args", playbook.args)
+        _set(self, "arguments", Arguments(playbook.args))
+        _set(self, "actions", actions)
+        _set(self, "result", _compile_result(playbook.result))
+        _set(self, "spec", playbook.spec)
+        _set(self, "concurrency", playbook.concurrency)
+        cache = CacheOptions.from_value(playbook.cache)
+        _set(self, "cache", cache)
+        _set(self, "cache_key", Arguments(cache.key) if cache is not None and cache.key is not None else None)
+        _set(self, "metadata", playbook.metadata if metadata is None else metadata)
+        _set(self, "action", action)
+        # The raw values are kept for `to_playbook`.
+        _set(self, "_result", playbook.result)
+        _set(self, "_cache", playbook.cache)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Plan is immutable, can't set attribute: {name}")
+
+    def __repr__(self) -> str:
+        return f"Plan(name={self.name!r})"
+
+    def to_playbook(self) -> Playbook:
+        """
+        Convert the plan back to a playbook, e.g. to dump or validate it.
+
+        Returns:
+            Playbook: A new playbook tree equal to the one the plan was compiled from.
+        """
+        return Playbook.model_construct(
+            name=self.name,
+            description=self.description,
+            args=self.args,
+            actions=[a.to_playbook() for a in self.actions] if self.actions is not None else None,
+            result=self._result,
+            spec=self.spec,
+            concurrency=self.concurrency,
+            cache=self._cache,
+            metadata=dict(self.metadata)
+        )
+
+    def resolve_path(self, path: str) -> str:
+        """
+        Resolves a potentially relative path to an absolute path using the playbook's metadata.
+
+        Args:
+            path (str): The file path that may be relative or absolute.
+
+        Returns:
+            str: The absolute path resolved from the given path and the playbook's metadata root.
+        """
+        if os.path.isabs(path):
+            return path
+        return os.path.join(self.metadata["__root__"], path)
+
+
+def compile(playbook: Union[Playbook, Plan], get_action: Callable[[Any], Optional[Action]]) -> Plan:
+    """
+    Compile a playbook tree into an execution plan.
+
+    Args:
+        playbook (Union[Playbook, Plan]): The playbook to compile. A Plan is returned as is.
+        get_action (Callable): A function that resolves the action of a playbook node,
+            usually `Executor.get_action`.
+
+    Returns:
+        Plan: The compiled plan.
+    """
+    if isinstance(playbook, Plan):
+        return playbook
+    return _compile(playbook, get_action, [])
+
+
+def _compile(playbook: Playbook, get_action: Callable[[Any], Optional[Action]], metadatas: List[Dict]) -> Plan:
+    # Reuse an equal metadata dict of the tree, there are usually one or two
+    # distinct ones.
+    metadata = playbook.metadata
+    for m in metadatas:
+        if m == metadata:
+            metadata = m
+            break
+    else:
+        if len(metadatas) < 8:
+            metadatas.append(metadata)
+
+    actions = None
+    if playbook.actions is not None:
+        actions = tuple(_compile(a, get_action, metadatas) for a in playbook.actions)
+
+    return Plan(playbook=playbook, action=get_action(playbook), actions=actions, metadata=metadata)
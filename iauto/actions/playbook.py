@@ -1,6 +1,9 @@
 import json
+import marshal
 import os
-from typing import Any, Dict, List, Optional, Union
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from pydantic import BaseModel
 
@@ -21,6 +24,8 @@ KEY_ACTIONS = "actions"
 KEY_RESULT = "result"
 KEY_DESCRIPTION = "description"
 KEY_SPEC = "spec"
+KEY_CONCURRENCY = "concurrency"
+KEY_CACHE = "cache"
 
 
 class Playbook(BaseModel):
@@ -34,6 +39,9 @@ class Playbook(BaseModel):
         actions (Optional[List['Playbook']]): A list of actions (playbooks) to be executed.
         result (Union[str, List, Dict, None]): The result of the playbook execution.
         spec (Optional[ActionSpec]): The function spec of the playbook.
+        concurrency (Optional[int]): The maximum number of workers of concurrent flow actions,
+            like `parallel` and `each`.
+        cache (Union[bool, int, float, Dict, None]): Memoize the result of the step, see `iauto.actions.cache`.
         metadata (Optional[Dict]): The metadata of the playbook.
     """
 
@@ -43,6 +51,8 @@ class Playbook(BaseModel):
     actions: Optional[List['Playbook']] = None
     result: Union[str, List, Dict, None] = None
     spec: Optional[ActionSpec] = None
+    concurrency: Optional[int] = None
+    cache: Union[bool, int, float, Dict, None] = None
     metadata: Dict[str, Any] = {}
 
     def resolve_path(self, path: str) -> str:
@@ -91,6 +101,8 @@ def from_dict(d: Dict) -> Playbook:
         playbook.description = pb.get(KEY_DESCRIPTION)
         playbook.args = pb.get(KEY_ARGS)
         playbook.result = pb.get(KEY_RESULT)
+        playbook.concurrency = pb.get(KEY_CONCURRENCY)
+        playbook.cache = pb.get(KEY_CACHE)
 
         data_actions = pb.get(KEY_ACTIONS)
         if data_actions is not None:
@@ -114,15 +126,68 @@ def from_dict(d: Dict) -> Playbook:
     return playbook
 
 
-def load(fname: str) -> Playbook:
+_cache: Dict[str, Tuple[Tuple[int, int], Playbook]] = {}
+_cache_lock = threading.Lock()
+
+
+def load(fname: str, copy: bool = True) -> Playbook:
     """Load a playbook from file.
 
+    Parsed playbooks are cached by absolute path, modification time and size, so a
+    file is only parsed again after it changes. See `invalidate`.
+
     Attributes:
         fname (str): Path to the YAML/JSON file containing the playbook.
+        copy (bool): Return a copy of the cached playbook that can be modified. Set to False to
+            get the cached playbook, shared by all callers, for read-only use, e.g. to execute it.
 
     Returns:
         playbook (Playbook): The loaded playbook.
     """
+    path = os.path.abspath(fname)
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is None or cached[0] != key:
+        playbook = _load(fname)
+        with _cache_lock:
+            _cache[path] = (key, playbook)
+    else:
+        playbook = cached[1]
+
+    return playbook.model_copy(deep=True) if copy else playbook
+
+
+def invalidate(fname: Optional[str] = None) -> None:
+    """Remove a playbook from the cache of `load`.
+
+    Attributes:
+        fname (Optional[str]): Path to the playbook file, None to clear the cache.
+    """
+    with _cache_lock:
+        if fname is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(fname), None)
+
+
+def _load(fname: str) -> Playbook:
+    ext = fname[fname.rfind(".") + 1:].lower()
+
+    if ext == COMPILED_EXT[1:]:
+        playbook, _ = _read_compiled(fname)
+        return playbook
+
+    compiled = _load_compiled_if_fresh(fname)
+    if compiled is not None:
+        return compiled
+
+    return _load_source(fname)
+
+
+def _load_source(fname: str) -> Playbook:
     ext = fname[fname.rfind(".") + 1:].lower()
 
     with open(fname, 'r', encoding='utf-8') as f:
@@ -140,6 +205,111 @@ def load(fname: str) -> Playbook:
     return playbook
 
 
+COMPILED_EXT = ".pbc"
+"""The extension appended to the file name of a playbook for its compiled file."""
+
+COMPILED_VERSION = 1
+"""The version of the compiled format, compiled files of other versions are ignored."""
+
+_COMPILED_MAGIC = b"IAPB"
+# magic, format version, marshal version, source mtime in ns, source size
+_COMPILED_HEADER = struct.Struct("<4sHHqq")
+
+
+def _to_tuple(playbook: Playbook) -> tuple:
+    return (
+        playbook.name,
+        playbook.description,
+        playbook.args,
+        playbook.result,
+        playbook.spec.model_dump() if playbook.spec is not None else None,
+        playbook.concurrency,
+        playbook.cache,
+        tuple([_to_tuple(a) for a in playbook.actions]) if playbook.actions is not None else None,
+    )
+
+
+def _from_tuple(data: tuple) -> Playbook:
+    name, description, args, result, spec, concurrency, cache, actions = data
+    # The data was validated when the playbook was compiled.
+    return Playbook.model_construct(
+        name=name,
+        description=description,
+        args=args,
+        result=result,
+        spec=ActionSpec.from_dict(spec) if spec is not None else None,
+        concurrency=concurrency,
+        cache=cache,
+        actions=[_from_tuple(a) for a in actions] if actions is not None else None,
+        metadata={}
+    )
+
+
+def compile_file(fname: str) -> str:
+    """Compile a playbook file into the compiled format, for faster loading.
+
+    The compiled file is written next to the playbook file, with `COMPILED_EXT` appended
+    to its name. `load` uses the compiled file as long as the playbook file is unchanged.
+
+    Attributes:
+        fname (str): Path to the YAML/JSON file containing the playbook.
+
+    Returns:
+        str: The path of the compiled file.
+
+    Raises:
+        ValueError: If the playbook contains values that can't be compiled, e.g. dates.
+    """
+    st = os.stat(fname)
+    playbook = _load_source(fname)
+    try:
+        data = marshal.dumps(_to_tuple(playbook))
+    except ValueError as e:
+        raise ValueError(f"Playbook can't be compiled: {fname}, {e}")
+
+    header = _COMPILED_HEADER.pack(_COMPILED_MAGIC, COMPILED_VERSION, marshal.version, st.st_mtime_ns, st.st_size)
+
+    compiled_fname = fname + COMPILED_EXT
+    tmp = compiled_fname + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(data)
+    os.replace(tmp, compiled_fname)
+    return compiled_fname
+
+
+def _read_compiled(fname: str) -> Tuple[Playbook, Tuple[int, int]]:
+    with open(fname, "rb") as f:
+        data = f.read()
+
+    header_size = _COMPILED_HEADER.size
+    if len(data) < header_size:
+        raise ValueError(f"Invalid compiled playbook: {fname}")
+    magic, version, marshal_version, mtime, size = _COMPILED_HEADER.unpack(data[:header_size])
+    if magic != _COMPILED_MAGIC or version != COMPILED_VERSION or marshal_version != marshal.version:
+        raise ValueError(f"Unsupported compiled playbook: {fname}")
+
+    playbook = _from_tuple(marshal.loads(data[header_size:]))
+    _resolve_path(playbook=playbook, root=os.path.dirname(fname))
+    return playbook, (mtime, size)
+
+
+def _load_compiled_if_fresh(fname: str) -> Optional[Playbook]:
+    compiled_fname = fname + COMPILED_EXT
+    if not os.path.isfile(compiled_fname):
+        return None
+
+    try:
+        playbook, source = _read_compiled(compiled_fname)
+    except Exception:
+        return None
+
+    st = os.stat(fname)
+    if source != (st.st_mtime_ns, st.st_size):
+        return None
+    return playbook
+
+
 def dump(playbook: Playbook, fname: str, format: str = "yaml"):
     """Dump a playbook to a file.
 
@@ -0,0 +1,164 @@
+"""
+A step hook that collects timing statistics of playbook executions.
+
+```python
+profiler = Profiler()
+executor.add_hook(profiler)
+executor.perform(playbook)
+
+print(profiler.report())
+profiler.dump_chrome_trace("trace.json")
+```
+
+The trace can be opened with `chrome://tracing` or https://ui.perfetto.dev.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List
+
+from .hooks import StepEvent, StepHook
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Get the percentile of sorted values, with linear interpolation.
+
+    Args:
+        values (List[float]): The sorted values, must not be empty.
+        p (float): The percentile, from 0 to 100.
+
+    Returns:
+        float: The percentile.
+    """
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class Profiler(StepHook):
+    """
+    Collects the timing of every step, per action aggregates and Chrome trace events.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._events: List[StepEvent] = []
+
+    def after_step(self, event: StepEvent) -> None:
+        with self._lock:
+            self._events.append(event)
+
+    def on_error(self, event: StepEvent) -> None:
+        with self._lock:
+            self._events.append(event)
+
+    @property
+    def events(self) -> List[StepEvent]:
+        """The completed and failed steps, in order of completion."""
+        with self._lock:
+            return list(self._events)
+
+    def reset(self) -> None:
+        """Clear the collected steps."""
+        with self._lock:
+            self._events = []
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the aggregates of the steps per action.
+
+        The time of a step includes the time of its child actions, e.g. the time of a
+        `repeat` step includes the time of the steps it repeats.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The aggregates of each action: `count`, `errors`,
+                `total`, `mean`, `min`, `max`, `p50`, `p90`, `p99` of the wall time and
+                `cpu` of the total CPU time, in seconds, `args_size` in bytes, and the
+                `cache_hits` and `cache_misses` of cached steps.
+        """
+        by_name: Dict[str, List[StepEvent]] = {}
+        for e in self.events:
+            by_name.setdefault(e.name, []).append(e)
+
+        stats = {}
+        for name, events in by_name.items():
+            times = sorted([e.wall_time or 0 for e in events])
+            total = sum(times)
+            stats[name] = {
+                "count": len(events),
+                "errors": len([e for e in events if e.error is not None]),
+                "total": total,
+                "mean": total / len(times),
+                "min": times[0],
+                "max": times[-1],
+                "p50": percentile(times, 50),
+                "p90": percentile(times, 90),
+                "p99": percentile(times, 99),
+                "cpu": sum([e.cpu_time or 0 for e in events]),
+                "args_size": sum([e.args_size for e in events]),
+                "cache_hits": len([e for e in events if e.cache_hit is True]),
+                "cache_misses": len([e for e in events if e.cache_hit is False]),
+            }
+        return stats
+
+    def report(self) -> str:
+        """
+        Format the aggregates as a table, the slowest actions first.
+
+        Returns:
+            str: The report.
+        """
+        stats = self.stats()
+        lines = [
+            f"{'action':<32} {'count':>7} {'errors':>6} {'total(s)':>10} {'mean(ms)':>10} "
+            f"{'p50(ms)':>10} {'p90(ms)':>10} {'p99(ms)':>10} {'cpu(s)':>10} {'hits':>6} {'misses':>6}"
+        ]
+        for name, s in sorted(stats.items(), key=lambda x: x[1]["total"], reverse=True):
+            lines.append(
+                f"{name:<32} {s['count']:>7} {s['errors']:>6} {s['total']:>10.3f} {s['mean'] * 1000:>10.3f} "
+                f"{s['p50'] * 1000:>10.3f} {s['p90'] * 1000:>10.3f} {s['p99'] * 1000:>10.3f} {s['cpu']:>10.3f} "
+                f"{s['cache_hits']:>6} {s['cache_misses']:>6}"
+            )
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Get the steps as Chrome trace events, one complete event per step.
+
+        Returns:
+            Dict[str, Any]: The trace in the Trace Event Format.
+        """
+        pid = os.getpid()
+        trace_events = []
+        for e in self.events:
+            args = {"args_size": e.args_size, "cpu_time_ms": (e.cpu_time or 0) * 1000}
+            if e.error is not None:
+                args["error"] = repr(e.error)
+            if e.cache_hit is not None:
+                args["cache_hit"] = e.cache_hit
+            trace_events.append({
+                "name": e.name,
+                "cat": "action",
+                "ph": "X",
+                "ts": e.start * 1000000,
+                "dur": (e.wall_time or 0) * 1000000,
+                "pid": pid,
+                "tid": e.thread_id,
+                "args": args
+            })
+        trace_events.sort(key=lambda x: x["ts"])
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def dump_chrome_trace(self, fname: str) -> None:
+        """
+        Write the Chrome trace events to a JSON file.
+
+        Args:
+            fname (str): The file name.
+        """
+        with open(fname, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
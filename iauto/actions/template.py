@@ -0,0 +1,136 @@
+"""
+Pre-parsed string templates for playbook arguments.
+
+Strings like `"Hello {$name}, today is {$now}"` are parsed once into literal and
+lookup segments. Rendering looks up only the referenced variables, instead of
+copying the whole variable table into a `dict` subclass for `str.format_map`.
+
+The rendered result is the same as `template.format_map(SafeDict(variables))`,
+variables that are not found are rendered as `{name}`.
+"""
+
+from functools import lru_cache
+from string import Formatter
+from typing import Mapping
+
+import _string
+
+_formatter = Formatter()
+_MISSING = object()
+
+
+class _Lookup:
+    """A read-only view of the variables for `str.format_map`, missing keys render as is."""
+
+    __slots__ = ("_variables",)
+
+    def __init__(self, variables: Mapping) -> None:
+        self._variables = variables
+
+    def __getitem__(self, key):
+        value = self._variables.get(key, _MISSING)
+        if value is _MISSING:
+            return '{' + key + '}'
+        return value
+
+
+class Template:
+    """
+    A parsed string template.
+
+    The template is compiled into a positional format string, e.g. `"Hello {$name}"`
+    becomes `"Hello {0}"`, which is rendered with the values of the referenced names only.
+
+    Attributes:
+        source (str): The template string.
+        names (tuple): The names of the variables referenced by the template.
+    """
+
+    __slots__ = ("source", "names", "_format", "_missing", "_fallback")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self._fallback = False
+
+        parts = []
+        names = []
+        try:
+            for literal, field_name, format_spec, conversion in _formatter.parse(source):
+                if literal:
+                    parts.append(literal.replace("{", "{{").replace("}", "}}"))
+                if field_name is None:
+                    continue
+
+                first, _ = _string.formatter_field_name_split(field_name)
+                if not isinstance(first, str) or first == "" or (format_spec and "{" in format_spec):
+                    # Positional fields and nested format specs are left to `str.format_map`.
+                    self._fallback = True
+                    break
+
+                if first not in names:
+                    names.append(first)
+
+                field = str(names.index(first)) + field_name[len(first):]
+                if conversion:
+                    field += "!" + conversion
+                if format_spec:
+                    field += ":" + format_spec
+                parts.append("{" + field + "}")
+        except ValueError:
+            # Invalid templates raise the same error as `str.format_map` at render time.
+            self._fallback = True
+
+        self.names = tuple(names)
+        self._format = "".join(parts)
+        self._missing = tuple(['{' + n + '}' for n in names])
+
+    @property
+    def is_static(self) -> bool:
+        """Whether the template renders to the same string regardless of the variables."""
+        return not self._fallback and len(self.names) == 0
+
+    def render(self, variables: Mapping) -> str:
+        """
+        Render the template with the given variables.
+
+        Args:
+            variables (Mapping): The variables to look up the referenced names from.
+
+        Returns:
+            str: The rendered string.
+        """
+        if self._fallback:
+            return self.source.format_map(_Lookup(variables))
+
+        return self._format.format(*map(variables.get, self.names, self._missing))
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+
+@lru_cache(maxsize=4096)
+def parse(source: str) -> Template:
+    """
+    Parse a template string, parsed templates are cached.
+
+    Args:
+        source (str): The template string.
+
+    Returns:
+        Template: The parsed template.
+    """
+    return Template(source)
+
+
+def render(source: str, variables: Mapping) -> str:
+    """
+    Render a template string with the given variables.
+
+    Args:
+        source (str): The template string.
+        variables (Mapping): The variables to render with.
+
+    Returns:
+        str: The rendered string.
+    """
+    return parse(source).render(variables)
@@ -0,0 +1,131 @@
+"""
+Scoped variables for executors.
+
+Variables are resolved through a chain of layers, from the innermost to the outermost:
+
+* block frames: locals of a block, e.g. `$_` of an `each` loop or the arguments of a
+  sub-playbook. They are created in O(1) and freed when the block exits.
+* the run layer: variables of one execution, e.g. `__file__` and the variables passed
+  to `execute`.
+* the environment layer: a shared, read-only snapshot of `os.environ`, where the
+  environment variable `NAME` is visible as `$NAME`. It's built once per process
+  instead of being copied into every execution.
+
+Assigning a variable updates the innermost frame that already defines it, otherwise
+the variable is set in the run layer. So a block can read and update the variables of
+its parent, but its own locals don't leak into the parent's namespace.
+
+The chain of an isolated worker, e.g. an item of a concurrent `each`, has its own write
+layer instead: the variables it assigns, other than its locals, are set in that layer,
+so concurrent workers don't overwrite each other's variables. See `Executor.merge`.
+"""
+
+import os
+from collections import ChainMap
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+_environ: Optional[Mapping[str, str]] = None
+
+
+def environ() -> Mapping[str, str]:
+    """
+    Get the environment layer shared by all executors.
+
+    The layer is a read-only snapshot of `os.environ` taken on first use, the environment
+    variable `NAME` is visible as `$NAME`. Call `refresh_environ` after changing `os.environ`.
+
+    Returns:
+        Mapping[str, str]: The environment variables.
+    """
+    if _environ is None:
+        refresh_environ()
+    return _environ  # type: ignore
+
+
+def refresh_environ() -> None:
+    """Take a new snapshot of `os.environ` for the environment layer."""
+    global _environ
+    _environ = MappingProxyType(dict([(f"${k}", v) for k, v in os.environ.items()]))
+
+
+class Variables(ChainMap):
+    """
+    A chain of variable layers: `[frame_n, ..., frame_1, run, environ]`.
+
+    Use `new_child` to create a block frame, and `run` to access the run layer.
+    """
+
+    def __init__(self, *maps) -> None:
+        if len(maps) == 0:
+            maps = ({}, environ())
+        super().__init__(*maps)
+        self._writes: Optional[Dict[str, Any]] = None
+
+    @property
+    def run(self) -> Dict[str, Any]:
+        """The run layer."""
+        return self.maps[-2]
+
+    @property
+    def writes(self) -> Dict[str, Any]:
+        """The layer where new variables are set, the run layer unless the chain is isolated."""
+        return self._writes if self._writes is not None else self.maps[-2]
+
+    @property
+    def locals(self) -> Dict[str, Any]:
+        """The innermost layer, the run layer if there is no block frame."""
+        return self.maps[0]
+
+    def get(self, key, default=None):
+        for m in self.maps:
+            if key in m:
+                return m[key]
+        return default
+
+    def __setitem__(self, key, value) -> None:
+        writes = self.writes
+        for m in self.maps[:-2]:
+            if m is writes:
+                break
+            if key in m:
+                m[key] = value
+                return
+        writes[key] = value
+
+    def __delitem__(self, key) -> None:
+        for m in self.maps[:-1]:
+            if key in m:
+                del m[key]
+                return
+        raise KeyError(key)
+
+    def new_child(self, m: Optional[Dict[str, Any]] = None) -> 'Variables':  # type: ignore
+        """
+        Create a new chain with a block frame on top of the current layers.
+
+        Args:
+            m (Optional[Dict[str, Any]]): The locals of the frame.
+
+        Returns:
+            Variables: The new chain, the current layers are shared, not copied.
+        """
+        child = self.__class__(m if m is not None else {}, *self.maps)
+        child._writes = self._writes
+        return child
+
+    def new_isolated(self, m: Optional[Dict[str, Any]] = None) -> 'Variables':
+        """
+        Create a new chain with a block frame and a write layer on top of the current layers.
+
+        Args:
+            m (Optional[Dict[str, Any]]): The locals of the frame.
+
+        Returns:
+            Variables: The new chain, the variables assigned through it are set in its write
+                layer, the current layers are not modified.
+        """
+        writes: Dict[str, Any] = {}
+        child = self.__class__(m if m is not None else {}, writes, *self.maps)
+        child._writes = writes
+        return child
@@ -80,8 +80,8 @@ def create_agent(
         "tools": []
     }
 
-    if session.actions and len(session.actions) > 0:
-        llm_config["tools"] = [a.spec.oai_spec() for a in session.actions]
+    if len(session.tools) > 0:
+        llm_config["tools"] = list(session.tools.oai_specs)
 
     agent = None
     if type == "assistant":
@@ -72,9 +72,8 @@ class AgentExecutor:
         )
 
         function_map = {}
-        if self._session.actions:
-            for func in self._session.actions:
-                function_map[func.spec.name.replace(".", "_")] = func
+        for func in self._session.tools.actions:
+            function_map[func.spec.name.replace(".", "_")] = func
         self._user_proxy.register_function(function_map)
 
         if len(self._agents) == 1:
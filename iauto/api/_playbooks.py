@@ -0,0 +1,20 @@
+import os
+from typing import Dict, List
+
+from ..actions.catalog import get_catalog
+from ._api import api
+
+
+@api.get("/playbooks")
+def list_playbooks() -> List[Dict]:
+    """List the playbooks of `IA_PLAYBOOK_DIR`."""
+    playbooks_dir = os.environ.get("IA_PLAYBOOK_DIR")
+    if not playbooks_dir or not os.path.isdir(playbooks_dir):
+        return []
+
+    return [{
+        "name": e.name,
+        "description": e.description,
+        "path": e.path,
+        "spec": e.spec.model_dump() if e.spec is not None else None
+    } for e in get_catalog(playbooks_dir).entries()]
@@ -1,11 +1,19 @@
-from .llm import LLM, ChatMessage, Message
+from .context import ContextWindow
+from .llm import (LLM, ChatMessage, ChatMessageChunk, Message, chat_batch,
+                  merge_chunks)
 from .llm_factory import create_llm
 from .session import Session
+from .tools import ToolCatalog
 
 __all__ = [
     "LLM",
     "ChatMessage",
+    "ChatMessageChunk",
+    "ContextWindow",
     "Message",
     "Session",
-    "create_llm"
+    "ToolCatalog",
+    "chat_batch",
+    "create_llm",
+    "merge_chunks"
 ]
@@ -0,0 +1,382 @@
+"""
+Continuous batching of the requests of a llama.cpp model.
+
+A `BatchScheduler` owns a llama.cpp context with a KV cache sequence per request,
+and decodes the pending requests of all sessions together: every step evaluates
+one batch with the next token of every generating request, and the prompt tokens
+of the requests that were just admitted. New requests join the batch as soon as a
+sequence is free, without waiting for the others to complete, and the tokens are
+streamed back to each caller as they're sampled.
+
+The scheduler uses the weights of a `llama_cpp.Llama`, and its multi-sequence
+batch API. Sampling is done with numpy: temperature, top-k and top-p. Chat prompts
+are formatted with the chat template of the model.
+"""
+
+import codecs
+import ctypes
+import queue
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import llama_cpp
+import numpy as np
+from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+
+from ..log import get_logger
+
+_log = get_logger("LLaMA")
+
+
+def _seq_rm(ctx, seq_id: int) -> None:
+    # The name of the function changed with the versions of llama.cpp.
+    if hasattr(llama_cpp, "llama_memory_seq_rm"):
+        llama_cpp.llama_memory_seq_rm(llama_cpp.llama_get_memory(ctx), seq_id, -1, -1)
+    elif hasattr(llama_cpp, "llama_kv_self_seq_rm"):
+        llama_cpp.llama_kv_self_seq_rm(ctx, seq_id, -1, -1)
+    else:
+        llama_cpp.llama_kv_cache_seq_rm(ctx, seq_id, -1, -1)
+
+
+class BatchRequest:
+    """
+    A completion request of a scheduler, iterate it to get the generated text.
+
+    Attributes:
+        finish_reason (Optional[str]): `stop` or `length`, set when the generation completes.
+        prompt_tokens (int): The number of tokens of the prompt.
+        completion_tokens (int): The number of generated tokens.
+        cancelled (bool): Set to stop the generation and release the sequence of the request,
+            set when the iteration stops early.
+    """
+
+    def __init__(
+        self,
+        tokens: List[int],
+        max_tokens: int,
+        temperature: float,
+        top_k: int,
+        top_p: float,
+        stop: List[str]
+    ) -> None:
+        self.tokens = tokens
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.stop = stop
+
+        self.finish_reason: Optional[str] = None
+        self.prompt_tokens = len(tokens)
+        self.completion_tokens = 0
+        self.cancelled = False
+
+        self._seq_id = -1
+        self._n_past = 0
+        self._text = ""
+        self._sent = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # The caller stopped reading, e.g. the generator was closed.
+            self.cancelled = True
+
+    def _append(self, piece: bytes) -> bool:
+        # Stream the text, without the stop strings and the text that may be the start of one.
+        self._text += self._decoder.decode(piece)
+        for s in self.stop:
+            i = self._text.find(s, max(self._sent - len(s), 0))
+            if i >= 0:
+                self._text = self._text[:i]
+                self._flush(len(self._text))
+                return True
+
+        hold = max((len(s) - 1 for s in self.stop), default=0)
+        self._flush(len(self._text) - hold)
+        return False
+
+    def _flush(self, end: int) -> None:
+        if end > self._sent:
+            self._queue.put(self._text[self._sent:end])
+            self._sent = end
+
+    def _finish(self, reason: str) -> None:
+        self.finish_reason = reason
+        self._flush(len(self._text))
+        self._queue.put(None)
+
+
+class BatchScheduler:
+    """
+    Schedules the completion requests of the sessions of a llama.cpp model in shared batches.
+    """
+
+    def __init__(self, llm: llama_cpp.Llama, parallel: int = 4, n_ctx: int = 4096, n_batch: int = 512) -> None:
+        """
+        Create a scheduler.
+
+        Args:
+            llm (llama_cpp.Llama): The model, its weights and vocabulary are used, not its context.
+            parallel (int): The maximum number of requests generated together.
+            n_ctx (int): The context size of a request, the prompt and the generated tokens.
+            n_batch (int): The maximum number of tokens evaluated by a step.
+        """
+        if parallel < 1:
+            raise ValueError(f"Invalid parallel: {parallel}")
+
+        self.llm = llm
+        self.parallel = parallel
+        self.n_ctx = n_ctx
+        self.n_batch = n_batch
+
+        params = llama_cpp.llama_context_default_params()
+        params.n_ctx = n_ctx * parallel
+        params.n_batch = n_batch
+        if hasattr(params, "n_ubatch"):
+            params.n_ubatch = n_batch
+        if hasattr(params, "n_seq_max"):
+            params.n_seq_max = parallel
+        params.n_threads = llm.context_params.n_threads
+        params.n_threads_batch = llm.context_params.n_threads_batch
+
+        new_context = getattr(llama_cpp, "llama_init_from_model", None) or llama_cpp.llama_new_context_with_model
+        self._ctx = new_context(llm.model, params)
+        if not self._ctx:
+            raise ValueError("Failed to create the llama.cpp context.")
+
+        self._batch = llama_cpp.llama_batch_init(n_batch, 0, parallel)
+        self._n_vocab = llm.n_vocab()
+        self._rng = np.random.default_rng()
+
+        eos = llm.token_eos()
+        if hasattr(llama_cpp, "llama_vocab_is_eog"):
+            vocab = llama_cpp.llama_model_get_vocab(llm.model)
+            self._is_eog = lambda t: bool(llama_cpp.llama_vocab_is_eog(vocab, t))
+        elif hasattr(llama_cpp, "llama_token_is_eog"):
+            self._is_eog = lambda t: bool(llama_cpp.llama_token_is_eog(llm.model, t))
+        else:
+            self._is_eog = lambda t: t == eos
+
+        self._formatter = None
+        template = llm.metadata.get("tokenizer.chat_template")
+        if template is not None:
+            self._formatter = Jinja2ChatFormatter(
+                template=template,
+                eos_token=llm._model.token_get_text(eos),
+                bos_token=llm._model.token_get_text(llm.token_bos())
+            )
+
+        self._pending: Deque[BatchRequest] = deque()
+        self._active: List[BatchRequest] = []
+        self._free_seqs = list(range(parallel - 1, -1, -1))
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="iauto-llama-batch", daemon=True)
+        self._thread.start()
+
+    def chat(self, messages: List[Dict[str, Any]], **kwargs) -> BatchRequest:
+        """
+        Submit a chat completion request, formatted with the chat template of the model.
+
+        Args:
+            messages (List[Dict[str, Any]]): The messages, with role and content.
+            **kwargs: The sampling arguments of `submit`.
+
+        Returns:
+            BatchRequest: The request, iterate it to get the generated text.
+        """
+        if self._formatter is None:
+            raise ValueError("The model has no chat template.")
+
+        r = self._formatter(messages=messages)
+        stop = list(kwargs.pop("stop", None) or [])
+        if isinstance(r.stop, str):
+            stop.append(r.stop)
+        elif r.stop:
+            stop.extend(r.stop)
+        return self.submit(r.prompt, add_bos=not getattr(r, "added_special", False), stop=stop, **kwargs)
+
+    def submit(
+        self,
+        prompt: str,
+        add_bos: bool = True,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.8,
+        top_k: int = 40,
+        top_p: float = 0.95,
+        stop: Optional[List[str]] = None
+    ) -> BatchRequest:
+        """
+        Submit a completion request.
+
+        Args:
+            prompt (str): The prompt.
+            add_bos (bool): Whether to add the BOS token, if the prompt doesn't include it.
+            max_tokens (Optional[int]): The maximum number of generated tokens, None to fill the context.
+            temperature (float): The sampling temperature, 0 to pick the most likely token.
+            top_k (int): Sample from the k most likely tokens, 0 for all the tokens.
+            top_p (float): Sample from the most likely tokens whose probabilities add up to p.
+            stop (Optional[List[str]]): Strings that end the generation.
+
+        Returns:
+            BatchRequest: The request, iterate it to get the generated text.
+        """
+        tokens = self.llm.tokenize(prompt.encode("utf-8"), add_bos=add_bos, special=True)
+        if len(tokens) >= self.n_ctx:
+            raise ValueError(f"Prompt too long: {len(tokens)} tokens, context: {self.n_ctx}")
+
+        max_tokens = self.n_ctx - len(tokens) if max_tokens is None else min(max_tokens, self.n_ctx - len(tokens))
+        request = BatchRequest(
+            tokens=tokens,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_k=top_k,
+            top_p=top_p,
+            stop=[s for s in (stop or []) if s]
+        )
+        with self._cond:
+            if self._closed:
+                raise ValueError("Scheduler closed.")
+            self._pending.append(request)
+            self._cond.notify()
+        return request
+
+    def close(self) -> None:
+        """Stop the scheduler, and release the llama.cpp context."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+        error = ValueError("Scheduler closed.")
+        for r in list(self._pending) + self._active:
+            r._queue.put(error)
+
+        llama_cpp.llama_batch_free(self._batch)
+        llama_cpp.llama_free(self._ctx)
+        if hasattr(self.llm, "close"):
+            self.llm.close()
+
+    def _admit(self) -> bool:
+        with self._cond:
+            while len(self._pending) == 0 and len(self._active) == 0 and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return False
+            while len(self._pending) > 0 and len(self._free_seqs) > 0:
+                r = self._pending.popleft()
+                if r.cancelled:
+                    continue
+                r._seq_id = self._free_seqs.pop()
+                self._active.append(r)
+        return True
+
+    def _release(self, r: BatchRequest) -> None:
+        _seq_rm(self._ctx, r._seq_id)
+        self._active.remove(r)
+        with self._cond:
+            self._free_seqs.append(r._seq_id)
+
+    def _run(self) -> None:
+        while self._admit():
+            for r in [r for r in self._active if r.cancelled]:
+                self._release(r)
+
+            try:
+                logits = self._step()
+            except Exception as e:
+                _log.warning(f"Batch decode failed: {e}")
+                for r in list(self._active):
+                    r._queue.put(e)
+                    self._release(r)
+                continue
+
+            for r, i in logits.items():
+                self._sample(r, i)
+
+    def _step(self) -> Dict[BatchRequest, int]:
+        # Generating requests add their last token, the prompts of new requests fill the rest of the batch.
+        batch = self._batch
+        n = 0
+        logits: Dict[BatchRequest, int] = {}
+
+        def _add(r: BatchRequest, token: int, output: bool) -> None:
+            nonlocal n
+            batch.token[n] = token
+            batch.pos[n] = r._n_past
+            batch.n_seq_id[n] = 1
+            batch.seq_id[n][0] = r._seq_id
+            batch.logits[n] = output
+            if output:
+                logits[r] = n
+            r._n_past += 1
+            n += 1
+
+        for r in self._active:
+            if r.completion_tokens > 0 and n < self.n_batch:
+                _add(r, r.tokens[r._n_past], True)
+
+        for r in self._active:
+            while r._n_past < len(r.tokens) and n < self.n_batch:
+                _add(r, r.tokens[r._n_past], r._n_past == len(r.tokens) - 1)
+
+        if n == 0:
+            return logits
+
+        batch.n_tokens = n
+        ret = llama_cpp.llama_decode(self._ctx, batch)
+        if ret != 0:
+            raise ValueError(f"llama_decode failed: {ret}")
+        return logits
+
+    def _sample(self, r: BatchRequest, i: int) -> None:
+        ptr = llama_cpp.llama_get_logits_ith(self._ctx, i)
+        logits = np.ctypeslib.as_array(ctypes.cast(ptr, ctypes.POINTER(ctypes.c_float)), shape=(self._n_vocab,))
+
+        if r.temperature <= 0:
+            token = int(np.argmax(logits))
+        else:
+            token = self._sample_top(logits, r)
+
+        r.completion_tokens += 1
+        if self._is_eog(token):
+            r._finish("stop")
+            self._release(r)
+            return
+
+        r.tokens.append(token)
+        if r._append(self.llm.detokenize([token])):
+            r._finish("stop")
+            self._release(r)
+        elif r.completion_tokens >= r.max_tokens:
+            r._finish("length")
+            self._release(r)
+
+    def _sample_top(self, logits: np.ndarray, r: BatchRequest) -> int:
+        top_k = r.top_k if 0 < r.top_k < len(logits) else len(logits)
+        candidates = np.argpartition(logits, -top_k)[-top_k:]
+        scores = logits[candidates].astype(np.float64) / r.temperature
+
+        order = np.argsort(-scores)
+        candidates, scores = candidates[order], scores[order]
+        probs = np.exp(scores - scores[0])
+        probs /= probs.sum()
+
+        if r.top_p < 1.0:
+            keep = int(np.searchsorted(np.cumsum(probs), r.top_p)) + 1
+            candidates, probs = candidates[:keep], probs[:keep] / probs[:keep].sum()
+        return int(self._rng.choice(candidates, p=probs))
@@ -1,33 +1,56 @@
-from typing import List, Optional
+from typing import Iterator, List, Union
 
 from ..actions import ActionSpec
 from . import _qwen
-from .llm import ChatMessage, Function, ToolCall
+from .llm import LLM, ChatMessage, ChatMessageChunk, Function, ToolCall
 from .openai import OpenAI
+from .tools import ToolCatalog
+
+
+def _fix_messages(messages: List[ChatMessage]):
+    # Fix bug for qwen fastchat
+    for m in messages:
+        if m.role == "tool":
+            m.role = "user"
+
+        if m.tool_call_id:
+            m.content += f"\ntool_call_id: {m.tool_call_id}"
+            m.tool_call_id = None
+        if m.tool_calls:
+            m.content += f"\ntool_calls: {m.tool_calls}"
+            m.tool_calls = None
 
 
 class QWen(OpenAI):
-    def chat(self, messages: List[ChatMessage] = [], tools: Optional[List[ActionSpec]] = None, **kwargs) -> ChatMessage:
-        # Fix bug for qwen fastchat
-        for m in messages:
-            if m.role == "tool":
-                m.role = "user"
+    def chat_stream(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> Iterator[ChatMessageChunk]:
+        if ToolCatalog.of(tools) is not None:
+            # Tool calls are parsed from the complete response.
+            return LLM.chat_stream(self, messages=messages, tools=tools, **kwargs)
+
+        _fix_messages(messages)
+        return super().chat_stream(messages, **kwargs)
 
-            if m.tool_call_id:
-                m.content += f"\ntool_call_id: {m.tool_call_id}"
-                m.tool_call_id = None
-            if m.tool_calls:
-                m.content += f"\ntool_calls: {m.tool_calls}"
-                m.tool_calls = None
+    def chat(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> ChatMessage:
+        _fix_messages(messages)
 
-        if tools is None or len(tools) == 0:
+        tools = ToolCatalog.of(tools)
+        if tools is None:
             return super().chat(messages, **kwargs)
 
         # tools call
-        tools_description = [t.oai_spec() for t in tools]
         qe_messages = [m.model_dump() for m in messages]
-        # qe_messages = _qwen.parse_messages(messages=qe_messages, functions=tools_description)
-        func_prompt = _qwen.generate_function_instructions(functions=tools_description)
+        # qe_messages = _qwen.parse_messages(messages=qe_messages, functions=tools.oai_specs)
+        func_prompt = tools.render("qwen", _qwen.generate_function_instructions)
         qe_messages.insert(0, {"role": "system", "content": func_prompt})
 
         messages = [ChatMessage.from_dict(m) for m in qe_messages]
@@ -1,7 +1,9 @@
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
+from .. import _asyncio
 from ..actions import Action, ActionSpec, Executor, Playbook, loader
-from .llm import ChatMessage
+from .context import ContextWindow
+from .llm import ChatMessage, ChatMessageChunk, chat_batch
 from .llm_factory import create_llm
 from .session import Session
 
@@ -31,6 +33,18 @@ class CreateSessionAction(Action):
                     "type": "List[str]",
                     "description": "Optional list of tools to include in the session for LLM function calling.",
                     "default": None
+                },
+                {
+                    "name": "cache",
+                    "type": "dict",
+                    "description": "Cache the responses of identical requests in the database, true or the options of the cache: ttl, force.",  # noqa: E501
+                    "default": None
+                },
+                {
+                    "name": "context",
+                    "type": "dict",
+                    "description": "Select the history sent to the LLM within a token budget, the options of the context window: max_tokens, summarize, summary_tokens.",  # noqa: E501
+                    "default": None
                 }
             ],
         })
@@ -41,6 +55,8 @@ class CreateSessionAction(Action):
         provider="openai",
         llm_args={},
         tools: Optional[List[str]] = None,
+        cache: Union[bool, Dict, None] = None,
+        context: Optional[Dict] = None,
         executor: Executor,
         playbook: Playbook,
         **kwargs
@@ -49,6 +65,9 @@ class CreateSessionAction(Action):
             raise ValueError("executor and playbook required.")
 
         llm = create_llm(provider=provider, **llm_args)
+        if cache:
+            from .cache import CachedLLM
+            llm = CachedLLM(llm, **(cache if isinstance(cache, dict) else {}))
 
         actions = []
 
@@ -72,7 +91,9 @@ class CreateSessionAction(Action):
                 else:
                     raise ValueError(f"Actions must be playbook, invalid action: {action_pb.name}")
 
-        session = Session(llm=llm, actions=actions)
+        context_window = ContextWindow(llm, **context) if context else None
+
+        session = Session(llm=llm, actions=actions, context=context_window)
         return session
 
 
@@ -113,6 +134,12 @@ class ChatAction(Action):
                     "type": "int",
                     "description": "Whether to expect a JSON response from the LLM.",
                     "default": 0
+                },
+                {
+                    "name": "callback",
+                    "type": "Callable",
+                    "description": "A function called with each chunk of the response as it's generated, enables streaming.",  # noqa: E501
+                    "required": False
                 }
             ],
         })
@@ -128,6 +155,7 @@ class ChatAction(Action):
         history: int = 5,
         rewrite: bool = False,
         expect_json: int = 0,
+        callback: Optional[Callable[[ChatMessageChunk], Any]] = None,
         **kwargs: Any
     ) -> Union[str, Any]:
         chat_messages = None
@@ -148,6 +176,7 @@ class ChatAction(Action):
             history=history,
             rewrite=rewrite,
             expect_json=expect_json,
+            callback=callback,
             **kwargs
         )
         if isinstance(m, dict) or isinstance(m, list):
@@ -155,6 +184,10 @@ class ChatAction(Action):
         else:
             return m.content if m is not None else None
 
+    async def perform_async(self, *args, **kwargs) -> Union[str, Any]:
+        # Sessions block on the LLM and call tools synchronously, so run them off the event loop.
+        return await _asyncio.to_thread(self.perform, *args, **kwargs)
+
 
 class ReactAction(Action):
     def __init__(self) -> None:
@@ -233,10 +266,85 @@ class ReactAction(Action):
         m = session.react(messages=chat_messages, history=history, rewrite=rewrite, log=log, **kwargs)
         return m.content
 
+    async def perform_async(self, *args, **kwargs) -> str:
+        # Sessions block on the LLM and call tools synchronously, so run them off the event loop.
+        return await _asyncio.to_thread(self.perform, *args, **kwargs)
+
+
+class BatchAction(Action):
+    def __init__(self) -> None:
+        super().__init__()
+
+        self.spec = ActionSpec.from_dict({
+            "name": "llm.batch",
+            "description": "Send independent prompts to an LLM concurrently, without history or tools, and return the responses in order.",  # noqa: E501
+            "arguments": [
+                {
+                    "name": "session",
+                    "type": "Session",
+                    "description": "The LLM session whose LLM answers the prompts.",
+                    "required": True
+                },
+                {
+                    "name": "prompts",
+                    "type": "List[str]",
+                    "description": "The prompts, a string or a list of messages with role and content each.",
+                    "required": True
+                },
+                {
+                    "name": "instructions",
+                    "type": "str",
+                    "description": "An optional system message sent with every prompt.",
+                    "default": None
+                },
+                {
+                    "name": "concurrency",
+                    "type": "int",
+                    "description": "The maximum number of requests in flight.",
+                    "default": 8
+                }
+            ],
+        })
+
+    async def perform_async(
+        self,
+        *args,
+        executor: Optional[Executor] = None,
+        playbook: Optional[Playbook] = None,
+        session: Session,
+        prompts: List[Union[str, List[Dict]]],
+        instructions: Optional[str] = None,
+        concurrency: int = 8,
+        **kwargs: Any
+    ) -> List[Union[str, Dict]]:
+        batch = []
+        for p in prompts:
+            if isinstance(p, str):
+                batch.append(p)
+            else:
+                batch.append([ChatMessage(role=m["role"], content=m["content"]) for m in p])
+
+        results = []
+        for r in await chat_batch(
+            session.llm, batch, concurrency=concurrency, instructions=instructions, **kwargs
+        ):
+            if isinstance(r, Exception):
+                results.append({"error": str(r)})
+            else:
+                results.append(r.content)
+        return results
+
+    def perform(self, *args, **kwargs) -> List[Union[str, Dict]]:
+        return _asyncio.run_sync(self.perform_async(*args, **kwargs))
+
 
 def register_actions():
     loader.register({
         "llm.session": CreateSessionAction(),
         "llm.chat": ChatAction(),
-        "llm.react": ReactAction()
+        "llm.react": ReactAction(),
+        "llm.batch": BatchAction()
     })
+
+
+register_actions()
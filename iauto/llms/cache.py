@@ -0,0 +1,287 @@
+"""
+A persistent cache of LLM responses.
+
+`CachedLLM` wraps any `LLM`, and returns the saved response of a chat request that
+was already answered: same provider, model, messages, tools and sampling parameters.
+Responses, including their tool calls and token usage, are saved to the `llm_cache`
+table of an `iauto.db.Persistence` database, with an in-memory LRU in front of it.
+
+```python
+llm = CachedLLM(create_llm(provider="openai"), ttl=24 * 3600)
+m = llm.chat(messages=[ChatMessage(role="user", content="Hello")])
+print(llm.stats.hit_rate)
+```
+
+Expired responses are removed when they are requested again, or by `purge`.
+
+Requests sampled with a `temperature` greater than 0 are not cached, unless `force`
+is set. Requests without a `temperature` are cached. Text generated by `generate` is
+not cached.
+
+The `sqlmodel` package is required.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlmodel import Field, SQLModel
+
+from .. import _asyncio
+from ..db import Persistence
+from .llm import LLM, ChatMessage, ChatMessageChunk, Message, merge_chunks
+from .tools import ToolCatalog
+
+
+class LLMCacheEntry(SQLModel, table=True):
+    """
+    A cached response.
+
+    Attributes:
+        key (str): The hash of the request.
+        model (str): The model of the response.
+        response (str): The response, a ChatMessage as JSON.
+        created_at (float): When the response was saved, seconds since the epoch.
+    """
+
+    __tablename__ = "llm_cache"
+
+    key: str = Field(primary_key=True)
+    model: str
+    response: str
+    created_at: float
+
+
+class CacheStats(BaseModel):
+    """
+    The metrics of a cache.
+
+    Attributes:
+        hits (int): The requests answered from the cache.
+        memory_hits (int): The hits answered by the in-memory LRU, without a database query.
+        misses (int): The requests sent to the LLM and saved.
+        bypassed (int): The requests sent to the LLM without using the cache, e.g. sampled with a temperature.
+    """
+
+    hits: int = 0
+    memory_hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The ratio of cacheable requests answered from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class CachedLLM(LLM):
+    """
+    An LLM that answers repeated chat requests from a persistent cache.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        persistence: Optional[Persistence] = None,
+        ttl: Optional[float] = None,
+        max_memory_entries: int = 1024,
+        force: bool = False
+    ) -> None:
+        """
+        Wrap an LLM.
+
+        Args:
+            llm (LLM): The LLM to cache the responses of.
+            persistence (Optional[Persistence]): The database of the cache, `Persistence.default()` by default.
+            ttl (Optional[float]): The time to live of the responses in seconds, None to keep them forever.
+            max_memory_entries (int): The maximum number of responses kept in memory.
+            force (bool): Cache sampled requests too, whatever their temperature.
+        """
+        super().__init__()
+        self._llm = llm
+        self._persistence = persistence or Persistence.default()
+        self.ttl = ttl
+        self.force = force
+        self.stats = CacheStats()
+
+        self._max_memory_entries = max_memory_entries
+        self._memory: OrderedDict[str, Tuple[float, ChatMessage]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # The table is created even if the database was initialized before this module was imported.
+        LLMCacheEntry.__table__.create(self._persistence.engine, checkfirst=True)  # type: ignore
+
+    @property
+    def llm(self) -> LLM:
+        """The wrapped LLM."""
+        return self._llm
+
+    @property
+    def model(self) -> str:
+        return self._llm.model
+
+    def count_tokens(self, text: str) -> int:
+        return self._llm.count_tokens(text)
+
+    def generate(self, instructions: str, **kwargs) -> Message:
+        return self._llm.generate(instructions=instructions, **kwargs)
+
+    def _key(self, messages: List[ChatMessage], tools, kwargs) -> Optional[str]:
+        temperature = kwargs.get("temperature")
+        if temperature is None:
+            # An explicit None is the default temperature, same as omitting it.
+            kwargs = {k: v for k, v in kwargs.items() if k != "temperature"}
+        elif not self.force and temperature > 0:
+            return None
+
+        catalog = ToolCatalog.of(tools)
+        request = {
+            "provider": type(self._llm).__name__,
+            "model": self._llm.model,
+            "messages": [m.model_dump(exclude={"usage"}, exclude_none=True) for m in messages],
+            "tools": catalog.oai_specs if catalog is not None else None,
+            "kwargs": kwargs
+        }
+        try:
+            canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        except TypeError:
+            # Arguments that can't be serialized, e.g. a callback, can't be part of a key.
+            return None
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, created_at: float, message: ChatMessage) -> None:
+        with self._lock:
+            self._memory[key] = (created_at, message)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _get(self, key: str) -> Optional[ChatMessage]:
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+
+        if cached is not None and not self._expired(cached[0]):
+            with self._lock:
+                self.stats.hits += 1
+                self.stats.memory_hits += 1
+            return cached[1].model_copy(deep=True)
+
+        entry = self._persistence.get(LLMCacheEntry, key)
+        if entry is None:
+            return None
+        if self._expired(entry.created_at):
+            self._delete(key)
+            return None
+
+        m = ChatMessage.model_validate_json(entry.response)
+        self._remember(key, entry.created_at, m)
+        with self._lock:
+            self.stats.hits += 1
+        return m.model_copy(deep=True)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        with self._persistence.create_session() as session:
+            session.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key == key))  # type: ignore
+            session.commit()
+
+    def _put(self, key: str, message: ChatMessage) -> None:
+        created_at = time.time()
+        entry = LLMCacheEntry(
+            key=key,
+            model=self._llm.model,
+            response=message.model_dump_json(),
+            created_at=created_at
+        )
+        with self._persistence.create_session() as session:
+            session.merge(entry)
+            session.commit()
+
+        self._remember(key, created_at, message.model_copy(deep=True))
+        with self._lock:
+            self.stats.misses += 1
+
+    def _bypass(self) -> None:
+        with self._lock:
+            self.stats.bypassed += 1
+
+    def chat(self, messages: List[ChatMessage] = [], tools=None, **kwargs) -> ChatMessage:
+        key = self._key(messages, tools, kwargs)
+        if key is None:
+            self._bypass()
+            return self._llm.chat(messages=messages, tools=tools, **kwargs)
+
+        m = self._get(key)
+        if m is None:
+            m = self._llm.chat(messages=messages, tools=tools, **kwargs)
+            self._put(key, m)
+        return m
+
+    async def chat_async(self, messages: List[ChatMessage] = [], tools=None, **kwargs) -> ChatMessage:
+        key = self._key(messages, tools, kwargs)
+        if key is None:
+            self._bypass()
+            return await self._llm.chat_async(messages=messages, tools=tools, **kwargs)
+
+        m = await _asyncio.to_thread(self._get, key)
+        if m is None:
+            m = await self._llm.chat_async(messages=messages, tools=tools, **kwargs)
+            await _asyncio.to_thread(self._put, key, m)
+        return m
+
+    def chat_stream(self, messages: List[ChatMessage] = [], tools=None, **kwargs) -> Iterator[ChatMessageChunk]:
+        key = self._key(messages, tools, kwargs)
+        if key is None:
+            self._bypass()
+            yield from self._llm.chat_stream(messages=messages, tools=tools, **kwargs)
+            return
+
+        m = self._get(key)
+        if m is not None:
+            yield ChatMessageChunk.from_message(m)
+            return
+
+        chunks = []
+        for chunk in self._llm.chat_stream(messages=messages, tools=tools, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._put(key, merge_chunks(chunks))
+
+    def purge(self) -> int:
+        """
+        Remove the expired responses, expired responses are also removed when they are requested again.
+
+        Returns:
+            int: The number of responses removed from the database.
+        """
+        if self.ttl is None:
+            return 0
+
+        deadline = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, (created_at, _) in self._memory.items() if created_at < deadline]:
+                del self._memory[key]
+        with self._persistence.create_session() as session:
+            result = session.execute(delete(LLMCacheEntry).where(LLMCacheEntry.created_at < deadline))  # type: ignore
+            session.commit()
+            return result.rowcount
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._memory.clear()
+        with self._persistence.create_session() as session:
+            session.execute(delete(LLMCacheEntry))
+            session.commit()
@@ -1,43 +1,57 @@
 import json
 import os
-from typing import Iterator, List, Optional
+from typing import Iterator, List, Union
 
 import chatglm_cpp
 
 from ..actions import ActionSpec
 from ..log import DEBUG, get_logger
-from .llm import LLM, ChatMessage, Function, Message, ToolCall
+from .llm import (LLM, ChatMessage, ChatMessageChunk, Function, Message,
+                  ToolCall)
+from .pool import file_size, get_model_pool
+from .tools import ToolCatalog
 
-_model_cache = {}
+
+def _tools_json(specs):
+    return json.dumps(specs, ensure_ascii=False, indent=4)
 
 
 class ChatGLM(LLM):
-    def __init__(self, model_path) -> None:
+    """
+    chatglm.cpp: https://github.com/li-plus/chatglm.cpp
+
+    The pipelines of a model are shared through the model pool, see `iauto.llms.pool`, and
+    used by one thread at a time. `replicas` is the maximum number of pipelines loaded to
+    serve concurrent sessions.
+    """
+
+    def __init__(self, model_path, replicas: int = 1) -> None:
         super().__init__()
         if not os.path.isfile(model_path):
             raise ValueError(f"model_path must be a ggml file: {model_path}")
 
         self._model = model_path
-
-        self._llm = _model_cache.get(self._model)
-        if self._llm is None:
-            model = chatglm_cpp.Pipeline(model_path=self._model)
-            _model_cache[self._model] = model
-            self._llm = model
+        self._pooled = get_model_pool().model(
+            ("chatglm", os.path.abspath(model_path)),
+            lambda: chatglm_cpp.Pipeline(model_path=model_path),
+            size=file_size(model_path),
+            replicas=replicas
+        )
 
         self._log = get_logger("ChatGLM")
 
     def generate(self, instructions: str, **kwargs) -> Message:
         """"""
-        text = self._llm.generate(prompt=instructions, stream=False, **kwargs)
+        with self._pooled.acquire() as llm:
+            text = llm.generate(prompt=instructions, stream=False, **kwargs)
         if not isinstance(text, str):
             raise ValueError("Invalid generated result.")
         return Message(content=text)
 
-    def _function_call_retry(self, messages: List[chatglm_cpp.ChatMessage], retries=3, **kwargs):
+    def _function_call_retry(self, llm, messages: List[chatglm_cpp.ChatMessage], retries=3, **kwargs):
         r = None
         for i in range(retries):
-            r = self._llm.chat(messages=messages, stream=False, **kwargs)
+            r = llm.chat(messages=messages, stream=False, **kwargs)
             if isinstance(r, Iterator):
                 raise ValueError(f"Invalid chat result: {r}")
             if r.tool_calls is not None:
@@ -48,15 +62,20 @@ class ChatGLM(LLM):
                         self._log.warn(f"function_name is null, retry: {i + 1}")
         return r
 
-    def chat(self, messages: List[ChatMessage] = [], tools: Optional[List[ActionSpec]] = None, **kwargs) -> ChatMessage:
-        use_tools = tools is not None and len(tools) > 0
+    def chat(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> ChatMessage:
+        tools = ToolCatalog.of(tools)
+        use_tools = tools is not None
 
         if use_tools:
-            tools_desciption = [t.oai_spec() for t in tools]
             system_instructions = """
                 Answer the following questions as best as you can. You have access to the following tools:\n
             """
-            system_instructions += json.dumps(tools_desciption, ensure_ascii=False, indent=4)
+            system_instructions += tools.render("chatglm", _tools_json)
 
             messages.insert(-1, ChatMessage(
                 role="system",
@@ -71,10 +90,11 @@ class ChatGLM(LLM):
             chatglm_messages.append(chatglm_cpp.ChatMessage(role=role, content=m.content))
         if self._log.isEnabledFor(DEBUG):
             self._log.debug(chatglm_messages)
-        if use_tools:
-            r = self._function_call_retry(messages=chatglm_messages, **kwargs)
-        else:
-            r = self._llm.chat(messages=chatglm_messages, stream=False, **kwargs)
+        with self._pooled.acquire() as llm:
+            if use_tools:
+                r = self._function_call_retry(llm, messages=chatglm_messages, **kwargs)
+            else:
+                r = llm.chat(messages=chatglm_messages, stream=False, **kwargs)
 
         if not isinstance(r, chatglm_cpp.ChatMessage):
             raise ValueError(f"invalid message type: {r}, expected: ChatMessage")
@@ -109,6 +129,29 @@ class ChatGLM(LLM):
                 )
         return resp
 
+    def chat_stream(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> Iterator[ChatMessageChunk]:
+        if ToolCatalog.of(tools) is not None:
+            # Function calls are retried on the complete response.
+            yield from super().chat_stream(messages=messages, tools=tools, **kwargs)
+            return
+
+        chatglm_messages = []
+        for m in messages:
+            role = m.role
+            if role == "tool":
+                role = "user"
+            chatglm_messages.append(chatglm_cpp.ChatMessage(role=role, content=m.content))
+
+        with self._pooled.acquire() as llm:
+            for delta in llm.chat(messages=chatglm_messages, stream=True, **kwargs):
+                yield ChatMessageChunk(content=delta.content)
+        yield ChatMessageChunk(finish_reason="stop")
+
     @property
     def model(self) -> str:
         return self._model
@@ -0,0 +1,245 @@
+"""
+Token-budgeted context of LLM sessions.
+
+A `ContextWindow` selects the messages of the session history sent to the LLM by
+their number of tokens instead of their number, so a large message, e.g. a scraped
+page, doesn't overflow the context of the model:
+
+```python
+session = Session(llm=llm, context=ContextWindow(llm, max_tokens=4000, summarize=True))
+```
+
+The window is filled from the newest message to the oldest. System messages at the
+start of the history are always kept, and an assistant message with tool calls is
+kept or dropped together with the results of the calls. With `summarize`, the
+dropped messages are folded into a rolling summary sent as a system message.
+
+Tokens are counted with `LLM.count_tokens`, which uses the `tiktoken` encoding of
+the model if it's available, and an estimate otherwise.
+"""
+
+import functools
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from ..log import get_logger
+from .llm import LLM, ChatMessage
+
+# Tokens added by the chat format to every message, e.g. the role.
+MESSAGE_OVERHEAD = 4
+
+_log = get_logger("context")
+
+_cjk = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text without a tokenizer, about 4 characters per
+    token, and a token per CJK character.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    cjk = len(_cjk.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@functools.lru_cache(maxsize=32)
+def get_tokenizer(model: str) -> Callable[[str], int]:
+    """
+    Get the token counter of a model, created once per model.
+
+    Args:
+        model (str): The name of the model.
+
+    Returns:
+        Callable[[str], int]: Counts the tokens of a text, with the `tiktoken` encoding of the
+            model if it's available, `estimate_tokens` otherwise.
+    """
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        _log.debug(f"Tokenizer of {model} not available, estimate tokens instead: {e}")
+        return estimate_tokens
+
+    def _count(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _count
+
+
+class ContextWindow:
+    """
+    Selects the messages of a session history within a token budget.
+
+    Attributes:
+        llm (LLM): The LLM that counts the tokens, and writes the summaries.
+        max_tokens (int): The token budget of the messages.
+        summarize (bool): Whether to fold the dropped messages into a rolling summary.
+        summary_tokens (int): The maximum number of tokens of the summary.
+        summary (Optional[str]): The summary of the dropped messages.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        max_tokens: int,
+        summarize: bool = False,
+        summary_tokens: int = 256,
+        max_cached: int = 4096
+    ) -> None:
+        """
+        Create a context window.
+
+        Args:
+            llm (LLM): The LLM that counts the tokens, and writes the summaries.
+            max_tokens (int): The token budget of the messages, including the summary.
+            summarize (bool): Whether to fold the dropped messages into a rolling summary.
+            summary_tokens (int): The maximum number of tokens of the summary.
+            max_cached (int): The maximum number of message token counts kept.
+        """
+        if max_tokens <= 0:
+            raise ValueError(f"Invalid max_tokens: {max_tokens}")
+
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.summary_tokens = summary_tokens
+        self.summary: Optional[str] = None
+
+        # The number of messages at the start of the history covered by the summary.
+        self._summarized = 0
+        self._max_cached = max_cached
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of a text, the counts are cached.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        with self._lock:
+            n = self._counts.get(text)
+            if n is not None:
+                self._counts.move_to_end(text)
+                return n
+
+        n = self.llm.count_tokens(text)
+        with self._lock:
+            self._counts[text] = n
+            while len(self._counts) > self._max_cached:
+                self._counts.popitem(last=False)
+        return n
+
+    def count_message(self, message: ChatMessage) -> int:
+        """
+        Count the tokens of a message, including its tool calls.
+
+        Args:
+            message (ChatMessage): The message.
+
+        Returns:
+            int: The number of tokens.
+        """
+        n = MESSAGE_OVERHEAD + self.count(message.content or "")
+        for tool_call in message.tool_calls or []:
+            if tool_call.function:
+                n += MESSAGE_OVERHEAD + self.count(tool_call.function.name) + self.count(
+                    tool_call.function.arguments or "")
+        return n
+
+    def _groups(self, messages: List[ChatMessage], start: int) -> List[List[int]]:
+        # The indices of the messages, an assistant message with tool calls is grouped with their results.
+        groups: List[List[int]] = []
+        for i in range(start, len(messages)):
+            if messages[i].role == "tool" and len(groups) > 0 and messages[groups[-1][0]].tool_calls:
+                groups[-1].append(i)
+            else:
+                groups.append([i])
+        return groups
+
+    def select(self, messages: List[ChatMessage], reserve: int = 0) -> List[ChatMessage]:
+        """
+        Select the messages sent to the LLM.
+
+        The newest message is always selected, even if it doesn't fit.
+
+        Args:
+            messages (List[ChatMessage]): The history of the session, oldest first.
+            reserve (int): The tokens of the budget used by other parts of the request, e.g. the tools.
+
+        Returns:
+            List[ChatMessage]: A new list of the system messages at the start of the history,
+                the summary of the dropped messages if any, and the newest messages that fit.
+        """
+        start = 0
+        while start < len(messages) and messages[start].role == "system":
+            start += 1
+        system = messages[:start]
+
+        budget = self.max_tokens - reserve - sum(self.count_message(m) for m in system)
+        if self.summarize:
+            budget -= self.summary_tokens + MESSAGE_OVERHEAD
+
+        groups = self._groups(messages, start)
+        first = len(messages)
+        for group in reversed(groups):
+            n = sum(self.count_message(messages[i]) for i in group)
+            if n > budget and first < len(messages):
+                break
+            budget -= n
+            first = group[0]
+
+        selected = list(system)
+        if self.summarize:
+            summary = self._summarize(messages, start, first)
+            if summary:
+                selected.append(ChatMessage(role="system", content=f"Summary of the earlier conversation:\n{summary}"))
+        selected.extend(messages[first:])
+        return selected
+
+    def _summarize(self, messages: List[ChatMessage], start: int, end: int) -> Optional[str]:
+        if self._summarized > len(messages):
+            # Not the history the summary was written for.
+            self.summary = None
+            self._summarized = 0
+
+        begin = max(start, self._summarized)
+        if begin >= end:
+            return self.summary
+
+        dropped = "\n".join(f"{m.role}: {m.content}" for m in messages[begin:end] if m.content)
+        instructions = f"""Update the summary of a conversation with the new messages.
+Keep the facts, decisions and open questions, in at most {self.summary_tokens} tokens.
+
+Summary:
+{self.summary or ""}
+
+New messages:
+{dropped}
+
+Updated summary:"""
+
+        try:
+            m = self.llm.chat(messages=[ChatMessage(role="user", content=instructions)])
+        except Exception as e:
+            _log.warning(f"Summarize failed, messages dropped: {e}")
+            return self.summary
+
+        self.summary = m.content.strip()
+        self._summarized = end
+        return self.summary
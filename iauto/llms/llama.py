@@ -1,4 +1,7 @@
-from typing import Iterator, List, Optional
+import hashlib
+import json
+import os
+from typing import Iterator, List, Optional, Union
 
 import llama_cpp
 from llama_cpp.llama_chat_format import LlamaChatCompletionHandlerRegistry
@@ -6,19 +9,62 @@ from llama_cpp.llama_chat_format import LlamaChatCompletionHandlerRegistry
 from ..actions import ActionSpec
 from ..log import get_logger
 from ._qwen import qwen_chat_handler
-from .llm import LLM, ChatMessage, Function, Message, ToolCall
+from .llm import (LLM, ChatMessage, ChatMessageChunk, Function, Message,
+                  ToolCall, ToolCallChunk, Usage, merge_chunks)
+from .pool import file_size, get_model_pool, kv_cache_size
+from .tools import ToolCatalog
 
-_model_cache = {}
+
+def _create_cache(model_path: str, cache_type: str, cache_size: int, cache_dir=None) -> "llama_cpp.BaseLlamaCache":
+    if cache_type == "ram":
+        return llama_cpp.LlamaRAMCache(capacity_bytes=cache_size)
+
+    # The cache is keyed by tokens, so every model has its own directory.
+    cache_dir = cache_dir or os.path.join(os.path.expanduser("~"), ".cache", "iauto", "llama")
+    model_key = hashlib.sha256(os.path.abspath(model_path).encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"{os.path.basename(model_path)}-{model_key}")
+    return llama_cpp.LlamaDiskCache(cache_dir=path, capacity_bytes=cache_size)
 
 
 class LLaMA(LLM):
     """
     llamap.cpp: https://github.com/ggerganov/llama.cpp
     llama-cpp-python: https://github.com/abetlen/llama-cpp-python
+
+    The states of the model after every completion are saved to a prompt cache, so the
+    next turn of a conversation only evaluates the tokens after the longest cached prefix,
+    instead of the whole conversation. Every instance of the model has its own cache, shared
+    by the sessions that use it, configured with the arguments:
+
+    - cache (bool): Whether to use a prompt cache, defaults to True.
+    - cache_type (str): `ram`, or `disk` to keep the states across processes, defaults to `ram`.
+    - cache_size (int): The maximum size of the cache in bytes, the least recently used
+      states are evicted, defaults to 2 GiB.
+    - cache_dir (str): The directory of the disk cache, defaults to `~/.cache/iauto/llama`.
+
+    The instances of the model are shared by the LLaMA objects created with the same
+    arguments through the model pool, see `iauto.llms.pool`, and are used by one thread at
+    a time. `replicas` is the maximum number of instances loaded to serve concurrent sessions,
+    defaults to 1.
+
+    With `parallel` greater than 1, the requests without tools of all sessions are decoded
+    together in shared batches by a scheduler, see `_llama_batch`, up to `parallel` requests
+    at a time, and formatted with the chat template of the model. Requests with tools use
+    the chat handler of the model instead.
     """
 
     def __init__(self, **kwargs) -> None:
         super().__init__()
+        cache = kwargs.pop("cache", True)
+        cache_type = kwargs.pop("cache_type", "ram")
+        cache_size = kwargs.pop("cache_size", 2 << 30)
+        cache_dir = kwargs.pop("cache_dir", None)
+        replicas = kwargs.pop("replicas", 1)
+        parallel = kwargs.pop("parallel", 1)
+
+        if cache and cache_type not in ("ram", "disk"):
+            raise ValueError(f"Invalid cache_type: {cache_type}")
+
         if "verbose" not in kwargs:
             kwargs["verbose"] = False
 
@@ -29,41 +75,104 @@ class LLaMA(LLM):
             kwargs["n_gpu_layers"] = -1
 
         self._model = kwargs.get("model_path", "LLaMA")
+        self._log = get_logger("LLaMA")
 
-        self._llm = _model_cache.get(self._model)
-        if self._llm is None:
+        model_path = self._model
+
+        def _create():
             model = llama_cpp.Llama(**kwargs)
-            _model_cache[self._model] = model
-            self._llm = model
+            if cache:
+                model.set_cache(_create_cache(model_path, cache_type, cache_size, cache_dir))
+            return model
 
-        self._log = get_logger("LLaMA")
+        size = file_size(model_path) + kv_cache_size(model_path, kwargs["n_ctx"])
+        if cache and cache_type == "ram":
+            size += cache_size
+
+        key = ("llama", json.dumps([kwargs, cache, cache_type, cache_size, cache_dir], sort_keys=True, default=str))
+        self._pooled = get_model_pool().model(key, _create, size=size, replicas=replicas)
+
+        self._batched = None
+        if parallel > 1:
+            n_ctx = kwargs["n_ctx"] or 4096
+
+            def _create_scheduler():
+                from ._llama_batch import BatchScheduler
+
+                # Only the weights and the vocabulary are used, the scheduler has its own context.
+                model = llama_cpp.Llama(**{**kwargs, "n_ctx": 256})
+                return BatchScheduler(model, parallel=parallel, n_ctx=n_ctx)
+
+            # The weights, and the KV caches of the contexts of the model and of the scheduler.
+            batched_size = file_size(model_path) + kv_cache_size(model_path, 256) + kv_cache_size(
+                model_path, n_ctx * parallel)
+            self._batched = get_model_pool().model(
+                ("llama-batch", key[1], parallel), _create_scheduler, size=batched_size)
 
         if "qwen" in self._model.lower():
             self.register_qwen_fn()
 
+    def _batched_stream(self, messages: Optional[List[ChatMessage]], prompt: Optional[str] = None, **kwargs):
+        args = {k: kwargs[k] for k in ("max_tokens", "temperature", "top_k", "top_p", "stop") if k in kwargs}
+        if isinstance(args.get("stop"), str):
+            args["stop"] = [args["stop"]]
+
+        with self._batched.share() as scheduler:
+            if messages is not None:
+                r = scheduler.chat([{"role": m.role, "content": m.content} for m in messages], **args)
+            else:
+                r = scheduler.submit(prompt, **args)
+
+            try:
+                for text in r:
+                    yield ChatMessageChunk(content=text)
+                yield ChatMessageChunk(
+                    finish_reason=r.finish_reason,
+                    usage=Usage(input_tokens=r.prompt_tokens, output_tokens=r.completion_tokens)
+                )
+            finally:
+                # The sequence is released even if the caller stopped before the first chunk.
+                r.cancelled = True
+
     def generate(self, instructions: str, **kwargs) -> Message:
         """"""
-        r = self._llm.create_completion(prompt=instructions, **kwargs)
+        if self._batched is not None:
+            return Message(content=merge_chunks(self._batched_stream(None, prompt=instructions, **kwargs)).content)
+
+        with self._pooled.acquire() as llm:
+            r = llm.create_completion(prompt=instructions, **kwargs)
         print(instructions)
         if isinstance(r, Iterator):
             raise ValueError(f"Invalid response: {r}")
         return Message(content=r["choices"][0]["text"])
 
-    def chat(self, messages: List[ChatMessage] = [], tools: Optional[List[ActionSpec]] = None, **kwargs) -> ChatMessage:
+    def chat(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> ChatMessage:
         tools_desciption = []
         tool_choice = "auto"
 
+        tools = ToolCatalog.of(tools)
         if tools:
-            tools_desciption = [t.oai_spec() for t in tools]
+            tools_desciption = tools.oai_specs
+
+        if self._batched is not None and not tools:
+            return merge_chunks(self._batched_stream(messages, **kwargs))
 
         msgs = [m.model_dump() for m in messages]
-        r = self._llm.create_chat_completion(
-            messages=msgs,
-            tools=tools_desciption,
-            tool_choice=tool_choice,
-            **kwargs
-        )
+        with self._pooled.acquire() as llm:
+            r = llm.create_chat_completion(
+                messages=msgs,
+                tools=tools_desciption,
+                tool_choice=tool_choice,
+                **kwargs
+            )
+        return self._message(r)
 
+    def _message(self, r) -> ChatMessage:
         m = r["choices"][0]["message"]
 
         resp = ChatMessage(role=m["role"], content=m["content"] or "")
@@ -86,6 +195,64 @@ class LLaMA(LLM):
                 )
         return resp
 
+    def chat_stream(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> Iterator[ChatMessageChunk]:
+        tools_desciption = []
+
+        tools = ToolCatalog.of(tools)
+        if tools:
+            tools_desciption = tools.oai_specs
+
+        if self._batched is not None and not tools:
+            yield from self._batched_stream(messages, **kwargs)
+            return
+
+        msgs = [m.model_dump() for m in messages]
+        # The instance is used by this session until the response is complete.
+        with self._pooled.acquire() as llm:
+            r = llm.create_chat_completion(
+                messages=msgs,
+                tools=tools_desciption,
+                tool_choice="auto",
+                stream=True,
+                **kwargs
+            )
+
+            if not isinstance(r, Iterator):
+                # Chat handlers that don't stream, e.g. qwen-fn, return the complete response.
+                yield ChatMessageChunk.from_message(self._message(r))
+                return
+
+            for c in r:
+                choice = c["choices"][0]
+                delta = choice.get("delta") or {}
+                chunk = ChatMessageChunk(content=delta.get("content") or "", finish_reason=choice.get("finish_reason"))
+
+                tool_calls = delta.get("tool_calls")
+                if tool_calls:
+                    chunk.tool_calls = [
+                        ToolCallChunk(
+                            index=t.get("index", 0),
+                            id=t.get("id"),
+                            name=(t.get("function") or {}).get("name"),
+                            arguments=(t.get("function") or {}).get("arguments") or ""
+                        ) for t in tool_calls
+                    ]
+
+                usage = c.get("usage")
+                if usage:
+                    chunk.usage = Usage(input_tokens=usage["prompt_tokens"], output_tokens=usage["completion_tokens"])
+                yield chunk
+
+    def count_tokens(self, text: str) -> int:
+        # Tokenizing only reads the vocabulary, the instance may be used by another thread.
+        with self._pooled.peek() as llm:
+            return len(llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
     @property
     def model(self) -> str:
         return self._model
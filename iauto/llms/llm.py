@@ -1,8 +1,11 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Union)
 
 from pydantic import BaseModel
 
+from .. import _asyncio
 from ..actions import ActionSpec
 
 
@@ -107,6 +110,105 @@ class ChatMessage(Message):
         return m
 
 
+class ToolCallChunk(BaseModel):
+    """
+    A fragment of a tool call in a streamed chat message.
+
+    Attributes:
+        index (int): The index of the tool call in the message, fragments with the same index
+            belong to the same tool call.
+        id (Optional[str]): The identifier of the tool call, usually only in the first fragment.
+        name (Optional[str]): The name of the function, usually only in the first fragment.
+        arguments (str): A fragment of the JSON arguments of the function.
+    """
+
+    index: int = 0
+    id: Optional[str] = None
+    name: Optional[str] = None
+    arguments: str = ""
+
+
+class ChatMessageChunk(BaseModel):
+    """
+    A delta of a streamed chat message.
+
+    Attributes:
+        content (str): The text generated since the previous chunk.
+        tool_calls (Optional[List[ToolCallChunk]]): The fragments of tool calls, if any.
+        finish_reason (Optional[str]): Why the generation stopped, set in the last chunk.
+        usage (Optional[Usage]): The token usage, if the provider reports it.
+    """
+
+    content: str = ""
+    tool_calls: Optional[List[ToolCallChunk]] = None
+    finish_reason: Optional[str] = None
+    usage: Optional[Usage] = None
+
+    @staticmethod
+    def from_message(message: ChatMessage) -> "ChatMessageChunk":
+        """
+        Create a chunk of a complete message, for providers that don't stream.
+
+        Args:
+            message (ChatMessage): The complete message.
+
+        Returns:
+            ChatMessageChunk: A chunk holding the whole message.
+        """
+        tool_calls = None
+        if message.tool_calls:
+            tool_calls = [
+                ToolCallChunk(
+                    index=i,
+                    id=t.id,
+                    name=t.function.name if t.function else None,
+                    arguments=(t.function.arguments or "") if t.function else ""
+                ) for i, t in enumerate(message.tool_calls)
+            ]
+        return ChatMessageChunk(content=message.content, tool_calls=tool_calls, finish_reason="stop",
+                                usage=message.usage)
+
+
+def merge_chunks(chunks: Iterable[ChatMessageChunk], role: str = "assistant") -> ChatMessage:
+    """
+    Merge the chunks of a streamed chat message into the complete message.
+
+    Args:
+        chunks (Iterable[ChatMessageChunk]): The chunks, in order.
+        role (str): The role of the message.
+
+    Returns:
+        ChatMessage: The complete message.
+    """
+    contents = []
+    calls: Dict[int, ToolCallChunk] = {}
+    usage = None
+
+    for chunk in chunks:
+        contents.append(chunk.content)
+        if chunk.usage is not None:
+            usage = chunk.usage
+        for t in chunk.tool_calls or []:
+            call = calls.get(t.index)
+            if call is None:
+                calls[t.index] = t.model_copy()
+            else:
+                call.id = call.id or t.id
+                call.name = call.name or t.name
+                call.arguments += t.arguments
+
+    m = ChatMessage(role=role, content="".join(contents), usage=usage)
+    if len(calls) > 0:
+        m.tool_calls = [
+            ToolCall(
+                id=c.id or f"call_{i}",
+                type="function",
+                function=Function(name=c.name or "", arguments=c.arguments or None)
+            ) for i, c in sorted(calls.items())
+        ]
+    return m
+
+
 class LLM(ABC):
     """Abstract base class for a Language Model (LLM) that defines the interface for generating messages and handling \
     chat interactions."""
@@ -142,6 +244,65 @@ class LLM(ABC):
             ChatMessage: The response as a ChatMessage instance after processing the interaction.
         """  # noqa: E501
 
+    async def chat_async(
+        self,
+        messages: List[ChatMessage],
+        tools: Optional[List[ActionSpec]] = None,
+        **kwargs
+    ) -> ChatMessage:
+        """
+        Conduct a chat interaction like `chat` without blocking the event loop.
+
+        The default implementation runs `chat` in a thread, providers with async clients override it.
+
+        Args:
+            messages (List[ChatMessage]): A list of ChatMessage instances representing the conversation history.
+            tools (Optional[List[ActionSpec]]): An optional list of ActionSpec instances representing tools that can be used in the chat.
+            **kwargs: Additional keyword arguments that the concrete implementation may use.
+
+        Returns:
+            ChatMessage: The response as a ChatMessage instance after processing the interaction.
+        """  # noqa: E501
+        return await _asyncio.to_thread(self.chat, messages=messages, tools=tools, **kwargs)
+
+    def chat_stream(
+        self,
+        messages: List[ChatMessage],
+        tools: Optional[List[ActionSpec]] = None,
+        **kwargs
+    ) -> Iterator[ChatMessageChunk]:
+        """
+        Conduct a chat interaction like `chat`, yielding the response as it's generated.
+
+        The default implementation yields the complete response of `chat` as a single chunk,
+        providers that support streaming override it. Use `merge_chunks` to get the complete message.
+
+        Args:
+            messages (List[ChatMessage]): A list of ChatMessage instances representing the conversation history.
+            tools (Optional[List[ActionSpec]]): An optional list of ActionSpec instances representing tools that can be used in the chat.
+            **kwargs: Additional keyword arguments that the concrete implementation may use.
+
+        Yields:
+            ChatMessageChunk: The deltas of the response, the text and the fragments of tool calls.
+        """  # noqa: E501
+        yield ChatMessageChunk.from_message(self.chat(messages=messages, tools=tools, **kwargs))
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens of a text for the model.
+
+        The default implementation uses the `tiktoken` encoding of the model if it's available,
+        and an estimate otherwise, providers with their own tokenizer override it.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        from .context import get_tokenizer
+        return get_tokenizer(self.model)(text)
+
     @property
     @abstractmethod
     def model(self) -> str:
@@ -150,3 +311,46 @@ class LLM(ABC):
         Returns:
             str: The model identifier.
         """
+
+
+async def chat_batch(
+    llm: LLM,
+    batch: Sequence[Union[str, List[ChatMessage]]],
+    concurrency: int = 8,
+    instructions: Optional[str] = None,
+    **kwargs
+) -> List[Union[ChatMessage, Exception]]:
+    """
+    Send independent prompts to an LLM concurrently.
+
+    Args:
+        llm (LLM): The language model.
+        batch (Sequence[Union[str, List[ChatMessage]]]): The prompts, each a user message or a list of messages.
+        concurrency (int): The maximum number of requests in flight.
+        instructions (Optional[str]): The system message prepended to every prompt.
+        **kwargs: Additional keyword arguments of `LLM.chat_async`.
+
+    Returns:
+        List[Union[ChatMessage, Exception]]: The responses in the order of the prompts, or the
+            error of the prompts that failed.
+    """
+    if concurrency < 1:
+        raise ValueError(f"Invalid concurrency: {concurrency}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _chat(item: Any) -> Union[ChatMessage, Exception]:
+        if isinstance(item, str):
+            messages = [ChatMessage(role="user", content=item)]
+        else:
+            messages = list(item)
+        if instructions is not None:
+            messages.insert(0, ChatMessage(role="system", content=instructions))
+
+        async with semaphore:
+            try:
+                return await llm.chat_async(messages=messages, **kwargs)
+            except Exception as e:
+                return e
+
+    return await asyncio.gather(*[_chat(item) for item in batch])
@@ -1,13 +1,17 @@
+import asyncio
 import json
 import re
+import weakref
 from types import SimpleNamespace
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import openai
 
 from .. import log
 from ..actions import ActionSpec
-from .llm import LLM, ChatMessage, Function, Message, ToolCall, Usage
+from .llm import (LLM, ChatMessage, ChatMessageChunk, Function, Message,
+                  ToolCall, ToolCallChunk, Usage)
+from .tools import ToolCatalog
 
 
 class OpenAI(LLM):
@@ -19,6 +23,9 @@ class OpenAI(LLM):
         self._model = model or "gpt-3.5-turbo"
 
         self._openai = openai.OpenAI(**kwargs)
+        self._client_args = kwargs
+        # An async client per event loop, their connections can't be shared between loops.
+        self._async_openai: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
         self._log = log.get_logger("OpenAI")
 
@@ -33,7 +40,12 @@ class OpenAI(LLM):
         )
         return Message(content=r.choices[0].text)
 
-    def chat(self, messages: List[ChatMessage] = [], tools: Optional[List[ActionSpec]] = None, **kwargs) -> ChatMessage:
+    def _request(
+        self,
+        messages: List[ChatMessage],
+        tools: Optional[ToolCatalog],
+        kwargs: Dict
+    ) -> Tuple[List, Dict, bool]:
         if "model" not in kwargs:
             kwargs["model"] = self._model
 
@@ -41,10 +53,10 @@ class OpenAI(LLM):
         tool_choice = "auto"
 
         if tools:
-            tools_desciption = [t.oai_spec() for t in tools]
+            tools_desciption = tools.oai_specs
 
         native_tool_call = self.native_tool_call()
-        use_tool_call_prompt = tools and not native_tool_call
+        use_tool_call_prompt = bool(tools) and not native_tool_call
 
         msgs = []
 
@@ -64,7 +76,7 @@ class OpenAI(LLM):
         if use_tool_call_prompt:
             msgs.insert(-1, {
                 "role": "user",
-                "content": self.tool_call_prompt(tools=tools_desciption)
+                "content": tools.render("openai", self.tool_call_prompt)
             })
 
         if self._log.isEnabledFor(log.DEBUG):
@@ -77,11 +89,45 @@ class OpenAI(LLM):
             kwargs["tools"] = tools_desciption
             kwargs["tool_choice"] = tool_choice
 
+        return msgs, kwargs, use_tool_call_prompt
+
+    def chat(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> ChatMessage:
+        msgs, kwargs, use_tool_call_prompt = self._request(messages, ToolCatalog.of(tools), kwargs)
+
         r = self._openai.chat.completions.create(
             messages=msgs,
             **kwargs
         )
+        return self._response(r, use_tool_call_prompt)
+
+    def _get_async_client(self) -> openai.AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        client = self._async_openai.get(loop)
+        if client is None:
+            client = openai.AsyncOpenAI(**self._client_args)
+            self._async_openai[loop] = client
+        return client
+
+    async def chat_async(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> ChatMessage:
+        msgs, kwargs, use_tool_call_prompt = self._request(messages, ToolCatalog.of(tools), kwargs)
+
+        r = await self._get_async_client().chat.completions.create(
+            messages=msgs,
+            **kwargs
+        )
+        return self._response(r, use_tool_call_prompt)
 
+    def _response(self, r, use_tool_call_prompt: bool) -> ChatMessage:
         if self._log.isEnabledFor(log.DEBUG):
             self._log.debug("Response: " + json.dumps(r.model_dump(), ensure_ascii=False, indent=4))
 
@@ -118,6 +164,56 @@ class OpenAI(LLM):
 
         return resp
 
+    def chat_stream(
+        self,
+        messages: List[ChatMessage] = [],
+        tools: Union[ToolCatalog, List[ActionSpec], None] = None,
+        **kwargs
+    ) -> Iterator[ChatMessageChunk]:
+        msgs, kwargs, use_tool_call_prompt = self._request(messages, ToolCatalog.of(tools), kwargs)
+
+        stream = self._openai.chat.completions.create(
+            messages=msgs,
+            stream=True,
+            **kwargs
+        )
+
+        contents = []
+        for r in stream:
+            usage = None
+            if r.usage:
+                usage = Usage(input_tokens=r.usage.prompt_tokens, output_tokens=r.usage.completion_tokens)
+            if not r.choices:
+                if usage is not None:
+                    yield ChatMessageChunk(usage=usage)
+                continue
+
+            choice = r.choices[0]
+            delta = choice.delta
+            chunk = ChatMessageChunk(content=delta.content or "", finish_reason=choice.finish_reason, usage=usage)
+            if delta.tool_calls:
+                chunk.tool_calls = [
+                    ToolCallChunk(
+                        index=t.index,
+                        id=t.id,
+                        name=t.function.name if t.function else None,
+                        arguments=(t.function.arguments or "") if t.function else ""
+                    ) for t in delta.tool_calls
+                ]
+            if use_tool_call_prompt:
+                contents.append(chunk.content)
+            yield chunk
+
+        if use_tool_call_prompt:
+            # The tool call is in the text of models without native function calling.
+            tool_call = self.parse_tool_call("".join(contents))
+            if tool_call is not None:
+                yield ChatMessageChunk(tool_calls=[ToolCallChunk(
+                    id=tool_call.id,
+                    name=tool_call.function.name,
+                    arguments=tool_call.function.arguments or ""
+                )])
+
     @property
     def model(self) -> str:
         return self._model
@@ -0,0 +1,439 @@
+"""
+A pool of the local models of a process, e.g. llama.cpp and chatglm.cpp models.
+
+Local models are large, and their instances can't be used by several threads at
+the same time. The pool shares the instances of a model between the LLMs created
+with the same arguments. It bounds the memory of the loaded instances, and gives
+an instance to one user at a time:
+
+```python
+model = get_model_pool().model(("llama", path), lambda: llama_cpp.Llama(model_path=path), size=size)
+with model.acquire() as llm:
+    llm.create_completion(prompt="Hello")
+```
+
+A model can have several replicas, so several sessions are served concurrently.
+The replicas are loaded when all of the loaded ones are in use, and users wait
+for a free instance when all the replicas are in use. When loading an instance
+would exceed the memory of the pool, the least recently used idle instances of
+other models are unloaded first. If the instances in use leave no room, users wait
+until enough of them are released.
+
+The memory of the default pool is `$IA_MODEL_POOL_MEMORY` bytes, or half of the
+physical memory.
+"""
+
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import (Any, BinaryIO, Callable, Dict, Hashable, Iterator, List,
+                    Optional)
+
+from ..log import get_logger
+
+_log = get_logger("pool")
+
+
+class PooledModel:
+    """
+    The instances of a model in a pool.
+
+    Attributes:
+        key (Hashable): The key of the model, e.g. the provider and the arguments of the model.
+        size (int): The memory of an instance in bytes.
+        replicas (int): The maximum number of instances.
+    """
+
+    def __init__(self, pool: "ModelPool", key: Hashable, factory: Callable[[], Any], size: int, replicas: int) -> None:
+        self.key = key
+        self.size = size
+        self.replicas = replicas
+
+        self._pool = pool
+        self._factory = factory
+        self._instances: List[Any] = []
+        self._free: List[Any] = []
+        self._loading = 0
+        self._last_used = 0.0
+        # The number of shared users of the instances, by id.
+        self._users: Dict[int, int] = {}
+
+    @property
+    def loaded(self) -> int:
+        """The number of loaded instances."""
+        return len(self._instances)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Use an instance of the model, it's not used by other threads until it's released.
+
+        Args:
+            timeout (Optional[float]): The maximum time in seconds to wait for a free instance,
+                None to wait until one is released.
+
+        Yields:
+            Any: The instance.
+
+        Raises:
+            TimeoutError: If no instance is free in time.
+            ValueError: If an instance is larger than the memory of the pool.
+        """
+        instance = self._pool._acquire(self, timeout)
+        try:
+            yield instance
+        finally:
+            self._pool._release(self, instance)
+
+    @contextmanager
+    def share(self) -> Iterator[Any]:
+        """
+        Use an instance of the model with other threads, for thread-safe instances, e.g. a
+        scheduler of concurrent requests. A shared instance is not unloaded while it's used.
+        The instances of a model are either acquired or shared, not both.
+
+        Yields:
+            Any: The instance, loaded if no instance is loaded.
+
+        Raises:
+            ValueError: If an instance is larger than the memory of the pool.
+        """
+        instance = self._pool._share(self)
+        try:
+            yield instance
+        finally:
+            self._pool._unshare(self, instance)
+
+    @contextmanager
+    def peek(self) -> Iterator[Any]:
+        """
+        Use a loaded instance without acquiring it, for thread-safe operations only, e.g. tokenizing.
+        The instance may be in use by other threads, and is not unloaded while it's peeked.
+
+        Yields:
+            Any: The instance, loaded if no instance is loaded.
+
+        Raises:
+            ValueError: If an instance is larger than the memory of the pool.
+        """
+        instance = self._pool._peek(self)
+        try:
+            yield instance
+        finally:
+            self._pool._unshare(self, instance)
+
+
+class ModelPool:
+    """
+    A pool of local models bounded by memory.
+
+    Attributes:
+        max_memory (Optional[int]): The maximum memory of the loaded instances in bytes, None for no limit.
+    """
+
+    def __init__(self, max_memory: Optional[int] = None) -> None:
+        self.max_memory = max_memory
+        self._models: Dict[Hashable, PooledModel] = {}
+        self._cond = threading.Condition()
+
+    def model(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        size: int = 0,
+        replicas: int = 1
+    ) -> PooledModel:
+        """
+        Get a model of the pool, no instance is loaded until it's acquired.
+
+        Args:
+            key (Hashable): The key of the model, models with the same key share their instances.
+            factory (Callable[[], Any]): Loads an instance of the model.
+            size (int): The memory of an instance in bytes, e.g. the size of the model file.
+            replicas (int): The maximum number of instances of the model.
+
+        Returns:
+            PooledModel: The model.
+        """
+        if replicas < 1:
+            raise ValueError(f"Invalid replicas: {replicas}")
+
+        with self._cond:
+            model = self._models.get(key)
+            if model is None:
+                model = PooledModel(self, key=key, factory=factory, size=size, replicas=replicas)
+                self._models[key] = model
+            else:
+                model.replicas = max(model.replicas, replicas)
+            return model
+
+    @property
+    def memory(self) -> int:
+        """The memory of the loaded instances in bytes."""
+        with self._cond:
+            return self._memory()
+
+    def _memory(self) -> int:
+        return sum((len(m._instances) + m._loading) * m.size for m in self._models.values())
+
+    def _make_room(self, model: PooledModel, evicted: List[Any]) -> bool:
+        # Unload the least recently used idle instances of other models, only if it makes enough
+        # room for an instance of the model. The unloaded instances are closed by the caller,
+        # after releasing the lock.
+        if self.max_memory is None:
+            return True
+        if model.size > self.max_memory:
+            raise ValueError(
+                f"Model larger than the memory of the pool: {model.key}, {model.size} > {self.max_memory} bytes,"
+                " see $IA_MODEL_POOL_MEMORY"
+            )
+
+        needed = self._memory() + model.size - self.max_memory
+        idle = [(m, i) for m in self._models.values() if m is not model for i in self._idle(m)]
+        if sum(m.size for m, _ in idle) < needed:
+            return False
+
+        for m, instance in sorted(idle, key=lambda x: x[0]._last_used):
+            if needed <= 0:
+                break
+            m._free.remove(instance)
+            m._instances.remove(instance)
+            evicted.append(instance)
+            needed -= m.size
+            _log.info(f"Unload model: {m.key}")
+        return True
+
+    def _idle(self, model: PooledModel) -> List[Any]:
+        return [i for i in model._free if model._users.get(id(i), 0) == 0]
+
+    def _acquire(self, model: PooledModel, timeout: Optional[float]) -> Any:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        evicted: List[Any] = []
+        with self._cond:
+            while True:
+                model._last_used = time.monotonic()
+                if len(model._free) > 0:
+                    return model._free.pop()
+
+                if len(model._instances) + model._loading < model.replicas and self._make_room(model, evicted):
+                    model._loading += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No free instance of model: {model.key}")
+                self._cond.wait(remaining)
+
+        for instance in evicted:
+            _close(instance)
+
+        # Loading takes seconds, other models are used meanwhile.
+        try:
+            instance = model._factory()
+        except BaseException:
+            with self._cond:
+                model._loading -= 1
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            model._loading -= 1
+            model._instances.append(instance)
+        return instance
+
+    def _release(self, model: PooledModel, instance: Any) -> None:
+        with self._cond:
+            model._last_used = time.monotonic()
+            model._free.append(instance)
+            self._cond.notify_all()
+
+    def _share(self, model: PooledModel) -> Any:
+        with self._cond:
+            if len(model._free) > 0:
+                instance = model._free[0]
+                model._users[id(instance)] = model._users.get(id(instance), 0) + 1
+                model._last_used = time.monotonic()
+                return instance
+
+        instance = self._acquire(model, None)
+        with self._cond:
+            model._free.append(instance)
+            model._users[id(instance)] = model._users.get(id(instance), 0) + 1
+            self._cond.notify_all()
+        return instance
+
+    def _peek(self, model: PooledModel) -> Any:
+        with self._cond:
+            if len(model._instances) > 0:
+                instance = model._instances[0]
+                model._users[id(instance)] = model._users.get(id(instance), 0) + 1
+                return instance
+        return self._share(model)
+
+    def _unshare(self, model: PooledModel, instance: Any) -> None:
+        with self._cond:
+            model._last_used = time.monotonic()
+            n = model._users.pop(id(instance), 0) - 1
+            if n > 0:
+                model._users[id(instance)] = n
+            self._cond.notify_all()
+
+    def clear(self) -> None:
+        """Unload the idle instances of all models."""
+        evicted = []
+        with self._cond:
+            for model in self._models.values():
+                for instance in self._idle(model):
+                    model._free.remove(instance)
+                    model._instances.remove(instance)
+                    evicted.append(instance)
+            self._cond.notify_all()
+
+        for instance in evicted:
+            _close(instance)
+
+
+def _close(instance: Any) -> None:
+    close = getattr(instance, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception as e:
+            _log.debug(f"Close model failed: {e}")
+
+
+def file_size(path: str) -> int:
+    """
+    Get the size of a model file, an estimate of the memory of an instance.
+
+    Args:
+        path (str): The path of the model file.
+
+    Returns:
+        int: The size in bytes, 0 if the file doesn't exist.
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+# The formats of the scalar metadata values of GGUF files, by value type.
+_GGUF_SCALARS = {
+    0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i", 6: "<f", 7: "<?", 10: "<Q", 11: "<q", 12: "<d"
+}
+_GGUF_STRING = 8
+_GGUF_ARRAY = 9
+
+# The metadata of the architecture of a model that sets the size of its KV cache.
+_KV_KEYS = ("block_count", "embedding_length", "context_length", "attention.head_count", "attention.head_count_kv")
+
+
+def _read(f: BinaryIO, fmt: str) -> Any:
+    size = struct.calcsize(fmt)
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of file")
+    return struct.unpack(fmt, data)[0]
+
+
+def _skip_gguf_value(f: BinaryIO, value_type: int) -> None:
+    if value_type == _GGUF_STRING:
+        f.seek(_read(f, "<Q"), os.SEEK_CUR)
+    elif value_type == _GGUF_ARRAY:
+        item_type = _read(f, "<I")
+        n = _read(f, "<Q")
+        if item_type in _GGUF_SCALARS:
+            f.seek(n * struct.calcsize(_GGUF_SCALARS[item_type]), os.SEEK_CUR)
+        else:
+            for _ in range(n):
+                _skip_gguf_value(f, item_type)
+    elif value_type in _GGUF_SCALARS:
+        f.seek(struct.calcsize(_GGUF_SCALARS[value_type]), os.SEEK_CUR)
+    else:
+        raise ValueError(f"Invalid GGUF value type: {value_type}")
+
+
+def _gguf_metadata(path: str) -> Dict[str, Any]:
+    # The architecture and the scalar values of the `_KV_KEYS` of a model, the tensors aren't read.
+    metadata: Dict[str, Any] = {}
+    keys = {"general.architecture"}
+    with open(path, "rb") as f:
+        if f.read(4) != b"GGUF" or _read(f, "<I") < 2:
+            return metadata
+        _read(f, "<Q")
+        n = _read(f, "<Q")
+        for _ in range(n):
+            key = f.read(_read(f, "<Q")).decode("utf-8", errors="replace")
+            value_type = _read(f, "<I")
+            if key in keys and value_type in _GGUF_SCALARS:
+                metadata[key] = _read(f, _GGUF_SCALARS[value_type])
+            elif key in keys and value_type == _GGUF_STRING:
+                metadata[key] = f.read(_read(f, "<Q")).decode("utf-8", errors="replace")
+            else:
+                _skip_gguf_value(f, value_type)
+
+            if key == "general.architecture" and key in metadata:
+                keys.update(f"{metadata[key]}.{k}" for k in _KV_KEYS)
+            if len(metadata) == len(keys):
+                break
+    return metadata
+
+
+def kv_cache_size(path: str, n_ctx: int = 0, type_size: int = 2) -> int:
+    """
+    Estimate the memory of the KV cache of a llama.cpp context, from the metadata of a GGUF model file.
+
+    Args:
+        path (str): The path of the model file.
+        n_ctx (int): The number of tokens of the context, 0 for the training context of the model.
+        type_size (int): The size in bytes of a cached value, 2 for the default `f16` cache.
+
+    Returns:
+        int: The size in bytes, 0 if the file isn't a GGUF model or doesn't have the metadata.
+    """
+    try:
+        metadata = _gguf_metadata(path)
+    except (OSError, ValueError, struct.error) as e:
+        _log.debug(f"Can't read the metadata of the model: {path}, {e}")
+        return 0
+
+    arch = metadata.get("general.architecture")
+    values = [metadata.get(f"{arch}.{k}") for k in _KV_KEYS]
+    n_layer, n_embd, n_ctx_train, n_head, n_head_kv = [v if isinstance(v, int) else None for v in values]
+    if n_layer is None or n_embd is None or not n_head:
+        return 0
+
+    n_ctx = n_ctx or n_ctx_train or 0
+    n_embd_kv = n_embd * (n_head_kv or n_head) // n_head
+    # The keys and the values of every layer.
+    return 2 * n_layer * n_ctx * n_embd_kv * type_size
+
+
+def _default_memory() -> Optional[int]:
+    if "IA_MODEL_POOL_MEMORY" in os.environ:
+        return int(os.environ["IA_MODEL_POOL_MEMORY"])
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+_pool: Optional[ModelPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """
+    Get the model pool shared by the LLMs of the process.
+
+    Returns:
+        ModelPool: The pool, created on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ModelPool(max_memory=_default_memory())
+        return _pool
@@ -1,10 +1,20 @@
 import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 from ..actions import Action
 from ..log import get_logger
-from .llm import LLM, ChatMessage
+from .context import MESSAGE_OVERHEAD, ContextWindow
+from .llm import LLM, ChatMessage, ChatMessageChunk, merge_chunks
+from .tools import ToolCatalog
+
+
+def _same_tools(catalog: ToolCatalog, actions: List[Action]) -> bool:
+    # Whether a catalog has exactly the given actions, compared by identity.
+    return len(catalog.specs) == len(actions) and all(catalog.get(a.spec.name) is a for a in actions)
 
 
 class Session:
@@ -17,7 +27,14 @@ class Session:
     complex conversation flows, tool integration, and message management.
     """
 
-    def __init__(self, llm: LLM, actions: Optional[List[Action]] = None) -> None:
+    def __init__(
+        self,
+        llm: LLM,
+        actions: Optional[List[Action]] = None,
+        tool_concurrency: int = 4,
+        tool_timeout: Optional[float] = None,
+        context: Optional[ContextWindow] = None
+    ) -> None:
         """
         Initialize a new Session instance.
 
@@ -25,13 +42,25 @@ class Session:
             llm (LLM): An instance of a language model to be used for processing messages.
             actions (Optional[List[Action]]): A list of actions that can be performed
                 within the session. Defaults to None, in which case no actions are set.
+            tool_concurrency (int): The maximum number of tool calls of a response executed concurrently.
+            tool_timeout (Optional[float]): The timeout in seconds of a tool call, None to wait until it returns.
+            context (Optional[ContextWindow]): Selects the history sent to the LLM within a token budget,
+                instead of the last `history` messages.
 
         Returns:
             None
         """
+        if tool_concurrency < 1:
+            raise ValueError(f"Invalid tool_concurrency: {tool_concurrency}")
+
         self._log = get_logger("LLM")
         self._llm = llm
         self._actions = actions
+        self.tool_concurrency = tool_concurrency
+        self.tool_timeout = tool_timeout
+        self.context = context
+        self._tools = ToolCatalog(actions or [])
+        self._call_tools: Optional[ToolCatalog] = None
         self._messages = []
 
     def add(self, message: ChatMessage) -> None:
@@ -76,64 +105,167 @@ class Session:
         """
         return self._actions or []
 
+    @property
+    def tools(self) -> ToolCatalog:
+        """
+        Get the catalog of the actions of the session, passed to the LLM as tools.
+
+        Returns:
+            ToolCatalog: The tools of the session.
+        """
+        if not _same_tools(self._tools, self._actions or []):
+            # The list of actions was modified
+            self._tools = ToolCatalog(self._actions or [])
+        return self._tools
+
+    def _get_tools(self, tools: Optional[List[Action]] = None) -> ToolCatalog:
+        if not tools:
+            return self.tools
+
+        # The catalog of the tools of the last call is reused while the tools are the same.
+        cached = self._call_tools
+        if cached is None or not _same_tools(cached, tools):
+            cached = ToolCatalog(tools)
+            self._call_tools = cached
+        return cached
+
+    def _history(
+        self,
+        history: int,
+        tools: Optional[ToolCatalog] = None,
+        instructions: Optional[str] = None
+    ) -> List[ChatMessage]:
+        if self.context is None:
+            return self._messages[-1 * history:]
+
+        reserve = 0
+        if tools is not None:
+            reserve += self.context.count(tools.json)
+        if instructions is not None:
+            reserve += self.context.count(instructions) + MESSAGE_OVERHEAD
+        return self.context.select(self._messages, reserve=reserve)
+
+    def _chat(
+        self,
+        messages: List[ChatMessage],
+        tools: Optional[ToolCatalog] = None,
+        callback: Optional[Callable[[ChatMessageChunk], Any]] = None,
+        **kwargs
+    ) -> ChatMessage:
+        if callback is None:
+            return self._llm.chat(messages=messages, tools=tools, **kwargs)
+
+        chunks = []
+        for chunk in self._llm.chat_stream(messages=messages, tools=tools, **kwargs):
+            callback(chunk)
+            chunks.append(chunk)
+        return merge_chunks(chunks)
+
+    def _run_tool_call(self, tools: ToolCatalog, tool_call) -> str:
+        func_name = tool_call.function.name
+        func_args = tool_call.function.arguments or '{}'
+
+        func_to_call = tools.get(func_name)
+        if func_to_call is None:
+            return f"Function not found: {func_name}"
+
+        func_resp = None
+        try:
+            func_args = json.loads(func_args)
+            func_resp = func_to_call(**func_args)
+        except Exception as e:
+            self._log.warn(f"Function call err: {e}, func_name={func_name}, args={func_args}, resp={func_resp}")
+            func_resp = str(e)
+
+        if func_resp is not None and not isinstance(func_resp, str):
+            try:
+                func_resp = json.dumps(func_resp or {}, ensure_ascii=False, indent=4)
+            except TypeError:
+                self._log.warn("Function return values cannot be JSONized")
+
+        return func_resp or f"{func_name} return nothing."
+
+    def _wait_tool_call(self, future: Future, started: List[Optional[float]], tool_call) -> str:
+        # The timeout of a call starts when a worker picks it up, not when it's queued.
+        timeout = self.tool_timeout
+        while True:
+            begin = started[0]
+            remaining = timeout if begin is None else begin + timeout - time.monotonic()
+            try:
+                return future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                if started[0] is not None and time.monotonic() - started[0] >= timeout:
+                    self._log.warning(f"Function call timeout: func_name={tool_call.function.name}")
+                    return f"{tool_call.function.name} timed out after {timeout} seconds."
+
+    def _run_tool_calls(self, tools: ToolCatalog, tool_calls: List) -> List[str]:
+        # Results are returned in the order of the calls.
+        if len(tool_calls) == 1 and self.tool_timeout is None:
+            return [self._run_tool_call(tools, tool_calls[0])]
+
+        def _run(tool_call, started):
+            started[0] = time.monotonic()
+            return self._run_tool_call(tools, tool_call)
+
+        max_workers = min(self.tool_concurrency, len(tool_calls))
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iauto-tools")
+        try:
+            calls = []
+            for tool_call in tool_calls:
+                started: List[Optional[float]] = [None]
+                calls.append((pool.submit(_run, tool_call, started), started, tool_call))
+
+            if self.tool_timeout is None:
+                return [f.result() for f, _, _ in calls]
+            return [self._wait_tool_call(f, started, tool_call) for f, started, tool_call in calls]
+        finally:
+            # Calls that timed out keep running in the background, they can't be interrupted.
+            pool.shutdown(wait=False)
+
     def _execute_tools(
         self,
         message: ChatMessage,
         history: List[ChatMessage],
-        actions: List[Action],
+        tools: ToolCatalog,
         save_message: bool = True,
         **kwargs
-    ) -> ChatMessage:
-        if message.tool_calls is None or len(message.tool_calls) == 0:
-            return message
+    ) -> List[ChatMessage]:
+        """
+        Execute all tool calls of a response, independent calls are executed concurrently.
 
-        functions = dict([(func.spec.name.replace(".", "_"), func) for func in actions])
+        Returns:
+            List[ChatMessage]: The `tool` messages of the results in the order of the calls, empty
+                if the response has no tool calls or none of the called functions is found.
+        """
+        if message.tool_calls is None or len(message.tool_calls) == 0:
+            return []
 
-        if message.tool_calls and len(message.tool_calls) > 0:
-            tool_call = message.tool_calls[0]
+        for tool_call in message.tool_calls:
             if not tool_call.function:
                 raise ValueError(f"Invalid function: {tool_call.function}")
+            if tool_call.id is None:
+                raise ValueError("tool_call_id required.")
 
-            call_id = tool_call.id
-            func_name = tool_call.function.name
-            func_args = tool_call.function.arguments or '{}'
-
-            if func_name not in functions:
-                # raise ValueError(f"Function not found: {func_name}")
-                return message
-
-            func_to_call = functions[func_name]
+        if all(tools.get(t.function.name) is None for t in message.tool_calls):
+            return []
 
-            func_resp = None
-            try:
-                func_args = json.loads(func_args)
-                func_resp = func_to_call(**func_args)
-            except Exception as e:
-                self._log.warn(f"Function call err: {e}, func_name={func_name}, args={func_args}, resp={func_resp}")
-                func_resp = str(e)
-
-            if func_resp is not None and not isinstance(func_resp, str):
-                try:
-                    func_resp = json.dumps(func_resp or {}, ensure_ascii=False, indent=4)
-                except TypeError:
-                    self._log.warn("Function return values cannot be JSONized")
+        results = self._run_tool_calls(tools, message.tool_calls)
 
-            if call_id is None:
-                raise ValueError("tool_call_id required.")
-            m = ChatMessage(
+        tool_messages = [
+            ChatMessage(
                 role="tool",
-                content=func_resp or f"{func_name} return nothing.",
-                tool_call_id=call_id,
-                name=func_name,
-            )
-
-            if save_message:
-                self.add(message=message)
+                content=content,
+                tool_call_id=tool_call.id,
+                name=tool_call.function.name,
+            ) for tool_call, content in zip(message.tool_calls, results)
+        ]
+
+        if save_message:
+            self.add(message=message)
+            for m in tool_messages:
                 self.add(message=m)
 
-            return m
-        else:
-            return message
+        return tool_messages
 
     def run(
         self,
@@ -145,6 +277,7 @@ class Session:
         tools: Optional[List[Action]] = None,
         use_tools: bool = True,
         auto_exec_tools: bool = True,
+        callback: Optional[Callable[[ChatMessageChunk], Any]] = None,
         **kwargs
     ) -> Union[ChatMessage, Dict, List]:
         """
@@ -155,12 +288,13 @@ class Session:
             instructions (Optional[str]): Instructions to prepend to the messages before sending to the LLM as a system role message.
             messages (Optional[List[ChatMessage]]): A list of ChatMessage instances to include in the conversation.
                 If not provided, the last 'history' number of messages from the session will be used.
-            history (int): The number of recent messages from the session to consider in the conversation. Defaults to 5.
+            history (int): The number of recent messages from the session to consider in the conversation. Defaults to 5, ignored if the session has a context window.
             rewrite (bool): Whether to rewrite the last user message to be clearer before running the session.
             expect_json (int): The number of times to attempt parsing the LLM's response as JSON before giving up.
             tools (Optional[List[Action]]): A list of Action instances representing tools that can be used in the session.
             use_tools (bool): Whether to include tool specifications when sending messages to the LLM.
             auto_exec_tools (bool): Automatically execute tools if they are called in the LLM's response.
+            callback (Optional[Callable[[ChatMessageChunk], Any]]): Stream the responses of the LLM, the callback is called with each chunk as it's generated.
 
         Returns:
             Union[ChatMessage, Dict]: The final ChatMessage from the LLM, or a dictionary if a JSON response is expected and successfully parsed.
@@ -172,24 +306,23 @@ class Session:
         if rewrite:
             self.rewrite(history=history, **kwargs)
 
+        tool_catalog = self._get_tools(tools)
+        tools_spec = tool_catalog if use_tools and len(tool_catalog) > 0 else None
+
         if messages is None or len(messages) == 0:
-            messages = self._messages[-1 * history:]
+            messages = self._history(history, tools=tools_spec, instructions=instructions)
         if instructions is not None:
             messages.insert(0, ChatMessage(role="system", content=instructions))
 
-        tools_spec = None
-        if use_tools:
-            if tools:
-                tools_spec = [t.spec for t in tools]
-            elif self._actions:
-                tools_spec = [t.spec for t in self._actions]
-        m = self._llm.chat(messages=messages, tools=tools_spec, **kwargs)
+        m = self._chat(messages=messages, tools=tools_spec, callback=callback, **kwargs)
+        tool_messages = []
         if auto_exec_tools:
-            m = self._execute_tools(message=m, history=messages, actions=tools or self._actions or [], **kwargs)
+            tool_messages = self._execute_tools(message=m, history=messages, tools=tool_catalog, **kwargs)
 
-        if m.role == "tool":
-            messages.extend(self._messages[-2:])
-            m = self._llm.chat(messages=messages, **kwargs)
+        if len(tool_messages) > 0:
+            messages.append(m)
+            messages.extend(tool_messages)
+            m = self._chat(messages=messages, callback=callback, **kwargs)
 
         json_obj = None
         if expect_json > 0:
@@ -198,14 +331,16 @@ class Session:
                     json_obj = json.loads(m.content)
                     break
                 except json.JSONDecodeError:
-                    m = self._llm.chat(messages=messages, tools=tools_spec, **kwargs)
+                    m = self._chat(messages=messages, tools=tools_spec, callback=callback, **kwargs)
                     if auto_exec_tools:
-                        m = self._execute_tools(
+                        tool_messages = self._execute_tools(
                             message=m,
                             history=messages,
-                            actions=tools or self._actions or [],
+                            tools=tool_catalog,
                             **kwargs
                         )
+                        if len(tool_messages) > 0:
+                            m = tool_messages[-1]
             if json_obj is None:
                 m.content = "{}"
 
@@ -239,7 +374,7 @@ class Session:
             instructions (Optional[str]): Additional instructions to provide context for the language model.
             messages (Optional[List[ChatMessage]]): The list of ChatMessage instances to include in the conversation.
                 Defaults to the last 'history' messages if not provided.
-            history (int): The number of recent messages from the session to consider. Defaults to 5.
+            history (int): The number of recent messages from the session to consider. Defaults to 5, ignored if the session has a context window.
             rewrite (bool): Whether to rewrite the last user message for clarity before processing. Defaults to False.
             log (bool): Whether to log the steps of the process. Defaults to False.
             max_steps (int): The maximum number of Thought/Action/Observation cycles to perform. Defaults to 3.
@@ -254,19 +389,15 @@ class Session:
             ValueError: If the provided messages list is empty or the last message is not from the user.
         """  # noqa: E501
 
+        tool_catalog = self._get_tools(tools)
+        tools_spec = tool_catalog if use_tools and len(tool_catalog) > 0 else None
+
         if messages is None or len(messages) == 0:
-            messages = self._messages[-1 * history:]
+            messages = self._history(history, tools=tools_spec, instructions=instructions)
 
         if len(messages) < 1 or messages[-1].role != "user":
             return ChatMessage(role="assistant", content="Ask me a question.")
 
-        tools_spec = None
-        if use_tools:
-            if tools:
-                tools_spec = [t.spec for t in tools]
-            elif self._actions:
-                tools_spec = [t.spec for t in self._actions]
-
         original_question = messages[-1].content
         question = original_question
         if rewrite:
@@ -349,15 +480,15 @@ Task: {task}
                 break
 
             # try to execute tools
-            m_tool = self._execute_tools(
+            tool_messages = self._execute_tools(
                 message=m,
                 history=messages,
-                actions=tools or self._actions or [],
+                tools=tool_catalog,
                 save_message=False,
                 **kwargs
             )
 
-            if m_tool.role == "tool":
+            for m_tool in tool_messages:
                 m_tool.content = f"{OBSERVATION}{m_tool.content}"
                 messages.append(m_tool)
 
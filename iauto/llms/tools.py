@@ -0,0 +1,114 @@
+"""
+The tools of an LLM session, with the provider formats computed once.
+
+A `ToolCatalog` is built once per session, and is passed as the `tools` of
+`LLM.chat` instead of a list of `ActionSpec`. It holds the OpenAI format of the
+specs, their JSON, the tool prompts rendered by the providers, and the index used
+to find the action of a tool call, so they are not computed again on every turn.
+"""
+
+import json
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Sequence,
+                    Union)
+
+from ..actions import Action, ActionSpec
+
+
+class ToolCatalog:
+    """
+    The tools of an LLM session.
+
+    The specs and rendered prompts are shared by all turns and providers, and must not be modified.
+
+    Attributes:
+        specs (List[ActionSpec]): The specs of the tools.
+        oai_specs (List[Dict]): The specs in the OpenAI function calling format.
+    """
+
+    def __init__(self, tools: Sequence[Union[Action, ActionSpec]]) -> None:
+        """
+        Build the catalog.
+
+        Args:
+            tools (Sequence[Union[Action, ActionSpec]]): The tools, the actions of specs
+                passed without an action can't be called by `get`.
+        """
+        self._actions: Dict[str, Action] = {}
+        self.specs: List[ActionSpec] = []
+
+        for t in tools:
+            spec = t.spec if isinstance(t, Action) else t
+            self.specs.append(spec)
+            if isinstance(t, Action):
+                self._actions[spec.name] = t
+                self._actions[spec.name.replace(".", "_")] = t
+
+        self.oai_specs: List[Dict] = [s.oai_spec() for s in self.specs]
+        self._json: Optional[str] = None
+        self._rendered: Dict[str, Any] = {}
+
+    @staticmethod
+    def of(tools: Union['ToolCatalog', Sequence[Union[Action, ActionSpec]], None]) -> Optional['ToolCatalog']:
+        """
+        Get the catalog of tools passed to `LLM.chat`.
+
+        Args:
+            tools (Union[ToolCatalog, Sequence[Union[Action, ActionSpec]], None]): A catalog, or a
+                list of actions or specs.
+
+        Returns:
+            Optional[ToolCatalog]: The catalog itself, a new catalog of the list, or None if there are no tools.
+        """
+        if tools is None or len(tools) == 0:
+            return None
+        if isinstance(tools, ToolCatalog):
+            return tools
+        return ToolCatalog(tools)
+
+    @property
+    def json(self) -> str:
+        """The OpenAI format of the specs as JSON."""
+        if self._json is None:
+            self._json = json.dumps(self.oai_specs, ensure_ascii=False)
+        return self._json
+
+    def render(self, name: str, func: Callable[[List[Dict]], Any]) -> Any:
+        """
+        Render the tools for a provider, e.g. the tool prompt of models without native function
+        calling. The result is computed once per catalog and name.
+
+        Args:
+            name (str): The name of the rendering, e.g. `qwen`.
+            func (Callable[[List[Dict]], Any]): Renders the OpenAI format of the specs.
+
+        Returns:
+            Any: The result of `func`.
+        """
+        rendered = self._rendered.get(name)
+        if rendered is None:
+            rendered = func(self.oai_specs)
+            self._rendered[name] = rendered
+        return rendered
+
+    def get(self, name: str) -> Optional[Action]:
+        """
+        Get the action of a tool call.
+
+        Args:
+            name (str): The name of the action, or its OpenAI function name with `_` instead of `.`.
+
+        Returns:
+            Optional[Action]: The action, None if it's not found.
+        """
+        return self._actions.get(name)
+
+    @property
+    def actions(self) -> List[Action]:
+        """The actions of the tools."""
+        return list(dict.fromkeys(self._actions.values()))
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def __iter__(self) -> Iterator[ActionSpec]:
+        return iter(self.specs)
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from iauto.actions import loader
+
+
+class Concurrency:
+    """
+    Test actions that wait, and count how many of them run at the same time.
+
+    Attributes:
+        max (dict): The maximum number of concurrently running waits, by group.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._running = {}
+        self.max = {}
+
+    def _enter(self, group):
+        with self._lock:
+            self._running[group] = self._running.get(group, 0) + 1
+            self.max[group] = max(self.max.get(group, 0), self._running[group])
+
+    def _exit(self, group):
+        with self._lock:
+            self._running[group] -= 1
+
+    def wait(self, seconds, group=None, **kwargs):
+        self._enter(group)
+        try:
+            time.sleep(seconds)
+        finally:
+            self._exit(group)
+
+    async def wait_async(self, seconds, group=None, **kwargs):
+        self._enter(group)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self._exit(group)
+
+
+@pytest.fixture
+def concurrency():
+    return Concurrency()
+
+
+@pytest.fixture
+def register_actions():
+    """Register actions to the global loader for a test, the previous actions are restored after it."""
+    previous = {}
+
+    def register(actions):
+        for name in actions:
+            if name not in previous:
+                previous[name] = loader._actions.get(name)
+        loader.register(actions)
+
+    yield register
+
+    for name, action in previous.items():
+        if action is None:
+            loader._actions.pop(name, None)
+        else:
+            loader._actions[name] = action
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+import pytest
+
+from iauto.actions import (AsyncPlaybookExecutor, PlaybookExecutor, create,
+                           execute_async)
+from iauto.actions.playbook import from_dict
+
+
+async def _double(x, **kwargs):
+    await asyncio.sleep(0)
+    return x * 2
+
+
+class TestAsyncPlaybookExecutor(unittest.TestCase):
+    @pytest.fixture(autouse=True)
+    def _register_actions(self, register_actions, concurrency):
+        # The maximum number of concurrently running `test.async_wait` actions.
+        self.concurrency = concurrency
+        register_actions({
+            "test.async_double": create(_double, spec={"name": "test.async_double"}),
+            "test.async_wait": create(concurrency.wait_async, spec={"name": "test.async_wait"})
+        })
+
+    def test_execute_async(self):
+        pb = from_dict({
+            "playbook": {
+                "actions": [
+                    {"test.async_wait": 0.05},
+                    {"each": {
+                        "args": [[1, 2]],
+                        "actions": [{"test.async_double": {"args": ["$_"], "result": "$r"}}]
+                    }},
+                    {"when": {
+                        "args": {"eq": ["$r", 4]},
+                        "actions": [{"echo": {"args": "{$name}: {$r}", "result": "$out"}}]
+                    }},
+                    {"echo": "$out"}
+                ]
+            }
+        })
+
+        async def run():
+            return await asyncio.gather(*[execute_async(pb, variables={"name": i}) for i in range(5)])
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results, [f"{i}: 4" for i in range(5)])
+        self.assertEqual(self.concurrency.max, {None: 5})
+
+    def test_coroutine_action(self):
+        pb = from_dict({"test.async_double": {"args": [21], "result": "$r"}})
+
+        executor = PlaybookExecutor()
+        self.assertEqual(executor.perform(playbook=pb), 42)
+
+        executor = AsyncPlaybookExecutor()
+        self.assertEqual(asyncio.run(executor.perform(playbook=pb)), 42)
+        self.assertEqual(executor.variables["$r"], 42)
+
+        # Actions registered in the local scope after compiling
+        plan = executor.compile(pb)
+        executor._action_loader.register({"test.async_double": create(lambda x, **kwargs: x, spec={"name": "x"})})
+        self.assertEqual(asyncio.run(executor.perform(playbook=plan)), 21)
+
+    def test_parallel(self):
+        pb = from_dict({
+            "each": {
+                "args": [[1, 2, 3, 4]],
+                "concurrency": 2,
+                "actions": [
+                    {"test.async_wait": 0.05},
+                    {"test.async_double": {"args": ["$_"]}}
+                ]
+            }
+        })
+
+        results = asyncio.run(execute_async(pb))
+
+        self.assertEqual(results, [2, 4, 6, 8])
+        self.assertEqual(self.concurrency.max, {None: 2})
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from iauto.actions import PlaybookExecutor, Profiler
+from iauto.actions import cache as step_cache
+from iauto.actions import create, loader
+from iauto.actions.playbook import from_dict
+
+_calls = []
+
+
+def _square(x, **kwargs):
+    _calls.append(x)
+    return x * x
+
+
+loader.register({"test.square": create(_square, spec={"name": "test.square"})})
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        _calls.clear()
+        step_cache.clear()
+
+    def _run(self, cache, values, executor=None):
+        executor = executor or PlaybookExecutor()
+        results = []
+        for v in values:
+            executor.set_variable("$v", v)
+            executor.perform(playbook=from_dict({"test.square": {"args": ["$v"], "cache": cache, "result": "$r"}}))
+            results.append(executor.variables["$r"])
+        return results
+
+    def test_memory(self):
+        profiler = Profiler()
+        executor = PlaybookExecutor()
+        executor.add_hook(profiler)
+
+        self.assertEqual(self._run(True, [2, 3, 2, 2], executor=executor), [4, 9, 4, 4])
+        self.assertEqual(_calls, [2, 3])
+
+        stats = profiler.stats()["test.square"]
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"]), (2, 2))
+
+    def test_memory_copies(self):
+        cache = step_cache.MemoryCache()
+        value = {"items": [1]}
+        cache.set("k", value)
+        value["items"].append(2)
+
+        result = cache.get("k")
+        self.assertEqual(result, {"items": [1]})
+        result["items"].append(3)
+        self.assertEqual(cache.get("k"), {"items": [1]})
+
+        # Values that can't be copied are not cached
+        cache.set("lock", threading.Lock())
+        self.assertIs(cache.get("lock"), step_cache.MISSING)
+
+    def test_options(self):
+        self._run({"maxsize": 1}, [2, 3, 2])
+        self.assertEqual(_calls, [2, 3, 2])
+
+        _calls.clear()
+        self._run({"ttl": 0.05}, [5, 5])
+        time.sleep(0.1)
+        self._run({"ttl": 0.05}, [5])
+        self.assertEqual(_calls, [5, 5])
+
+        _calls.clear()
+        self._run({"key": "constant"}, [6, 7])
+        self.assertEqual(_calls, [6])
+
+        with self.assertRaises(ValueError):
+            self._run({"backend": "redis"}, [1])
+        with self.assertRaises(ValueError):
+            self._run({"size": 1}, [1])
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "cache.sqlite3")
+            self._run({"backend": "disk", "path": path}, [4])
+
+            # The disk store persists between processes
+            step_cache._caches.clear()
+            self.assertEqual(self._run({"backend": "disk", "path": path}, [4]), [16])
+            self.assertEqual(_calls, [4])
+            step_cache._caches.clear()
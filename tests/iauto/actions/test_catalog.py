@@ -0,0 +1,51 @@
+import os
+import tempfile
+import time
+import unittest
+
+from iauto.actions.catalog import PlaybookCatalog
+
+
+def _write(fname, content):
+    with open(fname, "w") as f:
+        f.write(content)
+
+
+class TestPlaybookCatalog(unittest.TestCase):
+    def test_polling(self):
+        with tempfile.TemporaryDirectory() as d:
+            os.makedirs(os.path.join(d, "sub"))
+            _write(os.path.join(d, "a.yaml"), "playbook:\n  description: A\n  actions:\n    - echo: a\n")
+            _write(os.path.join(d, "sub", "b.yml"), "echo: b\n")
+            _write(os.path.join(d, "invalid.yaml"), "- 1\n- 2\n")
+
+            catalog = PlaybookCatalog(d, watch=False, poll_interval=0)
+            entries = catalog.entries()
+            self.assertEqual([e.name for e in entries], ["a", os.path.join("sub", "b")])
+            self.assertEqual(entries[0].description, "A")
+
+            # Unchanged files are not loaded again
+            entry = catalog.get(os.path.join(d, "a.yaml"))
+            self.assertIs(catalog.entries()[0], entry)
+
+            _write(os.path.join(d, "a.yaml"), "playbook:\n  description: Changed\n  actions:\n    - echo: a\n")
+            os.remove(os.path.join(d, "sub", "b.yml"))
+            entries = catalog.entries()
+            self.assertEqual([e.description for e in entries], ["Changed"])
+
+    def test_watch(self):
+        with tempfile.TemporaryDirectory() as d:
+            catalog = PlaybookCatalog(d, poll_interval=3600)
+            try:
+                self.assertEqual(catalog.entries(), [])
+                _write(os.path.join(d, "a.yaml"), "echo: a\n")
+                if not catalog.watching:
+                    catalog.refresh(force=True)
+
+                for _ in range(50):
+                    if len(catalog.entries()) > 0:
+                        break
+                    time.sleep(0.1)
+                self.assertEqual([e.name for e in catalog.entries()], ["a"])
+            finally:
+                catalog.close()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from iauto.actions import Checkpoint, PlaybookExecutor, create, execute, loader
+from iauto.actions.checkpoint import fingerprint
+from iauto.actions.playbook import from_dict
+
+_calls = []
+
+
+def _resource(**kwargs):
+    _calls.append("resource")
+    return threading.Lock()
+
+
+def _step(name, **kwargs):
+    _calls.append(name)
+    if name == 2 and _calls.count(2) == 1:
+        raise RuntimeError("transient error")
+    return name
+
+
+loader.register({
+    "test.resource": create(_resource, spec={"name": "test.resource"}),
+    "test.step": create(_step, spec={"name": "test.step"})
+})
+
+
+def _playbook():
+    return from_dict({
+        "playbook": {
+            "actions": [
+                {"test.resource": {"result": "$res"}},
+                {"test.step": {"args": ["a"], "result": "$a"}},
+                {"each": {"args": [[1, 2, 3]], "actions": [{"test.step": ["$_"]}]}},
+                {"echo": "{$a}"}
+            ]
+        }
+    })
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        _calls.clear()
+
+    def _run_with_restart(self, checkpoint):
+        with self.assertRaises(RuntimeError):
+            execute(_playbook(), checkpoint=checkpoint)
+        return execute(_playbook(), checkpoint=checkpoint)
+
+    def test_resume_in_memory(self):
+        result = self._run_with_restart(Checkpoint(loops=True))
+
+        self.assertEqual(result, "a")
+        # The unpicklable resource is recreated, completed steps and items are skipped.
+        self.assertEqual(_calls, ["resource", "a", 1, 2, "resource", 2, 3])
+
+    def test_resume_from_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "pb.checkpoint")
+            result = self._run_with_restart(Checkpoint(path=path))
+
+            self.assertEqual(result, "a")
+            # Without loop checkpoints, the loop restarts from its first item.
+            self.assertEqual(_calls, ["resource", "a", 1, 2, "resource", 1, 2, 3])
+            self.assertFalse(os.path.exists(path))
+
+    def test_other_playbook(self):
+        checkpoint = Checkpoint(loops=True)
+        with self.assertRaises(RuntimeError):
+            execute(_playbook(), checkpoint=checkpoint)
+
+        _calls.clear()
+        execute(from_dict({"playbook": {"actions": [{"test.step": ["b"]}]}}), checkpoint=checkpoint)
+        self.assertEqual(_calls, ["b"])
+
+    def test_fingerprint(self):
+        executor = PlaybookExecutor()
+
+        # Arguments that can't be serialized to JSON
+        lock = threading.Lock()
+        plan = executor.compile(from_dict({"test.step": [lock]}))
+        self.assertEqual(fingerprint(plan), fingerprint(executor.compile(from_dict({"test.step": [lock]}))))
+        self.assertNotEqual(fingerprint(plan), fingerprint(executor.compile(from_dict({"test.step": ["a"]}))))
+
+    def test_dataflow(self):
+        with self.assertRaises(ValueError):
+            execute(_playbook(), dataflow=True, checkpoint=Checkpoint())
+        self.assertEqual(_calls, [])
@@ -0,0 +1,99 @@
+import gc
+import threading
+import unittest
+
+import pytest
+
+from iauto.actions import PlaybookExecutor, create, dataflow
+from iauto.actions.dataflow import dependencies
+from iauto.actions.playbook import from_dict
+
+# Both `test.dataflow_scratch` steps are running when they read their scratch variable back.
+_scratch_barrier = threading.Barrier(2, timeout=5)
+
+
+def _scratch(value, executor, **kwargs):
+    executor.set_variable("$scratch", value)
+    _scratch_barrier.wait()
+    return executor.variables["$scratch"]
+
+
+def _playbook():
+    return from_dict({
+        "playbook": {
+            "actions": [
+                {"test.dataflow_wait": {"args": [0.1], "result": "$a"}},
+                {"test.dataflow_wait": {"args": [0.1], "result": "$b"}},
+                {"echo": {"args": "a: {$a}", "result": "$sa"}},
+                {"echo": {"args": "b: {$b}", "result": "$sb"}},
+                {"log": "{$sa}"},
+                {"log": "{$sb}"},
+                {"echo": {"args": "{$sa}, {$sb}"}}
+            ]
+        }
+    })
+
+
+class TestDataflow(unittest.TestCase):
+    @pytest.fixture(autouse=True)
+    def _register_actions(self, register_actions, concurrency):
+        # The maximum number of concurrently running `test.dataflow_wait` actions.
+        self.concurrency = concurrency
+        register_actions({
+            "test.dataflow_wait": create(concurrency.wait, spec={"name": "test.dataflow_wait"}),
+            "test.dataflow_scratch": create(_scratch, spec={"name": "test.dataflow_scratch"})
+        })
+
+    def test_dependencies(self):
+        executor = PlaybookExecutor()
+        plan = executor.compile(_playbook())
+
+        deps = dependencies(plan.actions, executor.variables)
+        self.assertEqual(deps, [set(), set(), {0}, {1}, {2}, {3, 4}, {2, 3, 4, 5}])
+
+        # Objects passed by reference may be mutated
+        plan = executor.compile(from_dict({
+            "playbook": {
+                "actions": [
+                    {"list.append": ["$items", 1]},
+                    {"len": {"args": ["$items"], "result": "$n"}}
+                ]
+            }
+        }))
+        executor.set_variable("$items", [])
+        self.assertEqual(dependencies(plan.actions, executor.variables), [set(), {0}])
+
+        # The analysis is freed with the plan
+        step = plan.actions[0]
+        self.assertIn(step, dataflow._steps)
+        del plan, step
+        gc.collect()
+        self.assertFalse(any(s.name == "list.append" for s in dataflow._steps.keys()))
+
+    def test_run(self):
+        executor = PlaybookExecutor(dataflow=True)
+
+        result = executor.perform(playbook=_playbook())
+
+        self.assertEqual(self.concurrency.max, {None: 2})
+        self.assertEqual(result, "a: None, b: None")
+        self.assertEqual(executor.variables["$sb"], "b: None")
+
+    def test_run_isolated(self):
+        executor = PlaybookExecutor(dataflow=True)
+
+        result = executor.perform(playbook=from_dict({
+            "playbook": {
+                "actions": [
+                    {"test.dataflow_scratch": {"args": ["a"], "result": "$a"}},
+                    {"test.dataflow_scratch": {"args": ["b"], "result": "$b"}},
+                    {"echo": {"args": "{$a}, {$b}"}}
+                ]
+            }
+        }))
+
+        self.assertEqual(result, "a, b")
+        self.assertEqual(executor.variables["$a"], "a")
+        self.assertEqual(executor.variables["$b"], "b")
+        # Variables assigned internally by a step stay in its fork
+        self.assertNotIn("$scratch", executor.variables)
@@ -0,0 +1,267 @@
+import os
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from iauto.actions import Plan, PlaybookExecutor, create
+from iauto.actions.playbook import from_dict
+from iauto.actions.variables import refresh_environ
+
+_barrier = threading.Barrier(2, timeout=5)
+
+
+def _wait_barrier(value=None, **kwargs):
+    # Both threads are in the playbook until the barrier is passed.
+    _barrier.wait()
+    return value
+
+
+class TestPlaybookExecutor(unittest.TestCase):
+    @pytest.fixture(autouse=True)
+    def _register_actions(self, register_actions, concurrency):
+        # The maximum number of concurrently running `test.wait` actions, by group.
+        self.concurrency = concurrency
+        register_actions({
+            "test.barrier": create(_wait_barrier, spec={"name": "test.barrier"}),
+            "test.wait": create(concurrency.wait, spec={"name": "test.wait"})
+        })
+
+    def test_compile(self):
+        pb = from_dict({
+            "playbook": {
+                "actions": [
+                    {"setvar": ["name", "iauto"]},
+                    {"echo": {"args": "hello {$name}", "result": " $greeting "}}
+                ]
+            }
+        })
+        executor = PlaybookExecutor()
+        plan = executor.compile(pb)
+
+        self.assertIsInstance(plan, Plan)
+        self.assertEqual(len(plan.actions), 2)
+        self.assertIsNotNone(plan.actions[0].action)
+        self.assertEqual(plan.actions[1].result, "$greeting")
+        with self.assertRaises(AttributeError):
+            plan.name = "changed"
+
+        executor.perform(playbook=plan)
+        self.assertEqual(executor.variables["$greeting"], "hello iauto")
+
+    def test_plan_to_playbook(self):
+        pb = from_dict({
+            "playbook": {
+                "actions": [
+                    {"echo": {"args": ["a"], "result": " $a ", "cache": 60}},
+                    {"echo": {"args": ["b"], "result": {"$b": "b", "c": "c"}}}
+                ]
+            }
+        })
+        for p in [pb] + pb.actions:
+            p.metadata = {"__root__": "/tmp"}
+
+        plan = PlaybookExecutor().compile(pb)
+        self.assertFalse(hasattr(plan, "playbook"))
+        self.assertIs(plan.metadata, plan.actions[1].metadata)
+        self.assertEqual(plan.to_playbook().model_dump(), pb.model_dump())
+
+    def test_repeat(self):
+        pb = from_dict({
+            "repeat": {
+                "args": 3,
+                "actions": [
+                    {"setvar": ["items", []]},
+                    {"list.append": ["$items", "{$_}"]},
+                    {"len": {"args": ["$items"], "result": "$n"}}
+                ]
+            }
+        })
+        executor = PlaybookExecutor()
+        executor.perform(playbook=pb)
+
+        # Literal containers must not be shared between iterations
+        self.assertEqual(executor.variables["$n"], 1)
+
+    def test_eval_args(self):
+        executor = PlaybookExecutor()
+        executor.set_variable("$d", {"k": [1, 2]})
+
+        pb = from_dict({"echo": {"args": {"a": "$d.k", "b": "$missing", "c": [1, "{$d}"]}}})
+        plan = executor.compile(pb)
+        self.assertEqual(plan.arguments.evaluate(executor), executor.eval_args(pb.args))
+
+        pb = from_dict({"echo": {"args": "$d"}})
+        plan = executor.compile(pb)
+        self.assertEqual(plan.arguments.evaluate(executor), ([], {"k": [1, 2]}))
+
+    def test_static_containers(self):
+        executor = PlaybookExecutor()
+
+        # Escaped braces are rendered inside static containers too
+        pb = from_dict({"echo": {"args": {"a": ["{{x}}", "a"], "b": {"k": "{{x}}"}}}})
+        plan = executor.compile(pb)
+        self.assertEqual(plan.arguments.evaluate(executor), executor.eval_args(pb.args))
+        self.assertEqual(plan.arguments.evaluate(executor), ([], {"a": ["{x}", "a"], "b": {"k": "{x}"}}))
+
+    def test_action_not_found(self):
+        executor = PlaybookExecutor()
+        plan = executor.compile(from_dict({"not.exists": None}))
+        self.assertIsNone(plan.action)
+        with self.assertRaises(ValueError):
+            executor.perform(playbook=plan)
+
+    def test_local_actions(self):
+        executor = PlaybookExecutor()
+        pb = from_dict({"playbook": {"actions": [{"echo": "a"}, {"test.local": "b"}]}})
+        plan = executor.compile(pb, cache=True)
+
+        # Actions registered in the local scope after compiling
+        executor._action_loader.register({
+            "echo": create(lambda *args, **kwargs: f"local {args[0]}", spec={"name": "echo"}),
+            "test.local": create(lambda *args, **kwargs: args[0], spec={"name": "test.local"})
+        })
+        self.assertIs(executor.compile(pb, cache=True), plan)
+        self.assertEqual(executor.perform(playbook=plan.actions[0]), "local a")
+        self.assertEqual(executor.perform(playbook=plan), "b")
+        self.assertEqual(executor.fork().perform(playbook=plan.actions[0]), "local a")
+
+    def test_scopes(self):
+        with mock.patch.dict(os.environ, {"IAUTO_TEST_ENV": "env"}):
+            refresh_environ()
+        self.addCleanup(refresh_environ)
+        executor = PlaybookExecutor()
+        executor.set_variable("$outer", 1)
+
+        self.assertEqual(executor.variables.get("$IAUTO_TEST_ENV"), "env")
+
+        with executor.scope({"$local": 2}) as frame:
+            self.assertEqual(executor.variables["$outer"], 1)
+            executor.set_variable("$local", 3)
+            executor.set_variable("$outer", 4)
+            executor.set_variable("$new", 5)
+            self.assertEqual(frame["$local"], 3)
+
+        self.assertNotIn("$local", executor.variables)
+        self.assertEqual(executor.variables["$outer"], 4)
+        self.assertEqual(executor.variables["$new"], 5)
+
+    def test_concurrent_playbook_actions(self):
+        pb = from_dict({
+            "playbook": {
+                "actions": [
+                    {"playbook": {
+                        "args": {"execute": False},
+                        "actions": [{"playbook": {"actions": [
+                            {"test.barrier": None},
+                            {"test.barrier": "$arg"}
+                        ]}}],
+                        "result": "$actions"
+                    }}
+                ]
+            }
+        })
+        executor = PlaybookExecutor()
+        executor.perform(playbook=pb)
+        action = executor.variables["$actions"][0]
+
+        with ThreadPoolExecutor(2) as pool:
+            results = list(pool.map(lambda arg: action.perform(arg=arg), ["a", "b"]))
+        self.assertEqual(results, ["a", "b"])
+        self.assertNotIn("$arg", executor.variables)
+
+    def test_concurrent_results(self):
+        def _branch(value):
+            return {"playbook": {"actions": [
+                {"echo": {"args": value, "result": "$p"}},
+                {"time.wait": 0.05},
+                {"echo": "$p"}
+            ]}}
+
+        pb = from_dict({
+            "playbook": {
+                "actions": [
+                    {"each": {
+                        "args": [[1, 2, 3, 4]],
+                        "concurrency": 4,
+                        "actions": [
+                            {"echo": {"args": "$_", "result": "$v"}},
+                            {"time.wait": 0.05},
+                            {"echo": "$v"}
+                        ],
+                        "result": "$items"
+                    }},
+                    {"parallel": {"actions": [_branch("a"), _branch("b")], "result": "$results"}}
+                ]
+            }
+        })
+        executor = PlaybookExecutor()
+        executor.perform(playbook=pb)
+
+        # Workers read back their own results, the outputs are merged in order
+        self.assertEqual(executor.variables["$items"], [1, 2, 3, 4])
+        self.assertEqual(executor.variables["$v"], 4)
+        self.assertEqual(executor.variables["$results"], ["a", "b"])
+        self.assertEqual(executor.variables["$p"], "b")
+
+    def test_each_scope(self):
+        pb = from_dict({
+            "playbook": {
+                "actions": [
+                    {"each": {
+                        "args": [[1, 2, 3]],
+                        "actions": [{"echo": {"args": "$_", "result": "$last"}}]
+                    }},
+                    {"playbook": {
+                        "args": {"arg": "value"},
+                        "actions": [{"echo": {"args": "$arg", "result": "$sub"}}]
+                    }}
+                ]
+            }
+        })
+        executor = PlaybookExecutor()
+        executor.perform(playbook=pb)
+
+        self.assertEqual(executor.variables["$last"], 3)
+        self.assertEqual(executor.variables["$sub"], "value")
+        self.assertNotIn("$_", executor.variables)
+        self.assertNotIn("$arg", executor.variables)
+
+    def test_parallel(self):
+        pb = from_dict({
+            "playbook": {
+                "actions": [
+                    {"each": {
+                        "args": [[0.15, 0.05, 0.1]],
+                        "concurrency": 3,
+                        "actions": [
+                            {"test.wait": ["$_", "each"]},
+                            {"echo": {"args": "item {$_}", "result": "$item"}}
+                        ],
+                        "result": "$items"
+                    }},
+                    {"parallel": {
+                        "actions": [
+                            {"test.wait": [0.1, "parallel"]},
+                            {"test.wait": [0.1, "parallel"]},
+                            {"echo": {"args": "b", "result": "$b"}}
+                        ],
+                        "result": "$results"
+                    }}
+                ]
+            }
+        })
+        executor = PlaybookExecutor()
+        executor.perform(playbook=pb)
+
+        self.assertEqual(self.concurrency.max, {"each": 3, "parallel": 2})
+        self.assertEqual(executor.variables["$items"], ["item 0.15", "item 0.05", "item 0.1"])
+        self.assertEqual(executor.variables["$results"], [None, None, "b"])
+        self.assertEqual(executor.variables["$b"], "b")
+        self.assertNotIn("$_", executor.variables)
+
+        pb.actions[0].concurrency = 0
+        with self.assertRaises(ValueError):
+            executor.perform(playbook=pb)
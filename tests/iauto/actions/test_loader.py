@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from iauto.actions.loader import ActionLoader, LazyAction, loader
+
+# The modules `import iauto` must not import, they are imported by the actions that use them.
+LAZY_MODULES = [
+    "playwright", "appium", "selenium", "pandas", "sqlalchemy", "autogen", "openai", "prompt_toolkit", "llama_cpp",
+    "iauto.actions.contrib.browser", "iauto.actions.contrib.webdriver", "iauto.actions.buildin.db",
+    "iauto.actions.buildin.shell", "iauto.llms.actions", "iauto.agents._actions"
+]
+
+
+class TestActionLoader(unittest.TestCase):
+    def test_lazy(self):
+        action_loader = ActionLoader()
+        action_loader.register_lazy("iauto.actions.buildin.json", ["json.loads", "json.missing"])
+        self.assertIsInstance(action_loader._actions["json.loads"], LazyAction)
+        self.assertEqual(set(action_loader.names), {"json.loads", "json.missing"})
+
+        # The module registers its actions to the global loader
+        self.assertIsNone(action_loader.get("json.missing"))
+
+        action_loader = ActionLoader()
+        action_loader.register_lazy("iauto.actions.not_exists", ["not.exists"])
+        with self.assertRaises(ImportError):
+            action_loader.get("not.exists")
+        self.assertEqual(action_loader.actions, [])
+
+    def test_registered_names(self):
+        import iauto  # noqa: F401
+
+        lazy = [a for a in loader._actions.values() if isinstance(a, LazyAction)]
+        for a in lazy:
+            try:
+                action = loader.get(a.name)
+            except ImportError:
+                continue
+            self.assertIsNotNone(action, a.name)
+            self.assertEqual(action.spec.name, a.name)
+
+    def test_lazy_imports(self):
+        # In a fresh interpreter, the modules imported by other tests are not loaded
+        code = (
+            "import json, sys\n"
+            "import iauto\n"
+            "print(json.dumps(sorted(sys.modules)))\n"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        modules = set(json.loads(out))
+
+        for m in LAZY_MODULES:
+            self.assertNotIn(m, modules)
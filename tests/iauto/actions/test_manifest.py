@@ -0,0 +1,102 @@
+import importlib
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from iauto.actions import manifest
+from iauto.actions.loader import LazyAction, loader
+
+MODULE = """
+from iauto.actions.loader import register
+
+
+@register(name="test.manifest_echo", spec={"name": "test.manifest_echo", "description": "%s"})
+def echo(*args, **kwargs):
+    return args
+"""
+
+
+class TestManifest(unittest.TestCase):
+    def test_specs(self):
+        with tempfile.TemporaryDirectory() as d:
+            module_file = os.path.join(d, "manifest_test_module.py")
+            with open(module_file, "w") as f:
+                f.write(MODULE % "Echo")
+
+            path = os.path.join(d, "actions.json")
+            sys.path.insert(0, d)
+            try:
+                loader.register_lazy("manifest_test_module", ["test.manifest_echo"])
+                specs = manifest.specs(path=path)
+                self.assertTrue(os.path.isfile(path))
+                self.assertEqual(specs["test.manifest_echo"].description, "Echo")
+                self.assertIn("log", specs)
+
+                # A fresh manifest is read without importing the modules
+                del sys.modules["manifest_test_module"]
+                loader._actions["test.manifest_echo"] = LazyAction("test.manifest_echo", "manifest_test_module")
+                specs = manifest.specs(path=path)
+                self.assertNotIn("manifest_test_module", sys.modules)
+                self.assertEqual(loader._actions["test.manifest_echo"].spec.description, "Echo")
+
+                # The manifest is rebuilt when a module changed
+                time.sleep(0.01)
+                with open(module_file, "w") as f:
+                    f.write(MODULE % "Changed")
+                specs = manifest.specs(path=path)
+                self.assertEqual(specs["test.manifest_echo"].description, "Changed")
+            finally:
+                sys.path.remove(d)
+                sys.modules.pop("manifest_test_module", None)
+                loader._actions.pop("test.manifest_echo", None)
+
+    def test_skipped(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "manifest_test_skipped.py"), "w") as f:
+                f.write("import manifest_test_dependency  # noqa\n" + MODULE.replace("manifest_echo", "manifest_dep"))
+
+            path = os.path.join(d, "actions.json")
+            sys.path.insert(0, d)
+            try:
+                loader.register_lazy("manifest_test_skipped", ["test.manifest_dep"])
+                specs = manifest.specs(path=path)
+                self.assertNotIn("test.manifest_dep", specs)
+                data = manifest.load(path=path)
+                self.assertEqual(data["skipped"]["test.manifest_dep"]["missing"], "manifest_test_dependency")
+
+                # The manifest is rebuilt once the missing dependency is installed
+                with open(os.path.join(d, "manifest_test_dependency.py"), "w") as f:
+                    f.write("")
+                importlib.invalidate_caches()
+                specs = manifest.specs(path=path)
+                self.assertIn("test.manifest_dep", specs)
+            finally:
+                sys.path.remove(d)
+                sys.modules.pop("manifest_test_skipped", None)
+                sys.modules.pop("manifest_test_dependency", None)
+                loader._actions.pop("test.manifest_dep", None)
+
+    def test_skipped_import_error(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "manifest_test_broken.py"), "w") as f:
+                f.write("from os import not_exists  # noqa\n" + MODULE.replace("manifest_echo", "manifest_broken"))
+
+            path = os.path.join(d, "actions.json")
+            sys.path.insert(0, d)
+            try:
+                loader.register_lazy("manifest_test_broken", ["test.manifest_broken"])
+                manifest.specs(path=path)
+                data = manifest.load(path=path)
+                self.assertIsNone(data["skipped"]["test.manifest_broken"]["missing"])
+
+                # The manifest isn't rebuilt for an error that's not a missing module
+                mtime = os.stat(path).st_mtime_ns
+                time.sleep(0.01)
+                manifest.specs(path=path)
+                self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+            finally:
+                sys.path.remove(d)
+                sys.modules.pop("manifest_test_broken", None)
+                loader._actions.pop("test.manifest_broken", None)
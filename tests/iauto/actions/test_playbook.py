@@ -1,4 +1,7 @@
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from iauto.actions import playbook
@@ -10,3 +13,47 @@ class TestPlaybookLoading(unittest.TestCase):
         # playbook.dump(pb, "./tests/data/playbooks/playbook_load_test_dump.yaml", format="yaml")
         playbook.load("./tests/data/playbooks/playbook_load_test.json")
         # playbook.dump(pb, "./tests/data/playbooks/playbook_load_test_dump.json", format="json")
+
+    def test_playbook_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            fname = os.path.join(d, "pb.yaml")
+            with open(fname, "w") as f:
+                f.write("echo: one\n")
+
+            shared = playbook.load(fname, copy=False)
+            self.assertIs(playbook.load(fname, copy=False), shared)
+
+            copied = playbook.load(fname)
+            self.assertIsNot(copied, shared)
+            copied.args = ["changed"]
+            self.assertEqual(playbook.load(fname).args, ["one"])
+
+            # Modified files are parsed again
+            with open(fname, "w") as f:
+                f.write("echo: modified\n")
+            os.utime(fname, ns=(0, os.stat(fname).st_mtime_ns + 1000000))
+            self.assertEqual(playbook.load(fname).args, ["modified"])
+
+            shared = playbook.load(fname, copy=False)
+            playbook.invalidate(fname)
+            self.assertIsNot(playbook.load(fname, copy=False), shared)
+
+    def test_compiled_playbook(self):
+        with tempfile.TemporaryDirectory() as d:
+            fname = os.path.join(d, "pb.yaml")
+            shutil.copy("./tests/data/playbooks/playbook_load_test.yaml", fname)
+
+            source = playbook.load(fname)
+            compiled_fname = playbook.compile_file(fname)
+            self.assertEqual(compiled_fname, fname + playbook.COMPILED_EXT)
+
+            playbook.invalidate()
+            compiled = playbook.load(fname)
+            self.assertEqual(compiled.model_dump(), source.model_dump())
+            self.assertEqual(playbook.load(compiled_fname).model_dump(), source.model_dump())
+
+            # Stale compiled files are ignored
+            with open(fname, "w") as f:
+                f.write("echo: modified\n")
+            playbook.invalidate()
+            self.assertEqual(playbook.load(fname).args, ["modified"])
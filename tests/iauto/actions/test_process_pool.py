@@ -0,0 +1,39 @@
+import unittest
+
+from iauto.actions import (execute_in_process, get_process_pool, loader,
+                           shutdown_process_pool)
+from iauto.actions.executor import _init_process_worker
+from iauto.actions.loader import LazyAction
+from iauto.actions.playbook import from_dict
+
+
+class TestProcessPool(unittest.TestCase):
+    def tearDown(self):
+        shutdown_process_pool()
+
+    def test_execute_in_process(self):
+        pb = from_dict({"echo": "hello {$name}"})
+
+        futures = [execute_in_process(pb, variables={"name": i}) for i in range(4)]
+        self.assertEqual([f.result(timeout=30) for f in futures], [f"hello {i}" for i in range(4)])
+        self.assertTrue(all(f.done() for f in futures))
+
+        # Workers are reused
+        pool = get_process_pool()
+        self.assertEqual(execute_in_process(pb, variables={"name": "again"}).result(timeout=30), "hello again")
+        self.assertIs(get_process_pool(), pool)
+
+    def test_init_process_worker(self):
+        _init_process_worker(["shell.cmd", "db.read", "unknown.action"])
+        self.assertNotIsInstance(loader._actions["shell.cmd"], LazyAction)
+        self.assertNotIsInstance(loader._actions["db.read"], LazyAction)
+
+    def test_cancel_futures(self):
+        pb = from_dict({"echo": "hello"})
+
+        # A single worker starts at most two playbooks, the others are pending
+        get_process_pool(max_workers=1)
+        futures = [execute_in_process(pb) for _ in range(20)]
+        shutdown_process_pool(cancel_futures=True)
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertTrue(any(f.cancelled() for f in futures))
@@ -0,0 +1,67 @@
+import unittest
+
+from iauto.actions import PlaybookExecutor, Profiler, StepHook
+from iauto.actions.playbook import from_dict
+
+
+class _Recorder(StepHook):
+    def __init__(self) -> None:
+        self.calls = []
+
+    def before_step(self, event):
+        self.calls.append(("before", event.name))
+
+    def after_step(self, event):
+        self.calls.append(("after", event.name))
+
+    def on_error(self, event):
+        self.calls.append(("error", event.name))
+
+
+class TestProfiler(unittest.TestCase):
+    def test_hooks(self):
+        recorder = _Recorder()
+        executor = PlaybookExecutor()
+        executor.add_hook(recorder)
+
+        executor.perform(playbook=from_dict({"repeat": {"args": 2, "actions": [{"echo": "hi"}]}}))
+        self.assertEqual(recorder.calls, [
+            ("before", "repeat"),
+            ("before", "echo"), ("after", "echo"),
+            ("before", "echo"), ("after", "echo"),
+            ("after", "repeat")
+        ])
+
+        recorder.calls.clear()
+        with self.assertRaises(ValueError):
+            executor.perform(playbook=from_dict({"repeat": {"args": 1, "actions": [{"not.exists": None}]}}))
+        self.assertEqual(recorder.calls, [
+            ("before", "repeat"),
+            ("before", "not.exists"), ("error", "not.exists"),
+            ("error", "repeat")
+        ])
+
+        executor.remove_hook(recorder)
+        executor.perform(playbook=from_dict({"echo": "hi"}))
+        self.assertEqual(len(recorder.calls), 4)
+
+    def test_profiler(self):
+        profiler = Profiler()
+        executor = PlaybookExecutor()
+        executor.add_hook(profiler)
+
+        executor.perform(playbook=from_dict({
+            "repeat": {"args": 10, "actions": [{"time.wait": 0.001}]}
+        }))
+
+        stats = profiler.stats()
+        self.assertEqual(stats["time.wait"]["count"], 10)
+        self.assertEqual(stats["repeat"]["count"], 1)
+        self.assertGreaterEqual(stats["time.wait"]["p50"], 0.001)
+        self.assertLessEqual(stats["time.wait"]["p99"], stats["time.wait"]["max"])
+        self.assertIn("time.wait", profiler.report())
+
+        trace = profiler.chrome_trace()["traceEvents"]
+        self.assertEqual(len(trace), 11)
+        self.assertEqual(trace[0]["name"], "repeat")
+        self.assertEqual(trace[0]["ph"], "X")
@@ -0,0 +1,24 @@
+import unittest
+
+from iauto.actions.executor import SafeDict
+from iauto.actions.template import parse
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        variables = {"$x": {"k": [1, 2]}, "$n": None, "$s": "str"}
+        for s in [
+            "{$x[k][1]}-{$n}-{$s!r:>8}-{{literal}}-{$missing}",
+            "plain }} {{ text",
+            "{$x[k]} {$x[k]}"
+        ]:
+            self.assertEqual(parse(s).render(variables), s.format_map(SafeDict(variables)))
+
+        self.assertEqual(parse("{$x} {$s} {$x}").names, ("$x", "$s"))
+        self.assertTrue(parse("{{}}").is_static)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse("{").render({})
+        with self.assertRaises(ValueError):
+            parse("{}").render({})
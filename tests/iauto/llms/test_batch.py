@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+from iauto.actions import loader
+from iauto.llms import LLM, ChatMessage, Session, chat_batch
+
+
+class FakeLLM(LLM):
+    def __init__(self) -> None:
+        super().__init__()
+        self.running = 0
+        self.max_running = 0
+
+    def chat(self, messages=[], tools=None, **kwargs) -> ChatMessage:
+        raise NotImplementedError()
+
+    async def chat_async(self, messages=[], tools=None, **kwargs) -> ChatMessage:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            prompt = messages[-1].content
+            await asyncio.sleep(0.01 if prompt != "0" else 0.05)
+            if prompt == "error":
+                raise ValueError("failed")
+            return ChatMessage(role="assistant", content=f"{messages[0].role}:{prompt}")
+        finally:
+            self.running -= 1
+
+    def generate(self, instructions: str, **kwargs):
+        raise NotImplementedError()
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+
+class TestBatch(unittest.TestCase):
+    def test_chat_batch(self):
+        llm = FakeLLM()
+        results = asyncio.run(chat_batch(llm, [str(i) for i in range(10)] + ["error"], concurrency=3))
+
+        self.assertEqual([r.content for r in results[:10]], [f"user:{i}" for i in range(10)])
+        self.assertIsInstance(results[10], ValueError)
+        self.assertEqual(llm.max_running, 3)
+
+    def test_batch_action(self):
+        session = Session(llm=FakeLLM())
+        action = loader.get("llm.batch")
+        results = action.perform(
+            session=session,
+            prompts=["a", [{"role": "user", "content": "b"}], "error"],
+            instructions="Be brief."
+        )
+        self.assertEqual(results, ["system:a", "system:b", {"error": "failed"}])
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from iauto.db import Persistence
+from iauto.llms import LLM, ChatMessage
+from iauto.llms.cache import CachedLLM, LLMCacheEntry
+from iauto.llms.llm import Function, Message, ToolCall, Usage
+
+
+class FakeLLM(LLM):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def generate(self, instructions: str, **kwargs) -> Message:
+        return Message(content=instructions)
+
+    def chat(self, messages, tools=None, **kwargs) -> ChatMessage:
+        self.calls += 1
+        return ChatMessage(
+            role="assistant",
+            content=f"{messages[-1].content} {self.calls}",
+            tool_calls=[ToolCall(id="1", type="function", function=Function(name="f", arguments="{}"))],
+            usage=Usage(input_tokens=3, output_tokens=5)
+        )
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+
+class TestCachedLLM(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.persistence = Persistence(database_url=f"sqlite:///{os.path.join(self._tmpdir.name, 'db.sqlite3')}")
+
+    def tearDown(self) -> None:
+        self.persistence.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def test_cache(self):
+        llm = FakeLLM()
+        cached = CachedLLM(llm, persistence=self.persistence)
+        messages = [ChatMessage(role="user", content="Hi")]
+
+        m1 = cached.chat(messages=messages, temperature=0)
+        m2 = cached.chat(messages=messages, temperature=0)
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(m1, m2)
+        self.assertEqual(m2.usage.output_tokens, 5)
+        self.assertEqual(m2.tool_calls[0].function.name, "f")
+
+        # Responses are copies, callers can modify them
+        m2.content = "modified"
+        self.assertEqual(cached.chat(messages=messages, temperature=0).content, "Hi 1")
+
+        # A new process reads the database
+        other = CachedLLM(llm, persistence=self.persistence)
+        self.assertEqual(other.chat(messages=messages, temperature=0).content, "Hi 1")
+        self.assertEqual(other.stats.memory_hits, 0)
+        self.assertEqual(llm.calls, 1)
+
+        # Different parameters are different requests
+        cached.chat(messages=messages, temperature=0, max_tokens=10)
+        self.assertEqual(llm.calls, 2)
+
+        self.assertEqual(cached.stats.hits, 2)
+        self.assertEqual(cached.stats.misses, 2)
+        self.assertEqual(cached.stats.hit_rate, 0.5)
+
+    def test_bypass(self):
+        llm = FakeLLM()
+        cached = CachedLLM(llm, persistence=self.persistence)
+        messages = [ChatMessage(role="user", content="Hi")]
+
+        cached.chat(messages=messages, temperature=0.7)
+        cached.chat(messages=messages, temperature=0.7)
+        self.assertEqual(llm.calls, 2)
+        self.assertEqual(cached.stats.bypassed, 2)
+
+        forced = CachedLLM(llm, persistence=self.persistence, force=True)
+        forced.chat(messages=messages, temperature=0.7)
+        forced.chat(messages=messages, temperature=0.7)
+        self.assertEqual(llm.calls, 3)
+
+    def test_default_temperature(self):
+        llm = FakeLLM()
+        cached = CachedLLM(llm, persistence=self.persistence)
+        messages = [ChatMessage(role="user", content="Hi")]
+
+        # An explicit None is the same request as an omitted temperature
+        cached.chat(messages=messages, temperature=None)
+        self.assertEqual(cached.chat(messages=messages).content, "Hi 1")
+        self.assertEqual(asyncio.run(cached.chat_async(messages=messages, temperature=None)).content, "Hi 1")
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(cached.stats.bypassed, 0)
+
+    def test_ttl(self):
+        llm = FakeLLM()
+        cached = CachedLLM(llm, persistence=self.persistence, ttl=-1)
+        messages = [ChatMessage(role="user", content="Hi")]
+
+        cached.chat(messages=messages)
+        m = cached.chat(messages=messages)
+        self.assertEqual(m.content, "Hi 2")
+        self.assertEqual(cached.stats.hits, 0)
+
+        # Expired responses are removed
+        cached.chat(messages=[ChatMessage(role="user", content="Bye")])
+        self.assertEqual(cached.purge(), 2)
+        self.assertEqual(self.persistence.list(LLMCacheEntry), [])
+
+        cached.clear()
+        cached.ttl = None
+        cached.chat(messages=messages)
+        self.assertEqual(llm.calls, 4)
@@ -0,0 +1,88 @@
+import unittest
+
+from iauto.llms import LLM, ChatMessage, ContextWindow, Session
+from iauto.llms.context import MESSAGE_OVERHEAD, estimate_tokens
+from iauto.llms.llm import Function, Message, ToolCall
+
+
+class FakeLLM(LLM):
+    def __init__(self) -> None:
+        super().__init__()
+        self.requests = []
+
+    def generate(self, instructions: str, **kwargs) -> Message:
+        return Message(content=instructions)
+
+    def chat(self, messages, tools=None, **kwargs) -> ChatMessage:
+        self.requests.append(messages)
+        return ChatMessage(role="assistant", content=f"summary {len(self.requests)}")
+
+    def count_tokens(self, text: str) -> int:
+        # A token per word
+        return len(text.split())
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+
+def _message(role, words, **kwargs):
+    return ChatMessage(role=role, content=" ".join(["w"] * words), **kwargs)
+
+
+class TestContextWindow(unittest.TestCase):
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+        self.assertEqual(estimate_tokens("你好"), 2)
+
+    def test_select(self):
+        window = ContextWindow(FakeLLM(), max_tokens=55)
+        history = [
+            _message("system", 6),
+            _message("user", 30),
+            _message("assistant", 10, tool_calls=[
+                ToolCall(id="1", type="function", function=Function(name="f", arguments="{}"))]),
+            _message("tool", 10, tool_call_id="1"),
+            _message("user", 10),
+        ]
+
+        # The tool call is dropped with its result, the system message is kept
+        selected = window.select(history)
+        self.assertEqual(selected, [history[0], history[4]])
+
+        # Budget: 55 + 3 - 10 (system) - 14 (user) = 34, the tool call group needs 20 + 14
+        selected = window.select(history, reserve=-3)
+        self.assertEqual(selected, [history[0]] + history[2:])
+
+        # The newest message is always selected
+        selected = ContextWindow(FakeLLM(), max_tokens=5).select(history)
+        self.assertEqual(selected, [history[0], history[4]])
+
+    def test_summarize(self):
+        llm = FakeLLM()
+        window = ContextWindow(llm, max_tokens=40 + MESSAGE_OVERHEAD, summarize=True, summary_tokens=10)
+        history = [_message("user", 10), _message("assistant", 10), _message("user", 10)]
+
+        selected = window.select(history)
+        self.assertEqual(selected[0].role, "system")
+        self.assertIn("summary 1", selected[0].content)
+        self.assertEqual(selected[1:], history[1:])
+
+        # Only the newly dropped messages are summarized
+        history.extend([_message("assistant", 10), _message("user", 10)])
+        selected = window.select(history)
+        self.assertIn("summary 2", selected[0].content)
+        self.assertEqual(selected[1:], history[3:])
+        self.assertEqual(len(llm.requests), 2)
+
+        window.select(history)
+        self.assertEqual(len(llm.requests), 2)
+
+    def test_session(self):
+        llm = FakeLLM()
+        session = Session(llm=llm, context=ContextWindow(llm, max_tokens=30))
+        for _ in range(5):
+            session.add(_message("user", 10))
+
+        session.run(history=100)
+        self.assertEqual(len(llm.requests[0]), 2)
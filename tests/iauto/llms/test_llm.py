@@ -0,0 +1,60 @@
+import unittest
+from types import SimpleNamespace
+
+from iauto.llms import ChatMessage, ChatMessageChunk, Session, merge_chunks
+from iauto.llms.llm import ToolCallChunk
+from iauto.llms.openai import OpenAI
+
+
+def _chunk(content=None, tool_calls=None, finish_reason=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)], usage=None)
+
+
+def _tool_call(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+class FakeCompletions:
+    def __init__(self, chunks) -> None:
+        self.chunks = chunks
+        self.kwargs = None
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        return iter(self.chunks)
+
+
+class TestChatStream(unittest.TestCase):
+    def test_merge_chunks(self):
+        m = merge_chunks([
+            ChatMessageChunk(content="Hel"),
+            ChatMessageChunk(content="lo", tool_calls=[ToolCallChunk(index=0, id="1", name="math_add")]),
+            ChatMessageChunk(tool_calls=[ToolCallChunk(index=0, arguments='{"a": 1')]),
+            ChatMessageChunk(tool_calls=[ToolCallChunk(index=0, arguments=', "b": 2}')], finish_reason="tool_calls"),
+        ])
+        self.assertEqual(m.content, "Hello")
+        self.assertEqual(m.tool_calls[0].id, "1")
+        self.assertEqual(m.tool_calls[0].function.name, "math_add")
+        self.assertEqual(m.tool_calls[0].function.arguments, '{"a": 1, "b": 2}')
+
+    def test_openai(self):
+        llm = OpenAI(model="gpt-4", api_key="none")
+        completions = FakeCompletions([
+            _chunk(content="Hello"),
+            _chunk(content=", world"),
+            _chunk(tool_calls=[_tool_call(0, id="call_1", name="math_add", arguments="{}")]),
+            _chunk(finish_reason="stop"),
+        ])
+        llm._openai = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+        session = Session(llm=llm)
+        session.add(ChatMessage(role="user", content="Hi"))
+
+        chunks = []
+        m = session.run(callback=chunks.append, auto_exec_tools=False)
+
+        self.assertTrue(completions.kwargs["stream"])
+        self.assertEqual([c.content for c in chunks], ["Hello", ", world", "", ""])
+        self.assertEqual(m.content, "Hello, world")
+        self.assertEqual(m.tool_calls[0].function.name, "math_add")
@@ -0,0 +1,184 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+from iauto.llms.pool import ModelPool, kv_cache_size
+
+
+def _gguf_string(s):
+    data = s.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+
+def _write_gguf(path, metadata):
+    with open(path, "wb") as f:
+        f.write(b"GGUF" + struct.pack("<IQQ", 3, 0, len(metadata)))
+        for key, value in metadata:
+            f.write(_gguf_string(key))
+            if isinstance(value, str):
+                f.write(struct.pack("<I", 8) + _gguf_string(value))
+            elif isinstance(value, list):
+                f.write(struct.pack("<IIQ", 9, 8, len(value)) + b"".join(_gguf_string(v) for v in value))
+            else:
+                f.write(struct.pack("<II", 4, value))
+
+
+class FakeModel:
+    def __init__(self, name) -> None:
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestModelPool(unittest.TestCase):
+    def test_lru_eviction(self):
+        pool = ModelPool(max_memory=200)
+        a = pool.model("a", lambda: FakeModel("a"), size=100)
+        b = pool.model("b", lambda: FakeModel("b"), size=100)
+        c = pool.model("c", lambda: FakeModel("c"), size=100)
+
+        self.assertIs(pool.model("a", lambda: None), a)
+
+        with a.acquire() as model_a:
+            pass
+        with b.acquire():
+            pass
+        with a.acquire():
+            pass
+        self.assertEqual(pool.memory, 200)
+
+        # b is the least recently used
+        with c.acquire():
+            self.assertEqual((a.loaded, b.loaded, c.loaded), (1, 0, 1))
+
+            # Instances in use are not unloaded, loading waits until they're released
+            with a.acquire():
+                with self.assertRaises(TimeoutError):
+                    with b.acquire(timeout=0.05):
+                        pass
+                self.assertEqual(pool.memory, 200)
+
+                loaded = []
+
+                def _load():
+                    with b.acquire(timeout=5) as instance:
+                        loaded.append(instance)
+
+                thread = threading.Thread(target=_load)
+                thread.start()
+                time.sleep(0.05)
+                self.assertEqual(loaded, [])
+            thread.join()
+            self.assertEqual(len(loaded), 1)
+            self.assertEqual((a.loaded, b.loaded, c.loaded), (0, 1, 1))
+            self.assertTrue(model_a.closed)
+
+        pool.clear()
+        self.assertEqual(pool.memory, 0)
+
+        # Instances larger than the pool are never loaded
+        with self.assertRaises(ValueError):
+            with pool.model("large", lambda: FakeModel("large"), size=300).acquire():
+                pass
+
+    def test_replicas(self):
+        pool = ModelPool()
+        created = []
+        model = pool.model("m", lambda: created.append(1) or FakeModel("m"), size=1, replicas=2)
+
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def _use():
+            with model.acquire() as instance:
+                with lock:
+                    self.assertNotIn(instance, running)
+                    running.append(instance)
+                    max_running.append(len(running))
+                time.sleep(0.05)
+                with lock:
+                    running.remove(instance)
+
+        threads = [threading.Thread(target=_use) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(created), 2)
+        self.assertEqual(max(max_running), 2)
+
+        with model.acquire():
+            with model.acquire():
+                with self.assertRaises(TimeoutError):
+                    with model.acquire(timeout=0.05):
+                        pass
+
+    def test_share(self):
+        pool = ModelPool(max_memory=100)
+        shared = pool.model("shared", lambda: FakeModel("shared"), size=100)
+        other = pool.model("other", lambda: FakeModel("other"), size=100)
+
+        with shared.share() as a:
+            with shared.share() as b:
+                self.assertIs(a, b)
+
+            # Shared instances in use are not unloaded
+            with self.assertRaises(TimeoutError):
+                with other.acquire(timeout=0.05):
+                    pass
+            self.assertEqual(shared.loaded, 1)
+
+        pool.clear()
+        self.assertEqual(shared.loaded, 0)
+        self.assertTrue(a.closed)
+
+    def test_peek(self):
+        pool = ModelPool(max_memory=100)
+        model = pool.model("model", lambda: FakeModel("model"), size=100)
+        other = pool.model("other", lambda: FakeModel("other"), size=100)
+
+        with model.acquire() as acquired:
+            # Peeked instances may be in use
+            with model.peek() as peeked:
+                self.assertIs(peeked, acquired)
+
+        with model.peek() as peeked:
+            # Peeked instances are not unloaded
+            pool.clear()
+            with self.assertRaises(TimeoutError):
+                with other.acquire(timeout=0.05):
+                    pass
+            self.assertEqual(model.loaded, 1)
+            self.assertFalse(peeked.closed)
+
+        pool.clear()
+        self.assertTrue(peeked.closed)
+
+    def test_kv_cache_size(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "model.gguf")
+            _write_gguf(path, [
+                ("general.architecture", "llama"),
+                ("tokenizer.ggml.tokens", ["a", "b"]),
+                ("llama.block_count", 32),
+                ("llama.context_length", 8192),
+                ("llama.embedding_length", 4096),
+                ("llama.attention.head_count", 32),
+                ("llama.attention.head_count_kv", 8),
+            ])
+
+            # The f16 keys and values of 32 layers of 1024 values per token
+            self.assertEqual(kv_cache_size(path, 4096), 2 * 32 * 4096 * 1024 * 2)
+            self.assertEqual(kv_cache_size(path), 2 * 32 * 8192 * 1024 * 2)
+
+            with open(path, "wb") as f:
+                f.write(b"not a model")
+            self.assertEqual(kv_cache_size(path, 4096), 0)
+            self.assertEqual(kv_cache_size(os.path.join(d, "missing.gguf"), 4096), 0)
@@ -0,0 +1,152 @@
+import threading
+import time
+import unittest
+
+from iauto.actions import PlaybookExecutor, create, loader
+from iauto.actions.playbook import from_dict
+from iauto.llms import LLM, ChatMessage, Session, ToolCatalog
+from iauto.llms.llm import Function, Message, ToolCall
+
+
+def _add(a, b):
+    return a + b
+
+
+_barrier = threading.Barrier(2, timeout=5)
+
+
+def _wait_barrier(value=None, **kwargs):
+    _barrier.wait()
+    return value
+
+
+loader.register({"test.tools_barrier": create(_wait_barrier, spec={"name": "test.tools_barrier"})})
+
+
+def _tool_call(id, name, arguments):
+    return ToolCall(id=id, type="function", function=Function(name=name, arguments=arguments))
+
+
+class FakeLLM(LLM):
+    def __init__(self) -> None:
+        super().__init__()
+        self.tools = []
+
+    def generate(self, instructions: str, **kwargs) -> Message:
+        return Message(content=instructions)
+
+    def chat(self, messages, tools=None, **kwargs) -> ChatMessage:
+        self.tools.append(tools)
+        if messages[-1].role == "tool":
+            return ChatMessage(role="assistant", content=messages[-1].content)
+        return ChatMessage(role="assistant", content="", tool_calls=[
+            ToolCall(id="1", type="function", function=Function(name="math_add", arguments='{"a": 1, "b": 2}'))
+        ])
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+
+class TestToolCatalog(unittest.TestCase):
+    def test_catalog(self):
+        action = create(_add, spec={"name": "math.add", "description": "Add two numbers."})
+        catalog = ToolCatalog([action])
+
+        self.assertIs(catalog.get("math_add"), action)
+        self.assertIs(catalog.get("math.add"), action)
+        self.assertEqual(catalog.oai_specs, [action.spec.oai_spec()])
+        self.assertIs(catalog.render("test", lambda specs: object()), catalog.render("test", lambda specs: None))
+        self.assertIs(ToolCatalog.of(catalog), catalog)
+        self.assertIsNone(ToolCatalog.of([]))
+
+    def test_session(self):
+        action = create(_add, spec={"name": "math.add", "description": "Add two numbers."})
+        llm = FakeLLM()
+        session = Session(llm=llm, actions=[action])
+
+        session.add(ChatMessage(role="user", content="1 + 2"))
+        m = session.run()
+        self.assertEqual(m.content, "3")
+
+        session.add(ChatMessage(role="user", content="1 + 2"))
+        session.run()
+
+        # The same catalog is passed on every turn
+        self.assertIs(llm.tools[0], session.tools)
+        self.assertIs(llm.tools[2], session.tools)
+
+        # An action replaced in the list is a new tool
+        other = create(_add, spec={"name": "math.add", "description": "Add two numbers."})
+        session.actions[0] = other
+        self.assertIs(session.tools.get("math_add"), other)
+
+
+class TestToolCalls(unittest.TestCase):
+    def test_execute_tools(self):
+        running = []
+        lock = threading.Lock()
+
+        def _sleep(seconds):
+            with lock:
+                running.append(threading.get_ident())
+            time.sleep(seconds)
+            return seconds
+
+        sleep = create(_sleep, spec={"name": "sleep", "description": "Sleep."})
+        session = Session(llm=FakeLLM(), actions=[sleep], tool_concurrency=3, tool_timeout=0.5)
+
+        message = ChatMessage(role="assistant", content="", tool_calls=[
+            _tool_call("1", "sleep", '{"seconds": 0.2}'),
+            _tool_call("2", "sleep", '{"seconds": 0.1}'),
+            _tool_call("3", "unknown", '{}'),
+            _tool_call("4", "sleep", '{"seconds": 2}'),
+        ])
+
+        start = time.monotonic()
+        results = session._execute_tools(message=message, history=[], tools=session.tools)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+        self.assertEqual([m.tool_call_id for m in results], ["1", "2", "3", "4"])
+        self.assertEqual(results[0].content, "0.2")
+        self.assertEqual(results[1].content, "0.1")
+        self.assertEqual(results[2].content, "Function not found: unknown")
+        self.assertIn("timed out", results[3].content)
+        self.assertEqual(len(set(running)), 3)
+
+        # The response and the results of all calls are saved
+        self.assertEqual(session.messages[0], message)
+        self.assertEqual(session.messages[1:], results)
+
+    def test_playbook_tools(self):
+        def _tool(name):
+            return {"playbook": {
+                "spec": {"name": name, "description": name, "arguments": [
+                    {"name": "q", "type": "string", "description": "The query."}
+                ]},
+                "actions": [
+                    {"test.tools_barrier": None},
+                    {"test.tools_barrier": f"{name} {{$q}}"}
+                ]
+            }}
+
+        pb = from_dict({
+            "playbook": {
+                "args": {"execute": False},
+                "actions": [_tool("search"), _tool("lookup")],
+                "result": "$tools"
+            }
+        })
+        executor = PlaybookExecutor()
+        executor.perform(playbook=pb)
+        session = Session(llm=FakeLLM(), actions=executor.variables["$tools"])
+
+        # Both calls run at the same time on the executor of the playbooks.
+        message = ChatMessage(role="assistant", content="", tool_calls=[
+            _tool_call("1", "search", '{"q": "a"}'),
+            _tool_call("2", "lookup", '{"q": "b"}'),
+        ])
+        results = session._execute_tools(message=message, history=[], tools=session.tools)
+
+        self.assertEqual([m.content for m in results], ["search a", "lookup b"])
+        self.assertNotIn("$q", executor.variables)